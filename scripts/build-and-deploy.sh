@@ -32,7 +32,8 @@ echo "--- Building and Pushing Image ---"
 echo "Source Directory: ${SERVICE_SOURCE_DIR}"
 echo "Image URL: ${IMAGE_URL}"
 
-DOCKER_BUILDKIT=1 docker build -t "${IMAGE_URL}" "${SERVICE_SOURCE_DIR}"
+# The build context is the repository root so the image can include the shared tools/ package.
+DOCKER_BUILDKIT=1 docker build -t "${IMAGE_URL}" -f "${SERVICE_SOURCE_DIR}/Dockerfile" .
 docker push "${IMAGE_URL}"
 
 echo "✅ Image built and pushed successfully."
@@ -14,9 +14,9 @@ echo "3. Local Python: Run each FastAPI app with 'uvicorn' directly."
 echo ""
 echo "Example of running a single service (agicore-mcp) with uvicorn:"
 echo "------------------------------------------------------------"
-echo "cd services/agicore-mcp"
+echo "cd services/agicore_mcp"
 echo "pip install -r requirements.txt"
-echo "uvicorn main:app --reload --port 8001"
+echo "PYTHONPATH=../.. uvicorn main:app --reload --port 8001  # The shared tools/ package lives at the repository root"
 echo "------------------------------------------------------------"
 echo ""
 
@@ -27,13 +27,17 @@ echo "To create a full local environment, a 'docker-compose.yml' file is the sta
 # version: '3.8'
 # services:
 #   mcp:
-#     build: ./services/agicore-mcp
+#     build:
+#       context: .  # The repository root, so the shared tools/ package is in the context
+#       dockerfile: services/agicore_mcp/Dockerfile
 #     ports:
 #       - "8001:8080"
 #     environment:
 #       - LOG_LEVEL=debug
 #   operator:
-#     build: ./services/operator
+#     build:
+#       context: .
+#       dockerfile: services/operator/Dockerfile
 #     ports:
 #       - "8002:8080"
 # ... and so on for all other services
@@ -1,18 +1,38 @@
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import logging
-from typing import Dict, Any, List
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from decouple import config
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+from tools import serialization
+from tools.idempotency import install_idempotency
+from tools.metrics import install_metrics
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+from tools.startup import install_fast_start
+from tools.tracing import install_tracing
+from tools.utils import configure_logging, get_logger
+
+from news_scoring import TopicScores, fetch_articles, score_topics, summarize_sentiment, summarize_trend
+from trend_engine import TrendEngine
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging("agicore-analytics")
+# Per-request INFO logs are rate limited; warnings and errors always get through.
+logger = get_logger(__name__, per_second=config("LOG_REQUESTS_PER_SECOND", default=200.0, cast=float))
 
 app = FastAPI(
     title="AGIcore - Analytics Agent",
     description="A micro-agent for data analysis, trend detection, and news analysis.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
+app.add_middleware(SerializationMiddleware)
+install_idempotency(app)
+install_metrics(app, service="agicore-analytics")
+install_tracing(app, service="agicore-analytics")
+install_fast_start(app)
 
 class AnalysisRequest(BaseModel):
     data_source: str # e.g., "market_data", "news_feed"
@@ -26,30 +46,127 @@ class AnalysisResult(BaseModel):
     confidence_score: float
     key_points: List[str]
 
+class BatchAnalysisRequest(BaseModel):
+    requests: List[AnalysisRequest] = Field(..., max_length=1000)
+
+class TrendPoint(BaseModel):
+    series: str
+    value: float
+    timestamp: Optional[float] = None # Defaults to the time of ingestion
+
+class TrendIngestRequest(BaseModel):
+    points: List[TrendPoint]
+
+# Rolling indicators per tracked series, updated in O(1) per data point.
+trend_engine = TrendEngine(
+    window=config("TREND_WINDOW", default=64, cast=int),
+    alpha=config("TREND_EWMA_ALPHA", default=0.1, cast=float),
+    z_threshold=config("TREND_ZSCORE_THRESHOLD", default=3.0, cast=float),
+    max_series=config("TREND_MAX_SERIES", default=50000, cast=int),
+)
+
+def forecast_trend(topic: str, topic_scores: TopicScores) -> Dict[str, Any]:
+    """
+    Folds any articles newer than the topic's last tracked point into its sentiment series,
+    then summarizes the series' current state. Articles already seen are never rescored.
+    """
+    series = f"sentiment:{topic.lower()}"
+    last_seen = trend_engine.last_timestamp(series)
+    for article, score in sorted(zip(topic_scores.articles, topic_scores.scores), key=lambda pair: pair[0].published_at):
+        if last_seen is None or article.published_at > last_seen:
+            trend_engine.update(series, score, article.published_at)
+    return summarize_trend(topic, trend_engine.snapshot(series))
+
+ANALYSIS_TYPES = {"sentiment": summarize_sentiment, "trend_forecast": forecast_trend}
+
+async def analyze_batch(requests: List[AnalysisRequest]):
+    """
+    Yields (index, result) pairs for a batch of analysis requests as they become ready.
+    Each distinct (data_source, topic) is fetched once no matter how many requests share it,
+    and the articles of every fetch that completes in the same round are scored together.
+    """
+    by_key: Dict[Tuple[str, str], List[int]] = {}
+    for index, request in enumerate(requests):
+        if request.analysis_type not in ANALYSIS_TYPES:
+            yield index, {"topic": request.topic, "analysis_type": request.analysis_type, "error": "Invalid analysis type."}
+            continue
+        by_key.setdefault((request.data_source, request.topic), []).append(index)
+
+    fetches = {asyncio.ensure_future(fetch_articles(*key)): key for key in by_key}
+    pending = set(fetches)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            fetched, failed = {}, {}
+            for task in done:
+                if task.exception() is None:
+                    fetched[fetches[task]] = task.result()
+                else:
+                    failed[fetches[task]] = str(task.exception())
+
+            for key, topic_scores in score_topics(fetched).items():
+                for index in by_key[key]:
+                    request = requests[index]
+                    summary = ANALYSIS_TYPES[request.analysis_type](request.topic, topic_scores)
+                    yield index, AnalysisResult(topic=request.topic, analysis_type=request.analysis_type, **summary).model_dump()
+            for key, error in failed.items():
+                for index in by_key[key]:
+                    request = requests[index]
+                    yield index, {"topic": request.topic, "analysis_type": request.analysis_type, "error": error}
+    finally:
+        for task in pending:
+            task.cancel()
+
 @app.post("/analyze-news", response_model=AnalysisResult)
 async def analyze_news(request: AnalysisRequest):
     """
     Analyzes news articles for sentiment or trends related to a topic.
     In a real system, this would fetch news and process it with an NLP model.
     """
-    logger.info(f"Received news analysis request for topic: '{request.topic}'")
+    logger.info("Received news analysis request for topic: '%s'", request.topic)
     
-    if request.analysis_type not in ["sentiment", "trend_forecast"]:
+    if request.analysis_type not in ANALYSIS_TYPES:
         raise HTTPException(status_code=400, detail="Invalid analysis type.")
 
-    # Placeholder for news analysis logic
-    # This would involve fetching articles, then using a language model for analysis.
-    summary_text = f"The sentiment around '{request.topic}' is currently positive, with major announcements driving interest."
-    
-    logger.info("News analysis completed.")
-    
-    return AnalysisResult(
-        topic=request.topic,
-        analysis_type=request.analysis_type,
-        summary=summary_text,
-        confidence_score=0.85,
-        key_points=["Positive Q4 earnings reports", "New product launch well-received"]
-    )
+    # A single request goes through the same pipeline as a batch of one.
+    async for _, result in analyze_batch([request]):
+        if "error" in result:
+            raise HTTPException(status_code=502, detail=result["error"])
+        logger.info("News analysis completed.")
+        return AnalysisResult(**result)
+
+@app.post("/analyze-news/batch")
+async def analyze_news_batch(batch: BatchAnalysisRequest):
+    """
+    Analyzes many (topic, analysis_type) pairs together and streams the results back
+    as newline-delimited JSON, one line per request in completion order. Each line
+    carries the `index` of the request it answers; failed requests carry an `error`.
+    """
+    logger.info("Received batch analysis request with %s items", len(batch.requests))
+
+    async def _lines():
+        async for index, result in analyze_batch(batch.requests):
+            yield serialization.dumps({"index": index, **result}) + b"\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+@app.post("/trends/ingest")
+async def ingest_trend_points(request: TrendIngestRequest):
+    """
+    Adds data points to tracked series (e.g. prices or sentiment scores), creating series on first use.
+    """
+    trend_engine.update_many((point.series, point.value, point.timestamp) for point in request.points)
+    return {"ingested": len(request.points), "tracked_series": len(trend_engine)}
+
+@app.get("/trends/{series}")
+async def get_trend(series: str):
+    """
+    Returns the current rolling indicators of a series: EWMA, mean, std, slope and z-score.
+    """
+    snapshot = trend_engine.snapshot(series)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Series '{series}' is not tracked.")
+    return {"series": series, **snapshot}
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,142 @@
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+from tools.startup import lazy_import
+
+np = lazy_import("numpy")
+
+# Sentiment lexicon: word -> weight. A real deployment would load a domain lexicon or model features.
+LEXICON: Dict[str, float] = {
+    "surge": 1.0, "surges": 1.0, "beat": 0.8, "beats": 0.8, "record": 0.6, "growth": 0.6,
+    "upgrade": 0.8, "upgraded": 0.8, "strong": 0.5, "rally": 0.9, "rallies": 0.9, "wins": 0.7,
+    "breakthrough": 1.0, "profit": 0.5, "launch": 0.3, "well-received": 0.8, "bullish": 1.0,
+    "decline": -0.8, "declines": -0.8, "miss": -0.8, "misses": -0.8, "lawsuit": -0.9, "probe": -0.7,
+    "downgrade": -0.8, "downgraded": -0.8, "weak": -0.5, "slump": -1.0, "slumps": -1.0,
+    "layoffs": -0.7, "loss": -0.6, "recall": -0.7, "bearish": -1.0, "delay": -0.4, "delays": -0.4,
+}
+_LEXICON_INDEX = {word: i for i, word in enumerate(LEXICON)}
+_TOKEN = re.compile(r"[a-z][a-z\-]*")
+
+
+@lru_cache(maxsize=None)
+def _lexicon_weights() -> np.ndarray:
+    return np.array(list(LEXICON.values()), dtype=np.float64)
+
+
+_HEADLINE_TEMPLATES = (
+    "{topic} shares surge after earnings beat",
+    "Analysts upgrade {topic} on strong growth outlook",
+    "{topic} faces probe over accounting practices",
+    "{topic} rally continues as investors turn bullish",
+    "Supply delays weigh on {topic}",
+    "{topic} announces layoffs amid weak demand",
+    "New {topic} product launch well-received by customers",
+    "{topic} posts record profit for the quarter",
+    "Lawsuit filed against {topic} over data practices",
+    "{topic} downgraded as revenue growth slows",
+)
+
+
+class Article(NamedTuple):
+    title: str
+    published_at: float
+
+
+async def fetch_articles(data_source: str, topic: str, count: int = 12) -> List[Article]:
+    """
+    Placeholder for fetching recent articles about a topic from a news or market data feed.
+    Returns a deterministic set of headlines per topic so results are reproducible.
+    """
+    await asyncio.sleep(0)
+    seed = zlib.crc32(f"{data_source}:{topic.lower()}".encode())
+    # One article per hour, keyed by the absolute hour so repeated fetches agree on past articles.
+    current_hour = int(time.time() // 3600)
+    return [
+        Article(
+            title=_HEADLINE_TEMPLATES[(seed + hour * 7) % len(_HEADLINE_TEMPLATES)].format(topic=topic),
+            published_at=hour * 3600.0,
+        )
+        for hour in range(current_hour - count + 1, current_hour + 1)
+    ]
+
+
+def score_articles(titles: List[str]) -> np.ndarray:
+    """
+    Scores many articles in one vectorized pass: each article's score is the
+    lexicon-weighted sum of its matching tokens, normalised to [-1, 1].
+    """
+    article_ids, lexicon_ids = [], []
+    for article_id, title in enumerate(titles):
+        for token in _TOKEN.findall(title.lower()):
+            lexicon_id = _LEXICON_INDEX.get(token)
+            if lexicon_id is not None:
+                article_ids.append(article_id)
+                lexicon_ids.append(lexicon_id)
+
+    n = len(titles)
+    article_ids = np.asarray(article_ids, dtype=np.int64)
+    weights = _lexicon_weights()[np.asarray(lexicon_ids, dtype=np.int64)]
+    raw = np.bincount(article_ids, weights=weights, minlength=n)
+    hits = np.bincount(article_ids, minlength=n)
+    return np.tanh(raw / np.sqrt(np.maximum(hits, 1)))
+
+
+class TopicScores(NamedTuple):
+    articles: List[Article]
+    scores: np.ndarray  # One score per article, aligned with `articles`
+
+
+def score_topics(fetched: Dict[Tuple[str, str], List[Article]]) -> Dict[Tuple[str, str], TopicScores]:
+    """Scores the articles of several topics together and splits the scores back out per topic."""
+    keys = list(fetched)
+    titles = [article.title for key in keys for article in fetched[key]]
+    scores = score_articles(titles)
+    bounds = np.cumsum([0] + [len(fetched[key]) for key in keys])
+    return {key: TopicScores(fetched[key], scores[bounds[i]:bounds[i + 1]]) for i, key in enumerate(keys)}
+
+
+def sentiment_label(score: float) -> str:
+    if score > 0.1:
+        return "positive"
+    if score < -0.1:
+        return "negative"
+    return "neutral"
+
+
+def summarize_sentiment(topic: str, topic_scores: TopicScores) -> Dict[str, object]:
+    scores = topic_scores.scores
+    overall = float(scores.mean()) if scores.size else 0.0
+    label = sentiment_label(overall)
+    # Confidence is the share of articles that agree with the overall direction.
+    agreeing = np.sign(scores) == np.sign(overall) if label != "neutral" else np.abs(scores) <= 0.1
+    confidence = float(agreeing.mean()) if scores.size else 0.0
+    strongest = np.argsort(-np.abs(scores))[:2]
+    return {
+        "summary": f"The sentiment around '{topic}' is currently {label} (score {overall:+.2f} across {scores.size} articles).",
+        "confidence_score": round(confidence, 3),
+        "key_points": [topic_scores.articles[i].title for i in strongest],
+    }
+
+
+def summarize_trend(topic: str, trend: Dict[str, object]) -> Dict[str, object]:
+    """Summarizes the incremental trend state of a topic's sentiment series (see TrendEngine.snapshot)."""
+    slope = trend["slope"]
+    direction = "improving" if slope > 0.01 else "deteriorating" if slope < -0.01 else "stable"
+    key_points = [
+        f"Smoothed sentiment (EWMA) is {trend['ewma']:+.2f} over the last {trend['window_size']} articles.",
+        f"Latest article z-score is {trend['zscore']:+.2f}.",
+    ]
+    if trend["breakout"]:
+        key_points.append("The latest article is a statistical breakout from recent coverage.")
+    return {
+        "summary": f"Coverage of '{topic}' is {direction} (slope {slope:+.3f} per article).",
+        "confidence_score": round(min(0.99, trend["window_size"] / 32), 3),
+        "key_points": key_points,
+    }
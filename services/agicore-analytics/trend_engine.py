@@ -0,0 +1,181 @@
+
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from tools.startup import lazy_import
+
+np = lazy_import("numpy")
+
+# Per-series scalar state, one column each in TrendEngine._state.
+(
+    COUNT,  # Points ingested over the lifetime of the series
+    FILLED,  # Points currently in the rolling window (<= window)
+    POS,  # Ring slot the next point is written to
+    LAST,  # Most recent value
+    LAST_TS,  # Timestamp of the most recent value
+    EWMA,
+    MEAN,  # Mean of the values in the window
+    M2,  # Sum of squared deviations from the mean in the window (Welford)
+    ANCHOR,  # Offset subtracted from values in SUM_XY, so the slope does not cancel large magnitudes
+    SUM_XY,  # Sum of (position in window * (value - ANCHOR)), oldest point at position 0
+    ZSCORE,  # Z-score of the latest value against the window before it arrived
+    BREAKOUTS,  # Number of points whose |z-score| crossed the threshold
+    LAST_BREAKOUT_TS,
+) = range(13)
+_STATE_COLUMNS = 13
+
+
+class TrendEngine:
+    """
+    Incremental trend indicators for many series, updated in O(1) per data point.
+
+    Each series keeps an EWMA, a rolling mean/variance and a least-squares slope over
+    the last `window` points, plus the z-score of the newest point against that window.
+    All state lives in two preallocated NumPy arrays (one row per series), so memory
+    per series is fixed at `window + 13` floats regardless of how long it has run.
+    The mean and variance use Welford's updates, and every `window` points the running
+    sums are recomputed from the window, so rounding error cannot build up on long series.
+    When `max_series` is reached the least recently updated series is evicted.
+    """
+
+    def __init__(self, window: int = 64, alpha: float = 0.1, z_threshold: float = 3.0, max_series: int = 50000, initial_capacity: int = 1024):
+        if window < 2:
+            raise ValueError("Window must hold at least two points.")
+        self.window = window
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.max_series = max_series
+        self._initial_capacity = min(initial_capacity, max_series)
+        # Allocated with the first series, so an idle engine costs nothing at startup.
+        self._values: Optional[np.ndarray] = None
+        self._state: Optional[np.ndarray] = None
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # Least recently updated first
+        self._rows = 0  # Rows handed out so far
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def last_timestamp(self, key: str) -> Optional[float]:
+        row = self._index.get(key)
+        return None if row is None else float(self._state[row, LAST_TS])
+
+    def _row_for(self, key: str) -> int:
+        row = self._index.get(key)
+        if row is not None:
+            self._index.move_to_end(key)
+            return row
+        if self._state is None:
+            self._values = np.zeros((self._initial_capacity, self.window), dtype=np.float64)
+            self._state = np.zeros((self._initial_capacity, _STATE_COLUMNS), dtype=np.float64)
+        if len(self._index) >= self.max_series:
+            _, row = self._index.popitem(last=False)
+            self.evictions += 1
+        else:
+            row = self._rows
+            self._rows += 1
+            if row >= len(self._state):
+                extra = min(len(self._state), self.max_series - len(self._state))
+                self._values = np.vstack([self._values, np.zeros((extra, self.window))])
+                self._state = np.vstack([self._state, np.zeros((extra, _STATE_COLUMNS))])
+        self._values[row] = 0.0
+        self._state[row] = 0.0
+        self._index[key] = row
+        return row
+
+    def update(self, key: str, value: float, timestamp: Optional[float] = None):
+        """Folds one new data point into the series' indicators."""
+        row = self._row_for(key)
+        s = self._state[row]
+        values = self._values[row]
+        value = float(value)
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        n = int(s[FILLED])
+
+        # Z-score against the window as it was before this point.
+        if n >= 2:
+            mean = s[MEAN]
+            variance = max(s[M2] / n, 0.0)
+            z = (value - mean) / math.sqrt(variance) if variance > 1e-12 else 0.0
+        else:
+            z = 0.0
+        s[ZSCORE] = z
+        if abs(z) >= self.z_threshold:
+            s[BREAKOUTS] += 1
+            s[LAST_BREAKOUT_TS] = timestamp
+
+        if s[COUNT] == 0:
+            s[ANCHOR] = value
+        pos = int(s[POS])
+        if n == self.window:
+            # Slide: drop the oldest point and shift every remaining position down by one.
+            oldest = values[pos]
+            s[SUM_XY] -= n * (s[MEAN] - s[ANCHOR]) - (oldest - s[ANCHOR])
+            n -= 1
+            delta = oldest - s[MEAN]
+            s[MEAN] -= delta / n
+            s[M2] -= delta * (oldest - s[MEAN])
+        s[SUM_XY] += n * (value - s[ANCHOR])
+        delta = value - s[MEAN]
+        s[MEAN] += delta / (n + 1)
+        s[M2] = max(s[M2] + delta * (value - s[MEAN]), 0.0)
+        values[pos] = value
+        s[POS] = (pos + 1) % self.window
+        s[FILLED] = n + 1
+        if s[POS] == 0 and n + 1 == self.window:
+            # Once per window (amortized O(1)), recompute from the window, oldest point first.
+            s[MEAN] = values.mean()
+            s[M2] = float(np.square(values - s[MEAN]).sum())
+            s[ANCHOR] = s[MEAN]
+            s[SUM_XY] = float(np.dot(np.arange(self.window), values - s[ANCHOR]))
+
+        s[EWMA] = value if s[COUNT] == 0 else self.alpha * value + (1 - self.alpha) * s[EWMA]
+        s[COUNT] += 1
+        s[LAST] = value
+        s[LAST_TS] = timestamp
+
+    def update_many(self, points: Iterable[Tuple[str, float, Optional[float]]]):
+        for key, value, timestamp in points:
+            self.update(key, value, timestamp)
+
+    def snapshot(self, key: str) -> Optional[Dict[str, float]]:
+        """Reads the current indicators of a series without rescanning its history."""
+        row = self._index.get(key)
+        if row is None:
+            return None
+        s = self._state[row]
+        n = int(s[FILLED])
+        mean = s[MEAN]
+        variance = max(s[M2] / n, 0.0)
+        # Least-squares slope over positions 0..n-1, from the running sums (of values less ANCHOR,
+        # which leaves the slope unchanged).
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * sum_xx - sum_x * sum_x
+        slope = (n * s[SUM_XY] - sum_x * n * (mean - s[ANCHOR])) / denominator if denominator else 0.0
+        return {
+            "count": int(s[COUNT]),
+            "window_size": n,
+            "last": float(s[LAST]),
+            "last_timestamp": float(s[LAST_TS]),
+            "ewma": float(s[EWMA]),
+            "mean": float(mean),
+            "std": math.sqrt(variance),
+            "slope": float(slope),
+            "zscore": float(s[ZSCORE]),
+            "breakout": bool(abs(s[ZSCORE]) >= self.z_threshold),
+            "breakouts": int(s[BREAKOUTS]),
+            "last_breakout_timestamp": float(s[LAST_BREAKOUT_TS]) or None,
+        }
+
+    def memory_bytes(self) -> int:
+        if self._state is None:
+            return 0
+        return self._values.nbytes + self._state.nbytes
@@ -0,0 +1,238 @@
+
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A unit of work submitted to the queue, with its lifecycle timestamps."""
+
+    def __init__(self, payload: Any, priority: int = 5, callback_url: Optional[str] = None):
+        self.id = f"job_{uuid.uuid4().hex[:12]}"
+        self.payload = payload
+        self.priority = priority
+        self.callback_url = callback_url
+        self.status = "queued"  # "queued", "running", "completed" or "failed"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.batch_size: Optional[int] = None
+        self.done = asyncio.Event()
+
+    def finish(self, result: Any = None, error: Optional[str] = None):
+        self.status = "failed" if error else "completed"
+        self.result, self.error = result, error
+        self.finished_at = time.time()
+        self.done.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "batch_size": self.batch_size,
+        }
+
+
+# Processes a batch of payloads and returns one result per payload, in order.
+BatchProcessor = Callable[[List[Any]], Awaitable[List[Any]]]
+# Notified once per finished job, e.g. to deliver a completion callback.
+CompletionHook = Callable[[Job], Awaitable[None]]
+
+
+class BatchingJobQueue:
+    """
+    Priority queue drained by a pool of workers that group compatible jobs into batches.
+
+    A worker takes the most urgent job (lowest priority number, then oldest), waits up to
+    `batch_window` seconds for more work, and pulls queued jobs with the same batch key into
+    one call to the processor. It looks at no more than the next `max_batch_size` jobs, so a
+    batch never costs more than that however deep the queue is; incompatible jobs are put
+    back in their original order. At most `max_queued` jobs wait at once (submit raises
+    asyncio.QueueFull past that). Finished jobs are retained for polling up to `max_retained`.
+    """
+
+    def __init__(
+        self,
+        process_batch: BatchProcessor,
+        batch_key: Callable[[Any], Hashable],
+        workers: int = 2,
+        max_batch_size: int = 8,
+        batch_window: float = 0.02,
+        max_retained: int = 10000,
+        max_queued: int = 1000,
+        on_complete: Optional[CompletionHook] = None,
+    ):
+        self.process_batch = process_batch
+        self.batch_key = batch_key
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_retained = max_retained
+        self.max_queued = max_queued
+        self.on_complete = on_complete
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self._callbacks: Set[asyncio.Task] = set()  # Referenced until done, so they are not garbage collected
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched_jobs = 0
+        self.max_batch_seen = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue(maxsize=self.max_queued)
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def submit(self, payload: Any, priority: int = 5, callback_url: Optional[str] = None) -> Job:
+        """Queues a job. Raises asyncio.QueueFull when `max_queued` jobs are already waiting."""
+        self._ensure_started()
+        job = Job(payload, priority, callback_url)
+        self._queue.put_nowait((priority, next(self._sequence), job))
+        self._jobs[job.id] = job
+        self._evict_finished()
+        self.submitted += 1
+        return job
+
+    def complete_immediately(self, payload: Any, result: Any, callback_url: Optional[str] = None) -> Job:
+        """Records a job whose result is already known (e.g. a cache hit) without queueing it."""
+        job = Job(payload, callback_url=callback_url)
+        job.started_at = job.submitted_at
+        job.finish(result)
+        self._jobs[job.id] = job
+        self._evict_finished()
+        self.submitted += 1
+        self.completed += 1
+        self._notify([job])
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Long-polls a job: returns as soon as it finishes, or after `timeout` seconds."""
+        job = self._jobs.get(job_id)
+        if job is not None and timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _evict_finished(self):
+        if len(self._jobs) <= self.max_retained:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done.is_set()]:
+            del self._jobs[job_id]
+            if len(self._jobs) <= self.max_retained:
+                break
+
+    async def _next_batch(self) -> List[Job]:
+        _, _, first = await self._queue.get()
+        if self.batch_window > 0 and self._queue.qsize() < self.max_batch_size - 1:
+            # Give compatible jobs that are about to arrive a chance to join this batch.
+            await asyncio.sleep(self.batch_window)
+
+        key = self.batch_key(first.payload)
+        batch, put_back = [first], []
+        for _ in range(self.max_batch_size):
+            if len(batch) == self.max_batch_size or self._queue.empty():
+                break
+            entry = self._queue.get_nowait()
+            if self.batch_key(entry[2].payload) == key:
+                batch.append(entry[2])
+            else:
+                put_back.append(entry)
+        for entry in put_back:
+            self._queue.put_nowait(entry)
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            now = time.time()
+            for job in batch:
+                job.status, job.started_at, job.batch_size = "running", now, len(batch)
+                wait = now - job.submitted_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            self.batches += 1
+            self.batched_jobs += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            try:
+                results = await self.process_batch([job.payload for job in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch processor returned {len(results)} results for {len(batch)} jobs.")
+                for job, result in zip(batch, results):
+                    job.finish(result)
+                self.completed += len(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Batch of %s jobs failed: %s", len(batch), e)
+                for job in batch:
+                    job.finish(error=str(e))
+                self.failed += len(batch)
+
+            self._notify(batch)
+
+    def _notify(self, jobs: List[Job]):
+        if self.on_complete is None:
+            return
+        for job in jobs:
+            if job.callback_url:
+                task = asyncio.create_task(self.on_complete(job))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+
+    def metrics(self) -> Dict[str, Any]:
+        started = self.batched_jobs
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.max_queued,
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_jobs / self.batches, 3) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_wait_seconds": round(self.total_wait / started, 6) if started else 0.0,
+            "max_wait_seconds": round(self.max_wait, 6),
+        }
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        # Let completion callbacks that are already on their way finish.
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
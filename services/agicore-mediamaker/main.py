@@ -1,28 +1,143 @@
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import logging
-from typing import Dict, Any
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field
+from decouple import Csv, config
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import json
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+from tools.cache import AsyncTTLCache
+from tools.http_client import close_http_client, get_http_client
+from tools.idempotency import install_idempotency
+from tools.metrics import install_metrics
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+from tools.startup import install_fast_start
+from tools.tracing import install_tracing
+from tools.utils import configure_logging, get_logger
+from job_queue import BatchingJobQueue, Job
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging("agicore-mediamaker")
+# Per-request INFO logs are rate limited; warnings and errors always get through.
+logger = get_logger(__name__, per_second=config("LOG_REQUESTS_PER_SECOND", default=200.0, cast=float))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await image_jobs.stop()
+    await close_http_client()
 
 app = FastAPI(
     title="AGIcore - MediaMaker Agent",
     description="A micro-agent for generating images and other media content.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
+app.add_middleware(SerializationMiddleware)
+install_idempotency(app)
+install_metrics(app, service="agicore-mediamaker")
+install_tracing(app, service="agicore-mediamaker")
+install_fast_start(app)
 
 class ImageRequest(BaseModel):
     prompt: str
     style: str = "photorealistic"
     aspect_ratio: str = "16:9"
 
+class ImageJobRequest(ImageRequest):
+    priority: int = Field(5, ge=0, le=9) # 0 is the most urgent
+    callback_url: Optional[str] = None # Receives the finished job as a JSON POST
+
 class ImageResponse(BaseModel):
     prompt: str
     image_url: str
     model_used: str
+    content_hash: str # Stable digest of (prompt, style, aspect_ratio, model)
+
+MODEL_NAME = "gemini-1.5-pro-image"
+
+# Job callbacks are only POSTed to these hosts (".example.com" also allows its subdomains), so a
+# client cannot make the agent call internal services or the metadata server. Empty disables callbacks.
+CALLBACK_ALLOWED_HOSTS = [host.lower() for host in config("IMAGE_JOB_CALLBACK_HOSTS", default="", cast=Csv())]
+CALLBACK_ALLOWED_SCHEMES = set(config("IMAGE_JOB_CALLBACK_SCHEMES", default="https", cast=Csv()))
+
+# Generated artifacts keyed by content hash. Concurrent identical requests share one generation.
+image_cache = AsyncTTLCache(
+    ttl=config("IMAGE_CACHE_TTL", default=86400.0, cast=float),
+    maxsize=config("IMAGE_CACHE_SIZE", default=10000, cast=int),
+)
+
+def content_hash(request: ImageRequest, model: str = MODEL_NAME) -> str:
+    """
+    Returns a digest of everything that determines the generated image.
+    Unlike the built-in hash(), this is identical on every process and replica.
+    """
+    canonical = json.dumps(
+        [" ".join(request.prompt.split()), request.style, request.aspect_ratio, model],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+async def render_images(requests: List[ImageRequest], digests: List[str]) -> List[Dict[str, Any]]:
+    """
+    Calls the generative model once for a batch of compatible prompts and stores each
+    result under its content hash.
+    In a real scenario, this would be an async call to a model like DALL-E, Midjourney, or Gemini.
+    """
+    logger.info("Generating %s new image(s) using model '%s'.", len(requests), MODEL_NAME)
+    return [
+        {
+            "image_url": f"https://storage.googleapis.com/agicore-media/generated/{digest}.jpg",
+            "model_used": MODEL_NAME,
+        }
+        for digest in digests
+    ]
+
+async def render_image(request: ImageRequest, digest: str) -> Dict[str, Any]:
+    return (await render_images([request], [digest]))[0]
+
+async def process_image_jobs(requests: List[ImageRequest]) -> List[Dict[str, Any]]:
+    """Renders a batch of queued requests and caches the artifacts for later identical requests."""
+    digests = [content_hash(request) for request in requests]
+    artifacts = await render_images(requests, digests)
+    results = []
+    for request, digest, artifact in zip(requests, digests, artifacts):
+        image_cache.put(digest, artifact)
+        results.append(ImageResponse(prompt=request.prompt, content_hash=digest, **artifact).model_dump())
+    return results
+
+def callback_url_allowed(url: str) -> bool:
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        parts.port  # Raises ValueError for a malformed port
+    except ValueError:
+        return False
+    if parts.scheme not in CALLBACK_ALLOWED_SCHEMES or not host or parts.username or parts.password:
+        return False
+    return any(host == allowed or (allowed.startswith(".") and host.endswith(allowed)) for allowed in CALLBACK_ALLOWED_HOSTS)
+
+async def deliver_callback(job: Job):
+    try:
+        # Redirects are not followed, since they could lead off the allowlist.
+        await get_http_client().post(job.callback_url, json=job.to_dict(), follow_redirects=False)
+    except Exception as e:
+        logger.warning("Callback for %s to %s failed: %s", job.id, job.callback_url, e)
+
+# Prompts with the same style and aspect ratio can share one model call.
+image_jobs = BatchingJobQueue(
+    process_batch=process_image_jobs,
+    batch_key=lambda request: (request.style, request.aspect_ratio),
+    workers=config("IMAGE_JOB_WORKERS", default=2, cast=int),
+    max_batch_size=config("IMAGE_JOB_MAX_BATCH", default=8, cast=int),
+    batch_window=config("IMAGE_JOB_BATCH_WINDOW", default=0.02, cast=float),
+    max_queued=config("IMAGE_JOB_MAX_QUEUED", default=1000, cast=int),
+    on_complete=deliver_callback,
+)
 
 @app.post("/generate-image", response_model=ImageResponse)
 async def generate_image(request: ImageRequest):
@@ -30,24 +145,69 @@ async def generate_image(request: ImageRequest):
     Generates an image based on a text prompt.
     In a real system, this would call a generative AI model endpoint.
     """
-    logger.info(f"Received image generation request with prompt: '{request.prompt}'")
+    logger.info("Received image generation request with prompt: '%s'", request.prompt)
     
     if not request.prompt:
         raise HTTPException(status_code=400, detail="Prompt cannot be empty.")
 
-    # Placeholder for image generation logic
-    # In a real scenario, this would be an async call to a model like DALL-E, Midjourney, or Gemini
-    model_name = "gemini-1.5-pro-image"
-    generated_image_url = f"https://storage.googleapis.com/agicore-media/generated/{hash(request.prompt)}.jpg"
-    
-    logger.info(f"Image generated successfully using model '{model_name}'.")
-    
+    digest = content_hash(request)
+    artifact = await image_cache.get_or_load(digest, lambda: render_image(request, digest))
+
+    logger.info("Image %s served at %s.", digest[:12], artifact['image_url'])
+
     return ImageResponse(
         prompt=request.prompt,
-        image_url=generated_image_url,
-        model_used=model_name
+        image_url=artifact["image_url"],
+        model_used=artifact["model_used"],
+        content_hash=digest
     )
 
+@app.get("/generate-image/cache")
+async def image_cache_stats():
+    """Returns hit, miss and coalesced counts for the generated-image cache."""
+    return image_cache.stats()
+
+@app.post("/jobs/generate-image", status_code=202)
+async def submit_image_job(request: ImageJobRequest):
+    """
+    Queues an image generation and returns a job id immediately.
+    Fetch the result from /jobs/{job_id} (optionally long-polling with `wait`) or via `callback_url`.
+    """
+    if not request.prompt:
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty.")
+    if request.callback_url is not None and not callback_url_allowed(request.callback_url):
+        raise HTTPException(status_code=400, detail="callback_url is not on the allowed list of callback hosts.")
+
+    image_request = ImageRequest(prompt=request.prompt, style=request.style, aspect_ratio=request.aspect_ratio)
+    digest = content_hash(image_request)
+    cached = image_cache.get(digest)
+    if cached is not None:
+        result = ImageResponse(prompt=request.prompt, content_hash=digest, **cached).model_dump()
+        job = image_jobs.complete_immediately(image_request, result, request.callback_url)
+    else:
+        try:
+            job = image_jobs.submit(image_request, request.priority, request.callback_url)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Image job queue is full.", headers={"Retry-After": "1"})
+    logger.info("Image job %s accepted with status '%s'.", job.id, job.status)
+    return job.to_dict()
+
+@app.get("/jobs/metrics")
+async def image_job_metrics():
+    """Returns queue depth, wait time and batch size metrics for the image job queue."""
+    return image_jobs.metrics()
+
+@app.get("/jobs/{job_id}")
+async def get_image_job(job_id: str, wait: float = Query(0.0, ge=0.0, le=30.0)):
+    """
+    Returns a job's status and, once finished, its result.
+    With `wait` > 0 the request is held until the job finishes or `wait` seconds pass.
+    """
+    job = await image_jobs.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
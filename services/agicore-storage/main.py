@@ -1,18 +1,41 @@
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import logging
-from typing import Dict, Any
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from decouple import config
+import asyncio
+import mimetypes
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Tuple, Type
+
+from tools import serialization
+from tools.idempotency import install_idempotency
+from tools.metrics import install_metrics
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+from tools.startup import install_fast_start
+from tools.tracing import install_tracing
+from tools.utils import configure_logging, get_logger
+
+from object_store import (
+    GroupCommitter, InvalidObjectName, LocalFileObjectStore, ObjectNotFound, ObjectStore, RangeNotSatisfiable,
+    parse_range,
+)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging("agicore-storage")
+# Per-request INFO logs are rate limited; warnings and errors always get through.
+logger = get_logger(__name__, per_second=config("LOG_REQUESTS_PER_SECOND", default=200.0, cast=float))
 
 app = FastAPI(
     title="AGIcore - Storage Agent",
     description="A micro-agent for interacting with storage solutions like buckets and databases.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
+app.add_middleware(SerializationMiddleware)
+install_idempotency(app)
+install_metrics(app, service="agicore-storage")
+install_tracing(app, service="agicore-storage")
+install_fast_start(app)
 
 class StorageObject(BaseModel):
     bucket: str
@@ -23,26 +46,86 @@ class RetrievalRequest(BaseModel):
     bucket: str
     key: str
 
+STORAGE_FSYNC = config("STORAGE_FSYNC", default=True, cast=bool)
+STORAGE_BULK_CONCURRENCY = config("STORAGE_BULK_CONCURRENCY", default=64, cast=int)
+STORAGE_BULK_MAX_ITEMS = config("STORAGE_BULK_MAX_ITEMS", default=10000, cast=int)
+
+def parse_bucket_codecs(spec: str) -> Dict[str, str]:
+    """Parses STORAGE_COMPRESSION, e.g. "agicore-reports=zstd,agicore-archive=gzip"."""
+    codecs = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        bucket, _, codec = entry.partition("=")
+        codec = codec.strip().lower()
+        if codec not in serialization.CODECS:
+            raise ValueError(f"Unknown compression codec '{codec}' for bucket '{bucket.strip()}'.")
+        codecs[bucket.strip()] = codec
+    return codecs
+
+# JSON objects at least STORAGE_COMPRESSION_MIN_BYTES long are compressed with their bucket's codec.
+# Reads detect the codec from the stored bytes, so changing a bucket's codec never breaks old objects.
+STORAGE_BUCKET_CODECS = parse_bucket_codecs(config("STORAGE_COMPRESSION", default=""))
+STORAGE_DEFAULT_CODEC = config("STORAGE_COMPRESSION_DEFAULT", default="none")
+STORAGE_COMPRESSION_MIN_BYTES = config("STORAGE_COMPRESSION_MIN_BYTES", default=1024, cast=int)
+
+def encode_content(bucket: str, content: Dict[str, Any]) -> bytes:
+    data = serialization.dumps(content)
+    codec = STORAGE_BUCKET_CODECS.get(bucket, STORAGE_DEFAULT_CODEC)
+    if codec != "none" and len(data) >= STORAGE_COMPRESSION_MIN_BYTES:
+        data = serialization.compress(data, codec)
+    return data
+
+def decode_content(data: bytes) -> Any:
+    return serialization.loads(serialization.decompress(data))
+
+# Concurrent writes share one sync/rename pass, waiting at most STORAGE_GROUP_COMMIT_DELAY_MS for company.
+committer = None
+if config("STORAGE_GROUP_COMMIT", default=True, cast=bool):
+    committer = GroupCommitter(
+        max_delay=config("STORAGE_GROUP_COMMIT_DELAY_MS", default=2.0, cast=float) / 1000,
+        max_batch=config("STORAGE_GROUP_COMMIT_MAX_BATCH", default=256, cast=int),
+        fsync=STORAGE_FSYNC,
+        syncfs=config("STORAGE_GROUP_COMMIT_SYNCFS", default=True, cast=bool),
+    )
+
+# Objects are persisted through a pluggable backend; the local filesystem one lays buckets out as directories.
+object_store: ObjectStore = LocalFileObjectStore(
+    root=config("STORAGE_ROOT", default="./data/objects"),
+    fsync=STORAGE_FSYNC,
+    committer=committer,
+)
+
+def _bad_name(e: InvalidObjectName) -> HTTPException:
+    return HTTPException(status_code=400, detail=str(e))
+
+def _storage_error(e: OSError) -> Tuple[int, str]:
+    """The status code and detail for a filesystem error while writing an object."""
+    if isinstance(e, (FileExistsError, NotADirectoryError, IsADirectoryError)):
+        # E.g. key "a/b/c" when "a/b" is an object, or "a/b" when objects live under "a/b/".
+        return 409, "Object key conflicts with an existing object."
+    logger.error("Storage error: %s", e)
+    return 500, "Storage error."
+
 @app.post("/store-object", response_model=Dict[str, str])
 async def store_object(obj: StorageObject):
     """
     Stores a JSON object in a specified storage bucket.
     In a real system, this would connect to a cloud storage provider (e.g., GCS, S3).
     """
-    logger.info(f"Storing object in bucket '{obj.bucket}' with key '{obj.key}'")
+    logger.info("Storing object in bucket '%s' with key '%s'", obj.bucket, obj.key)
     
     if not obj.bucket or not obj.key:
         raise HTTPException(status_code=400, detail="Bucket and key are required.")
 
-    # Placeholder for storage logic
-    # In a real implementation:
-    # storage_client = storage.Client()
-    # bucket = storage_client.bucket(obj.bucket)
-    # blob = bucket.blob(obj.key)
-    # blob.upload_from_string(obj.content.json(), content_type="application/json")
-    
-    object_url = f"gs://{obj.bucket}/{obj.key}"
-    logger.info(f"Object successfully stored at {object_url}")
+    try:
+        await object_store.put_bytes(obj.bucket, obj.key, encode_content(obj.bucket, obj.content))
+    except InvalidObjectName as e:
+        raise _bad_name(e)
+    except OSError as e:
+        status_code, detail = _storage_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    object_url = object_store.url(obj.bucket, obj.key)
+    logger.info("Object successfully stored at %s", object_url)
     
     return {"status": "success", "url": object_url}
 
@@ -51,17 +134,193 @@ async def retrieve_object(req: RetrievalRequest):
     """
     Retrieves an object from a storage bucket.
     """
-    logger.info(f"Retrieving object from bucket '{req.bucket}' with key '{req.key}'")
+    logger.info("Retrieving object from bucket '%s' with key '%s'", req.bucket, req.key)
 
-    # Placeholder for retrieval logic
-    # This would download the object from the bucket and parse it.
-    if req.key != "some/existing/object.json":
+    try:
+        data = await object_store.get_bytes(req.bucket, req.key)
+    except InvalidObjectName as e:
+        raise _bad_name(e)
+    except ObjectNotFound:
         raise HTTPException(status_code=404, detail="Object not found.")
 
+    try:
+        content = decode_content(data)
+    except ValueError:
+        raise HTTPException(status_code=415, detail="Object is not a JSON document; use GET /objects/{bucket}/{key}.")
+
     return StorageObject(
         bucket=req.bucket,
         key=req.key,
-        content={"message": "This is a retrieved object."}
+        content=content
+    )
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """Yields the non-empty lines of an NDJSON request body as they arrive."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+def _error_line(index: int, status_code: int, detail: str) -> Dict[str, Any]:
+    return {"index": index, "status": "error", "status_code": status_code, "error": detail}
+
+async def _bulk(
+    request: Request,
+    model: Type[BaseModel],
+    operation: Callable[[Any], Awaitable[Dict[str, Any]]],
+) -> StreamingResponse:
+    """
+    Runs `operation` for every NDJSON line of the request and streams one NDJSON result
+    line back per input line, in completion order. Work on a line starts as soon as it
+    has been received; at most STORAGE_BULK_CONCURRENCY lines are in flight, which also
+    throttles how fast the request body is read.
+    """
+    semaphore = asyncio.Semaphore(STORAGE_BULK_CONCURRENCY)
+
+    async def _one(index: int, line: bytes) -> Dict[str, Any]:
+        try:
+            item = model.model_validate_json(line)
+            return {"index": index, "status": "success", **await operation(item)}
+        except ValidationError as e:
+            return _error_line(index, 400, f"Invalid item: {e.errors()[0]['msg']}")
+        except InvalidObjectName as e:
+            return _error_line(index, 400, str(e))
+        except ObjectNotFound:
+            return _error_line(index, 404, "Object not found.")
+        except ValueError:
+            return _error_line(index, 415, "Object is not a JSON document.")
+        except OSError as e:
+            return _error_line(index, *_storage_error(e))
+        finally:
+            semaphore.release()
+
+    tasks = []
+    try:
+        async for line in _ndjson_lines(request):
+            if len(tasks) >= STORAGE_BULK_MAX_ITEMS:
+                raise HTTPException(status_code=413, detail=f"At most {STORAGE_BULK_MAX_ITEMS} items per request.")
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(_one(len(tasks), line)))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    async def _results():
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield serialization.dumps(await next_result) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(_results(), media_type="application/x-ndjson")
+
+async def _store_one(obj: StorageObject) -> Dict[str, Any]:
+    await object_store.put_bytes(obj.bucket, obj.key, encode_content(obj.bucket, obj.content))
+    return {"bucket": obj.bucket, "key": obj.key, "url": object_store.url(obj.bucket, obj.key)}
+
+async def _retrieve_one(req: RetrievalRequest) -> Dict[str, Any]:
+    data = await object_store.get_bytes(req.bucket, req.key)
+    return {"bucket": req.bucket, "key": req.key, "content": decode_content(data)}
+
+@app.post("/delete-object", response_model=Dict[str, str])
+async def delete_object(req: RetrievalRequest):
+    """
+    Deletes an object from a storage bucket. Deleting an object that does not exist is not
+    an error, so the call is safe to repeat, e.g. when it compensates a store in a rolled back plan.
+    """
+    logger.info("Deleting object from bucket '%s' with key '%s'", req.bucket, req.key)
+
+    try:
+        deleted = await object_store.delete(req.bucket, req.key)
+    except InvalidObjectName as e:
+        raise _bad_name(e)
+    return {"status": "deleted" if deleted else "not_found"}
+
+@app.post("/store-objects")
+async def store_objects(request: Request):
+    """
+    Stores many JSON objects in one call. The body is NDJSON, one `StorageObject` per line;
+    the response streams one `{"index", "status", "url"}` line per stored object.
+    Concurrent writes share the group committer's sync and rename passes.
+    """
+    logger.info("Received bulk store request")
+    return await _bulk(request, StorageObject, _store_one)
+
+@app.post("/retrieve-objects")
+async def retrieve_objects(request: Request):
+    """
+    Retrieves many JSON objects in one call. The body is NDJSON, one `{"bucket", "key"}` per line;
+    the response streams one `{"index", "status", "content"}` line per object as it is read.
+    """
+    logger.info("Received bulk retrieve request")
+    return await _bulk(request, RetrievalRequest, _retrieve_one)
+
+@app.get("/store-objects/metrics")
+async def group_commit_metrics():
+    if committer is None:
+        return {"enabled": False}
+    return {"enabled": True, **committer.stats()}
+
+@app.put("/objects/{bucket}/{key:path}", response_model=Dict[str, Any])
+async def upload_object(bucket: str, key: str, request: Request):
+    """
+    Stores the raw request body as an object, streaming it to disk chunk by chunk.
+    The object only becomes visible once the upload has completed.
+    """
+    logger.info("Streaming upload to bucket '%s' with key '%s'", bucket, key)
+    try:
+        info = await object_store.put_stream(bucket, key, request.stream())
+    except InvalidObjectName as e:
+        raise _bad_name(e)
+    except OSError as e:
+        status_code, detail = _storage_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+    return {"status": "success", "url": object_store.url(bucket, key), "size": info.size}
+
+@app.get("/objects/{bucket}/{key:path}")
+async def download_object(bucket: str, key: str, request: Request):
+    """
+    Streams an object back to the client. Supports single-range `Range: bytes=...` requests.
+    """
+    try:
+        # Opened in a worker thread; the size comes from the open file, so an object replaced
+        # in the meantime cannot make the headers disagree with the body.
+        reader = await asyncio.to_thread(object_store.open_object, bucket, key)
+    except InvalidObjectName as e:
+        raise _bad_name(e)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Object not found.")
+
+    info = reader.info
+    try:
+        byte_range = parse_range(request.headers.get("range"), info.size)
+    except RangeNotSatisfiable as e:
+        reader.close()
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{e.size}"})
+    start, end = byte_range or (0, info.size - 1)
+    # The chunk iterator is blocking (mmap reads), so Starlette runs it in a worker thread.
+    chunks = reader.iter_range(start, end)
+
+    headers = {"Accept-Ranges": "bytes"}
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    status_code = 200
+    if byte_range is not None:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    headers["Content-Length"] = str(max(0, end - start + 1))
+
+    return StreamingResponse(
+        chunks,
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
     )
 
 @app.get("/health")
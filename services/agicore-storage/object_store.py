@@ -0,0 +1,448 @@
+
+import asyncio
+import ctypes
+import logging
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_BUCKET_NAME = re.compile(r"^[a-z0-9][a-z0-9._-]{1,62}$")
+CHUNK_SIZE = 256 * 1024
+
+
+class ObjectNotFound(KeyError):
+    """Raised when a bucket/key pair does not exist."""
+
+
+class InvalidObjectName(ValueError):
+    """Raised for bucket names or keys that are not allowed (e.g. path traversal)."""
+
+
+class RangeNotSatisfiable(ValueError):
+    def __init__(self, size: int):
+        super().__init__(f"Requested range is outside the object (size {size}).")
+        self.size = size
+
+
+class ObjectInfo(NamedTuple):
+    bucket: str
+    key: str
+    size: int
+    modified_at: float
+
+
+class ObjectReader(ABC):
+    """An opened object: its info and its bytes both come from the same file, even if the key is replaced meanwhile."""
+
+    def __init__(self, info: ObjectInfo):
+        self.info = info
+
+    @abstractmethod
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yields the bytes of [start, end] (inclusive) in chunks, then closes the reader. Blocking."""
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range HTTP Range header into an inclusive (start, end) pair.
+    Returns None when the whole object should be served (no header, or a form we do not support).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+    if start is None and end is None:
+        return None
+    if start is None:
+        # Suffix range: the last `end` bytes.
+        if end <= 0:
+            raise RangeNotSatisfiable(size)
+        start, end = max(0, size - end), size - 1
+    elif end is None:
+        end = size - 1
+    end = min(end, size - 1)
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(size)
+    return start, end
+
+
+class ObjectStore(ABC):
+    """Interface for the storage agent's object backends."""
+
+    @abstractmethod
+    async def put_stream(self, bucket: str, key: str, chunks: AsyncIterator[bytes]) -> ObjectInfo:
+        """Stores an object from a stream of chunks. The object becomes visible only once complete."""
+
+    async def put_bytes(self, bucket: str, key: str, data: bytes) -> ObjectInfo:
+        async def _single():
+            yield data
+        return await self.put_stream(bucket, key, _single())
+
+    @abstractmethod
+    def stat(self, bucket: str, key: str) -> ObjectInfo:
+        ...
+
+    @abstractmethod
+    def open_object(self, bucket: str, key: str) -> ObjectReader:
+        """Opens an object for reading. Blocking; run it off the event loop."""
+
+    def iter_range(self, bucket: str, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yields the bytes of [start, end] (inclusive) in chunks. Blocking; run it off the event loop."""
+        return self.open_object(bucket, key).iter_range(start, end)
+
+    async def get_bytes(self, bucket: str, key: str) -> bytes:
+        return await asyncio.to_thread(lambda: b"".join(self.iter_range(bucket, key)))
+
+    @abstractmethod
+    async def delete(self, bucket: str, key: str) -> bool:
+        """Deletes an object. Returns False if it did not exist."""
+
+    @abstractmethod
+    def url(self, bucket: str, key: str) -> str:
+        ...
+
+
+def _discard(temp_path: str):
+    try:
+        os.unlink(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def _sync_directory(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _load_syncfs():
+    """syncfs(2), which makes everything written to one filesystem durable in a single call. Linux only."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc_syncfs = ctypes.CDLL(None, use_errno=True).syncfs
+    except (OSError, AttributeError):
+        return None
+    libc_syncfs.argtypes = [ctypes.c_int]
+
+    def syncfs(fd: int):
+        if libc_syncfs(fd) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    return syncfs
+
+
+_syncfs = _load_syncfs()
+
+
+class _FileReader(ObjectReader):
+    def __init__(self, info: ObjectInfo, handle):
+        super().__init__(info)
+        self._handle = handle
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with self._handle:
+            size = self.info.size
+            last = size - 1 if end is None else min(end, size - 1)
+            if size == 0 or start > last:
+                return
+            with mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(start, last + 1, CHUNK_SIZE):
+                    yield mapped[offset:min(offset + CHUNK_SIZE, last + 1)]
+
+    def close(self):
+        self._handle.close()
+
+
+class _PendingWrite(NamedTuple):
+    handle: Any
+    tail: List[bytes]  # Chunks not yet written to the handle
+    temp_path: str
+    path: Path
+    future: "asyncio.Future[None]"
+
+
+class GroupCommitter:
+    """
+    Commits concurrent writes together, with one durable sync per batch.
+
+    Each write hands over its (unsynced) temp file. Writes arriving within `max_delay`
+    seconds of the first one, up to `max_batch`, are committed together in a single
+    worker-thread call, one batch at a time (writes arriving during a commit form the next
+    batch): every file is written out, a single syncfs(2) per filesystem makes
+    all of their data durable, the files are renamed into place, and each affected
+    directory is synced once. syncfs also flushes whatever else is pending on that
+    filesystem, so give the store a volume of its own, or pass `syncfs=False` (and where
+    syncfs is unavailable) to fall back to one fsync per file. Callers resume only after
+    their batch is durable.
+    """
+
+    def __init__(self, max_delay: float = 0.002, max_batch: int = 256, fsync: bool = True, syncfs: bool = True):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.syncfs = syncfs and _syncfs is not None
+        self._pending: List[_PendingWrite] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+        # Metrics
+        self.commits = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.data_syncs = 0
+        self.directory_syncs = 0
+        self.commit_seconds = 0.0  # Time spent in the worker thread committing batches
+
+    async def commit(self, handle, temp_path: str, path: Path, tail: Optional[List[bytes]] = None):
+        """Commits a temp file, after writing `tail` (the last buffered chunks) to it."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingWrite(handle, tail or [], temp_path, path, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_pending)
+        # Shielded: once handed over, the write is committed even if this caller goes away.
+        await asyncio.shield(future)
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushes:
+            return  # One batch syncs at a time; the next one gathers meanwhile and goes when it is done
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if batch:
+            task = asyncio.ensure_future(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if self._pending:
+            self._flush_pending()
+
+    async def _flush(self, batch: List[_PendingWrite]):
+        try:
+            errors = await asyncio.to_thread(self._commit_batch, batch)
+        except BaseException as e:
+            errors = [e] * len(batch)
+        for entry, error in zip(batch, errors):
+            if entry.future.done():
+                continue
+            if error is None:
+                entry.future.set_result(None)
+            else:
+                entry.future.set_exception(error)
+        self.commits += len(batch)
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def _commit_batch(self, batch: List[_PendingWrite]) -> List[Optional[BaseException]]:
+        started = time.perf_counter()
+        errors: List[Optional[BaseException]] = [None] * len(batch)
+        for i, entry in enumerate(batch):
+            try:
+                entry.handle.writelines(entry.tail)
+                entry.handle.flush()
+            except Exception as e:
+                errors[i] = e
+
+        if self.fsync:
+            self._sync_data(batch, errors)
+
+        for i, entry in enumerate(batch):
+            if errors[i] is None:
+                try:
+                    entry.handle.close()
+                    os.replace(entry.temp_path, entry.path)
+                    continue
+                except Exception as e:
+                    errors[i] = e
+            entry.handle.close()
+            _discard(entry.temp_path)
+
+        if self.fsync:
+            # Make the renames durable: one directory sync covers every object written into it.
+            directories = {str(entry.path.parent) for entry, error in zip(batch, errors) if error is None}
+            for directory in directories:
+                try:
+                    _sync_directory(directory)
+                    self.directory_syncs += 1
+                except OSError as e:
+                    logger.warning("Could not sync directory %s: %s", directory, e)
+        self.commit_seconds += time.perf_counter() - started
+        return errors
+
+    def _sync_data(self, batch: List[_PendingWrite], errors: List[Optional[BaseException]]):
+        """Makes the written files of a batch durable, recording a failure against each file it affects."""
+        if not self.syncfs:
+            for i, entry in enumerate(batch):
+                if errors[i] is None:
+                    try:
+                        os.fsync(entry.handle.fileno())
+                        self.data_syncs += 1
+                    except OSError as e:
+                        errors[i] = e
+            return
+
+        # Buckets may be mounted separately, so sync each filesystem the batch wrote to once.
+        by_device: Dict[int, List[int]] = {}
+        for i, entry in enumerate(batch):
+            if errors[i] is None:
+                try:
+                    by_device.setdefault(os.fstat(entry.handle.fileno()).st_dev, []).append(i)
+                except OSError as e:
+                    errors[i] = e
+        for members in by_device.values():
+            try:
+                _syncfs(batch[members[0]].handle.fileno())
+                self.data_syncs += 1
+            except OSError as e:
+                for i in members:
+                    errors[i] = e
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "commits": self.commits,
+            "batches": self.batches,
+            "avg_batch_size": round(self.commits / self.batches, 3) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "sync_mode": "syncfs" if self.syncfs else "fsync",
+            "data_syncs": self.data_syncs,
+            "directory_syncs": self.directory_syncs,
+            "commit_seconds": round(self.commit_seconds, 6),
+            "pending": len(self._pending),
+            "max_delay_seconds": self.max_delay,
+        }
+
+
+class LocalFileObjectStore(ObjectStore):
+    """
+    Stores objects as files under `root/<bucket>/<key>`.
+
+    Writes stream into a temporary file in the destination directory, are fsynced, and
+    are then renamed over the target, so readers never see a partially written object.
+    Incoming chunks are buffered and written in a worker thread CHUNK_SIZE at a time, so a
+    large upload never blocks the event loop. With a GroupCommitter, concurrent writes are
+    synced with one syncfs and renamed in one worker-thread pass per batch.
+    Reads memory-map the file and copy out one chunk at a time.
+    """
+
+    def __init__(self, root: str, fsync: bool = True, committer: Optional[GroupCommitter] = None):
+        self.root = Path(root).resolve()
+        self.fsync = fsync
+        self.committer = committer
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, bucket: str, key: str) -> Path:
+        if not _BUCKET_NAME.match(bucket or ""):
+            raise InvalidObjectName(f"Invalid bucket name '{bucket}'.")
+        parts = (key or "").split("/")
+        if not key or key.startswith("/") or any(part in ("", ".", "..") for part in parts):
+            raise InvalidObjectName(f"Invalid object key '{key}'.")
+        if any(part.startswith(".tmp-") for part in parts):
+            raise InvalidObjectName(f"Object key '{key}' uses a reserved prefix.")
+        return self.root / bucket / Path(*parts)
+
+    def _open_temp(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=path.parent)
+        return os.fdopen(fd, "wb"), temp_path
+
+    def _commit(self, handle, temp_path: str, path: Path, tail: List[bytes]):
+        try:
+            handle.writelines(tail)
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+            handle.close()
+            os.replace(temp_path, path)
+        except BaseException:
+            handle.close()
+            _discard(temp_path)
+            raise
+
+    async def put_stream(self, bucket: str, key: str, chunks: AsyncIterator[bytes]) -> ObjectInfo:
+        path = self.path_for(bucket, key)
+        handle, temp_path = await asyncio.to_thread(self._open_temp, path)
+        buffered: List[bytes] = []
+        buffered_size = 0
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    buffered.append(chunk)
+                    buffered_size += len(chunk)
+                    if buffered_size >= CHUNK_SIZE:
+                        await asyncio.to_thread(handle.writelines, buffered)
+                        buffered, buffered_size = [], 0
+        except BaseException:
+            handle.close()
+            _discard(temp_path)
+            raise
+
+        # From here on the commit path owns the temp file and cleans it up on failure. It also
+        # writes the remaining buffered chunks, so a small object costs no extra thread hop.
+        if self.committer is not None:
+            await self.committer.commit(handle, temp_path, path, buffered)
+        else:
+            await asyncio.to_thread(self._commit, handle, temp_path, path, buffered)
+        return self.stat(bucket, key)
+
+    def stat(self, bucket: str, key: str) -> ObjectInfo:
+        path = self.path_for(bucket, key)
+        try:
+            st = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            raise ObjectNotFound(f"{bucket}/{key}")
+        if not path.is_file():
+            raise ObjectNotFound(f"{bucket}/{key}")
+        return ObjectInfo(bucket, key, st.st_size, st.st_mtime)
+
+    def open_object(self, bucket: str, key: str) -> ObjectReader:
+        path = self.path_for(bucket, key)
+        try:
+            handle = open(path, "rb")
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            raise ObjectNotFound(f"{bucket}/{key}")
+        try:
+            # Taken from the open descriptor, so the size always matches the bytes served.
+            st = os.fstat(handle.fileno())
+        except BaseException:
+            handle.close()
+            raise
+        return _FileReader(ObjectInfo(bucket, key, st.st_size, st.st_mtime), handle)
+
+    async def delete(self, bucket: str, key: str) -> bool:
+        path = self.path_for(bucket, key)
+
+        def _unlink() -> bool:
+            try:
+                path.unlink()
+            except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                return False
+            return True
+
+        return await asyncio.to_thread(_unlink)
+
+    def url(self, bucket: str, key: str) -> str:
+        return self.path_for(bucket, key).as_uri()
@@ -1,18 +1,45 @@
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import logging
-from typing import Dict, Any
+from fastapi import FastAPI, HTTPException, Body, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, field_validator
+from decouple import config
+from contextlib import asynccontextmanager
+import asyncio
+import uuid
+from typing import Dict, Any, List, Optional
+
+from tools.idempotency import install_idempotency
+from tools.metrics import install_metrics
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+from tools.startup import install_fast_start
+from tools.tracing import install_tracing
+from tools.utils import configure_logging, get_logger
+
+from order_batching import VALID_ORDER_TYPES, broker_quantities, net_market_orders, validate_orders
+from market_data import MarketDataEngine, bars_to_columns, COLUMNS
+from streaming import MarketDataHub
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging("agicore-trader")
+# Per-request INFO logs are rate limited; warnings and errors always get through.
+logger = get_logger(__name__, per_second=config("LOG_REQUESTS_PER_SECOND", default=200.0, cast=float))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await market_data_hub.stop()
 
 app = FastAPI(
     title="AGIcore - Trader Agent",
     description="A micro-agent for executing trades and fetching market data.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
+app.add_middleware(SerializationMiddleware)
+install_idempotency(app)
+install_metrics(app, service="agicore-trader")
+install_tracing(app, service="agicore-trader")
+install_fast_start(app)
 
 class TradeOrder(BaseModel):
     symbol: str
@@ -20,9 +47,69 @@ class TradeOrder(BaseModel):
     quantity: float
     order_type: str = "MARKET"
 
+    @field_validator("order_type")
+    @classmethod
+    def _known_order_type(cls, value: str) -> str:
+        value = value.strip().upper()
+        if value not in VALID_ORDER_TYPES:
+            raise ValueError(f"Order type must be one of {', '.join(VALID_ORDER_TYPES)}.")
+        return value
+
+class OrderResult(BaseModel):
+    index: int # Position of the order in the submitted batch
+    symbol: str
+    action: str
+    quantity: float
+    status: str # "filled", "rejected" or "failed"
+    trade_id: Optional[str] = None # Broker order this order was filled through; None if crossed internally
+    filled_price: Optional[float] = None # Price of the broker order; None if crossed internally
+    crossed_quantity: float = 0.0 # Part of the quantity offset by opposing orders in the batch
+    error: Optional[str] = None
+
+class BatchTradeResponse(BaseModel):
+    batch_id: str
+    received: int
+    accepted: int
+    rejected: int
+    failed: int
+    broker_orders: List[Dict[str, Any]]
+    results: List[OrderResult]
+
 class MarketDataRequest(BaseModel):
     symbol: str
     timeframe: str # e.g., "1h", "4h", "1d"
+    limit: int = Field(1, ge=1, le=5000) # Number of most recent bars to return
+
+# Base-resolution bars are kept in memory per symbol (for a bounded number of symbols, least
+# recently used first out); higher timeframes are resampled from them.
+market_data_engine = MarketDataEngine(
+    base_seconds=config("MARKET_DATA_BASE_SECONDS", default=300, cast=int),
+    capacity=config("MARKET_DATA_CAPACITY", default=8640, cast=int),
+    max_symbols=config("MARKET_DATA_MAX_SYMBOLS", default=256, cast=int),
+)
+
+# One poller per process computes each bar update once and fans it out to all stream subscribers.
+market_data_hub = MarketDataHub(
+    market_data_engine,
+    poll_interval=config("MARKET_STREAM_POLL_SECONDS", default=1.0, cast=float),
+    max_pending=config("MARKET_STREAM_MAX_PENDING", default=64, cast=int),
+)
+
+async def submit_to_broker(symbol: str, action: str, quantity: float, order_type: str = "MARKET") -> Dict[str, Any]:
+    """
+    Sends a single order to the brokerage.
+    In a real system, this would connect to a brokerage API.
+    """
+    # Placeholder for trade execution logic
+    return {
+        "trade_id": f"trade_{uuid.uuid4().hex[:10]}",
+        "symbol": symbol,
+        "action": action,
+        "quantity": quantity,
+        "order_type": order_type,
+        "status": "filled",
+        "filled_price": 50000.0, # Example price
+    }
 
 @app.post("/execute-trade", response_model=Dict[str, Any])
 async def execute_trade(order: TradeOrder):
@@ -30,18 +117,16 @@ async def execute_trade(order: TradeOrder):
     Receives a trade order and simulates its execution.
     In a real system, this would connect to a brokerage API.
     """
-    logger.info(f"Executing trade: {order.action} {order.quantity} of {order.symbol}")
+    logger.info("Executing trade: %s %s of %s", order.action, order.quantity, order.symbol)
     
     # Simulate interacting with a trading API
     if order.quantity <= 0:
         raise HTTPException(status_code=400, detail="Quantity must be positive.")
 
-    # Placeholder for trade execution logic
-    trade_id = "trade_12345"
-    status = "filled"
-    filled_price = 50000.0 # Example price
-    
-    logger.info(f"Trade {trade_id} for {order.symbol} executed and {status} at ${filled_price}.")
+    fill = await submit_to_broker(order.symbol, order.action, order.quantity, order.order_type)
+    trade_id, status, filled_price = fill["trade_id"], fill["status"], fill["filled_price"]
+
+    logger.info("Trade %s for %s executed and %s at $%s.", trade_id, order.symbol, status, filled_price)
     
     return {
         "trade_id": trade_id,
@@ -52,27 +137,143 @@ async def execute_trade(order: TradeOrder):
         "filled_price": filled_price,
     }
 
+@app.post("/execute-trades", response_model=BatchTradeResponse)
+async def execute_trades(orders: List[Dict[str, Any]] = Body(...)):
+    """
+    Executes a batch of trade orders in one request.
+    Orders are validated as columns, opposing MARKET orders are netted per symbol so each
+    symbol reaches the broker at most once, and every submitted order gets its own result.
+    Only orders with quantity left after netting carry the broker order's trade_id; the rest
+    were crossed internally. Invalid orders are rejected individually without failing the rest
+    of the batch.
+    """
+    batch_id = f"batch_{uuid.uuid4().hex[:10]}"
+    logger.info("Executing trade batch %s with %s orders", batch_id, len(orders))
+
+    columns = validate_orders(orders)
+    results = [
+        OrderResult(
+            index=i,
+            symbol=str(columns.symbols[i]),
+            action=str(columns.actions[i]),
+            quantity=float(columns.quantities[i]) if columns.errors[i] is None else 0.0,
+            status="rejected" if columns.errors[i] else "pending",
+            error=columns.errors[i],
+        )
+        for i in range(len(orders))
+    ]
+
+    broker_orders = []
+
+    async def _fill(indices, through_broker, symbol, action, quantity, order_type):
+        """Submits one broker order for the orders at `indices`, `through_broker` of each's quantity going through it."""
+        fill = None
+        if quantity > 0:
+            try:
+                fill = await submit_to_broker(symbol, action, quantity, order_type)
+                broker_orders.append(fill)
+            except Exception as e:
+                logger.error("Broker order for %s in batch %s failed: %s", symbol, batch_id, e)
+                for i in indices:
+                    results[i].status, results[i].error = "failed", str(e)
+                return
+        for i, brokered in zip(indices, through_broker):
+            results[i].status = "filled"
+            results[i].crossed_quantity = results[i].quantity - float(brokered)
+            if fill is not None and brokered > 0:
+                results[i].trade_id, results[i].filled_price = fill["trade_id"], fill["filled_price"]
+
+    jobs = [
+        _fill(net.order_indices, broker_quantities(columns, net), net.symbol, net.action, net.quantity, "MARKET")
+        for net in net_market_orders(columns)
+    ]
+    # Non-MARKET orders carry their own price constraints and cannot be netted.
+    jobs += [
+        _fill(
+            [i], [columns.quantities[i]], str(columns.symbols[i]), str(columns.actions[i]), float(columns.quantities[i]),
+            str(columns.order_types[i]),
+        )
+        for i in range(len(orders))
+        if columns.errors[i] is None and columns.order_types[i] != "MARKET"
+    ]
+    await asyncio.gather(*jobs)
+
+    rejected = sum(1 for r in results if r.status == "rejected")
+    failed = sum(1 for r in results if r.status == "failed")
+    logger.info("Trade batch %s: %s broker orders, %s rejected, %s failed.", batch_id, len(broker_orders), rejected, failed)
+    return BatchTradeResponse(
+        batch_id=batch_id,
+        received=len(orders),
+        accepted=len(orders) - rejected,
+        rejected=rejected,
+        failed=failed,
+        broker_orders=broker_orders,
+        results=results,
+    )
+
 @app.post("/get-market-data", response_model=Dict[str, Any])
 async def get_market_data(request: MarketDataRequest):
     """
-    Fetches market data for a given symbol.
-    This would call an external market data provider.
+    Returns market data for a given symbol from the in-memory OHLCV cache.
+    The latest bar is returned at the top level; when `limit` > 1 the last `limit`
+    bars are also returned as columns under `bars`.
     """
-    logger.info(f"Fetching market data for {request.symbol} ({request.timeframe})")
-    
-    # Placeholder for market data fetching
-    market_data = {
-        "symbol": request.symbol,
-        "timeframe": request.timeframe,
-        "open": 61000.50,
-        "high": 61500.75,
-        "low": 60900.25,
-        "close": 61450.00,
-        "volume": 1234.56
-    }
-    
+    logger.info("Fetching market data for %s (%s)", request.symbol, request.timeframe)
+
+    try:
+        bars = await market_data_engine.get_bars(request.symbol, request.timeframe, request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(bars) == 0:
+        raise HTTPException(status_code=404, detail=f"No market data for '{request.symbol}'.")
+
+    market_data = {"symbol": request.symbol, "timeframe": request.timeframe}
+    market_data.update({name: float(value) for name, value in zip(COLUMNS, bars[-1])})
+    if request.limit > 1:
+        market_data["bars"] = bars_to_columns(bars)
+
     return market_data
 
+@app.websocket("/stream/market-data")
+async def stream_market_data(websocket: WebSocket):
+    """
+    Streams bar updates for subscribed symbols and timeframes.
+    Clients send {"action": "subscribe" | "unsubscribe", "symbol": ..., "timeframe": ...};
+    each subscription first receives the current bar, then a message whenever it changes.
+    """
+    await websocket.accept()
+    subscriber = market_data_hub.connect()
+
+    async def _receive():
+        while True:
+            message = await websocket.receive_json()
+            action, symbol, timeframe = message.get("action"), message.get("symbol"), message.get("timeframe")
+            if action not in ("subscribe", "unsubscribe") or not symbol or not timeframe:
+                await websocket.send_json({"type": "error", "detail": "Expected action, symbol and timeframe."})
+            elif action == "unsubscribe":
+                market_data_hub.unsubscribe(subscriber, symbol, timeframe)
+            else:
+                try:
+                    await market_data_hub.subscribe(subscriber, symbol, timeframe)
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+
+    async def _send():
+        while True:
+            await websocket.send_text(await subscriber.get())
+
+    tasks = [asyncio.ensure_future(_receive()), asyncio.ensure_future(_send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        market_data_hub.disconnect(subscriber)
+        logger.info("Market data stream closed (%s delivered, %s coalesced, %s dropped).", subscriber.delivered, subscriber.coalesced, subscriber.dropped)
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
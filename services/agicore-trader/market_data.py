@@ -0,0 +1,212 @@
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from tools.startup import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Column layout of a bar array: one row per bar.
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+TIMEFRAME_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+}
+
+
+class BarRingBuffer:
+    """
+    Fixed-capacity ring buffer of OHLCV bars for one symbol.
+
+    Every bar is written twice, at `i` and `i + capacity`, so the most recent N bars
+    (N <= capacity) are always one contiguous region and can be returned as a view
+    without copying.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity, len(COLUMNS)), dtype=np.float64)
+        self._next = 0  # Slot the next bar will be written to
+        self.size = 0
+        self.version = 0  # Incremented on every append; used to invalidate derived timeframes
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        if self.size == 0:
+            return None
+        return float(self._data[(self._next - 1) % self.capacity, TIMESTAMP])
+
+    def extend(self, bars: np.ndarray):
+        if len(bars) == 0:
+            return
+        bars = bars[-self.capacity:]
+        slots = (self._next + np.arange(len(bars))) % self.capacity
+        self._data[slots] = bars
+        self._data[slots + self.capacity] = bars
+        self._next = int((slots[-1] + 1) % self.capacity)
+        self.size = min(self.capacity, self.size + len(bars))
+        self.version += 1
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        """Returns a read-only view of the last `n` bars (all bars if `n` is None), oldest first."""
+        n = self.size if n is None else max(0, min(n, self.size))
+        end = self._next + self.capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+
+def resample(bars: np.ndarray, period_seconds: int) -> np.ndarray:
+    """
+    Aggregates base bars into bars of `period_seconds`, aligned to the epoch.
+    The last output bar may be partial (the bar that is still forming).
+    """
+    if len(bars) == 0:
+        return np.zeros((0, len(COLUMNS)), dtype=np.float64)
+    buckets = (bars[:, TIMESTAMP] // period_seconds).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(bars)])) - 1
+
+    out = np.empty((len(starts), len(COLUMNS)), dtype=np.float64)
+    out[:, TIMESTAMP] = buckets[starts] * period_seconds
+    out[:, OPEN] = bars[starts, OPEN]
+    out[:, HIGH] = np.maximum.reduceat(bars[:, HIGH], starts)
+    out[:, LOW] = np.minimum.reduceat(bars[:, LOW], starts)
+    out[:, CLOSE] = bars[ends, CLOSE]
+    out[:, VOLUME] = np.add.reduceat(bars[:, VOLUME], starts)
+    return out
+
+
+class SyntheticBarProvider:
+    """
+    Stand-in for an external market data provider.
+    Generates a deterministic price path per symbol so repeated fetches agree with each other.
+    """
+
+    async def fetch_bars(self, symbol: str, start: float, end: float, interval: int) -> np.ndarray:
+        timestamps = np.arange(start, end, interval, dtype=np.float64)
+        phase = zlib.crc32(symbol.encode()) % 1000
+        base_price = 100.0 + phase * 50.0
+
+        def price(ts):
+            return base_price * (1 + 0.03 * np.sin(ts / 86400.0 + phase) + 0.005 * np.sin(ts / 3600.0 + phase))
+
+        bars = np.empty((len(timestamps), len(COLUMNS)), dtype=np.float64)
+        bars[:, TIMESTAMP] = timestamps
+        bars[:, OPEN] = price(timestamps)
+        bars[:, CLOSE] = price(timestamps + interval)
+        bars[:, HIGH] = np.maximum(bars[:, OPEN], bars[:, CLOSE]) * 1.001
+        bars[:, LOW] = np.minimum(bars[:, OPEN], bars[:, CLOSE]) * 0.999
+        bars[:, VOLUME] = 1000.0 + 500.0 * np.abs(np.sin(timestamps / 1234.0 + phase))
+        return bars
+
+
+class MarketDataEngine:
+    """
+    In-memory OHLCV store serving every timeframe from one base-resolution series per symbol.
+
+    A symbol is backfilled from the provider on first use and topped up with only the new
+    bars afterwards. Higher timeframes are derived by vectorized resampling and cached until
+    the next base bar arrives, so repeated queries never go back to the provider.
+
+    At most `max_symbols` symbols are kept; past that the least recently queried one is
+    dropped, with its derived timeframes, and backfilled again if it is asked for later.
+    """
+
+    def __init__(self, provider=None, base_seconds: int = 300, capacity: int = 8640, max_symbols: int = 256):
+        if max_symbols < 1:
+            raise ValueError("max_symbols must be at least 1.")
+        self.provider = provider or SyntheticBarProvider()
+        self.base_seconds = base_seconds
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.evictions = 0
+        self._series: "OrderedDict[str, BarRingBuffer]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._resampled: Dict[Tuple[str, str], Tuple[int, np.ndarray]] = {}
+
+    def timeframe_seconds(self, timeframe: str) -> int:
+        seconds = TIMEFRAME_SECONDS.get(timeframe)
+        if seconds is None or seconds < self.base_seconds or seconds % self.base_seconds:
+            supported = [tf for tf, s in TIMEFRAME_SECONDS.items() if s >= self.base_seconds and s % self.base_seconds == 0]
+            raise ValueError(f"Unsupported timeframe '{timeframe}'. Supported: {', '.join(supported)}.")
+        return seconds
+
+    async def _refresh(self, symbol: str, now: float) -> BarRingBuffer:
+        # Only closed base bars are fetched; the bar that is still forming is left to the next refresh.
+        last_closed = (now // self.base_seconds) * self.base_seconds
+        series = self._series.get(symbol)
+        if series is not None:
+            self._series.move_to_end(symbol)
+            if series.last_timestamp is not None and series.last_timestamp + self.base_seconds >= last_closed:
+                return series
+
+        lock = self._locks.setdefault(symbol, asyncio.Lock())
+        async with lock:
+            series = self._series.get(symbol) or BarRingBuffer(self.capacity)
+            if series.last_timestamp is None:
+                start = last_closed - self.capacity * self.base_seconds
+            elif series.last_timestamp + self.base_seconds < last_closed:
+                start = series.last_timestamp + self.base_seconds
+            else:
+                return series
+            bars = await self.provider.fetch_bars(symbol, start, last_closed, self.base_seconds)
+            series.extend(bars)
+            self._remember(symbol, series)
+            logger.debug("Loaded %s base bars for %s", len(bars), symbol)
+        return series
+
+    def _remember(self, symbol: str, series: BarRingBuffer):
+        self._series[symbol] = series
+        self._series.move_to_end(symbol)
+        while len(self._series) > self.max_symbols:
+            evicted, _ = self._series.popitem(last=False)
+            self.evictions += 1
+            for timeframe in TIMEFRAME_SECONDS:
+                self._resampled.pop((evicted, timeframe), None)
+            lock = self._locks.get(evicted)
+            if lock is not None and not lock.locked():
+                del self._locks[evicted]
+
+    async def get_bars(self, symbol: str, timeframe: str, limit: int = 1, now: Optional[float] = None) -> np.ndarray:
+        """Returns (at most) the last `limit` bars of `symbol` at `timeframe`, oldest first."""
+        period = self.timeframe_seconds(timeframe)
+        series = await self._refresh(symbol, time.time() if now is None else now)
+
+        if period == self.base_seconds:
+            return series.last(limit)
+
+        key = (symbol, timeframe)
+        cached = self._resampled.get(key)
+        if cached is None or cached[0] != series.version:
+            resampled = resample(series.last(), period)
+            resampled.flags.writeable = False
+            cached = (series.version, resampled)
+            self._resampled[key] = cached
+        return cached[1][-limit:]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "symbols": len(self._series),
+            "evicted_symbols": self.evictions,
+            "derived_series": len(self._resampled),
+            "base_bars": sum(series.size for series in self._series.values()),
+        }
+
+
+def bars_to_columns(bars: np.ndarray) -> Dict[str, list]:
+    return {name: bars[:, i].tolist() for i, name in enumerate(COLUMNS)}
@@ -0,0 +1,121 @@
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from tools.startup import lazy_import
+
+np = lazy_import("numpy")
+
+VALID_ACTIONS = ("BUY", "SELL")
+VALID_ORDER_TYPES = ("MARKET", "LIMIT", "STOP", "STOP_LIMIT")
+
+
+class OrderColumns(NamedTuple):
+    """A batch of orders laid out as parallel arrays, one entry per submitted order."""
+    symbols: np.ndarray  # str
+    actions: np.ndarray  # str, upper-cased
+    quantities: np.ndarray  # float64, NaN where the value was not numeric
+    order_types: np.ndarray  # str, upper-cased
+    errors: List[Optional[str]]  # Validation error per order, or None if the order is valid
+
+    @property
+    def valid(self) -> np.ndarray:
+        return np.array([error is None for error in self.errors], dtype=bool)
+
+
+class NetOrder(NamedTuple):
+    symbol: str
+    action: str
+    quantity: float
+    order_indices: np.ndarray  # Positions of the submitted orders folded into this broker order
+
+
+def _float_column(values: List[Any]) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Slow path only when the batch contains non-numeric quantities.
+        column = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return column
+
+
+def _str_column(values: List[Any]) -> np.ndarray:
+    return np.char.upper(np.char.strip(np.array(["" if v is None else str(v) for v in values], dtype=str)))
+
+
+def validate_orders(orders: List[Dict[str, Any]]) -> OrderColumns:
+    """
+    Validates a batch of raw order dicts column by column rather than one model at a time.
+    Every check is a single vectorized pass over the whole batch.
+    """
+    n = len(orders)
+    symbols = _str_column([order.get("symbol") for order in orders])
+    actions = _str_column([order.get("action") for order in orders])
+    quantities = _float_column([order.get("quantity") for order in orders])
+    order_types = _str_column([order.get("order_type", "MARKET") for order in orders])
+
+    checks = [
+        (np.char.str_len(symbols) == 0, "Symbol is required."),
+        (~np.isin(actions, VALID_ACTIONS), "Action must be 'BUY' or 'SELL'."),
+        (~np.isin(order_types, VALID_ORDER_TYPES), f"Order type must be one of {', '.join(VALID_ORDER_TYPES)}."),
+        (~np.isfinite(quantities), "Quantity must be a number."),
+        (np.isfinite(quantities) & (quantities <= 0), "Quantity must be positive."),
+    ]
+    errors: List[Optional[str]] = [None] * n
+    for failed, message in checks:
+        for i in np.flatnonzero(failed):
+            if errors[i] is None:
+                errors[i] = message
+
+    return OrderColumns(symbols, actions, quantities, order_types, errors)
+
+
+def net_market_orders(columns: OrderColumns) -> List[NetOrder]:
+    """
+    Nets valid MARKET orders per symbol: opposing BUY and SELL quantities cancel out,
+    leaving at most one broker order per symbol. Symbols that net to zero are still
+    returned (with quantity 0) so their orders can be reported as crossed internally.
+    """
+    candidates = np.flatnonzero(columns.valid & (columns.order_types == "MARKET"))
+    if candidates.size == 0:
+        return []
+
+    signed = np.where(columns.actions[candidates] == "BUY", 1.0, -1.0) * columns.quantities[candidates]
+    unique_symbols, group = np.unique(columns.symbols[candidates], return_inverse=True)
+    net = np.bincount(group, weights=signed, minlength=unique_symbols.size)
+    net[np.isclose(net, 0.0, atol=1e-9)] = 0.0  # Float residue from fully offsetting orders
+    # Split the candidate positions into one slice per symbol in a single sort.
+    members = np.split(candidates[np.argsort(group, kind="stable")], np.cumsum(np.bincount(group))[:-1])
+
+    net_orders = []
+    for symbol, quantity, indices in zip(unique_symbols, net, members):
+        net_orders.append(NetOrder(
+            symbol=str(symbol),
+            action="BUY" if quantity >= 0 else "SELL",
+            quantity=abs(float(quantity)),
+            order_indices=indices,
+        ))
+    return net_orders
+
+
+def broker_quantities(columns: OrderColumns, net: NetOrder) -> np.ndarray:
+    """
+    Splits a net order's quantity over the orders folded into it. Orders on the opposing side
+    are crossed internally in full; the offset is taken from same-side orders in submission
+    order, so only what remains of the later ones reaches the broker. Returns, per member
+    order, the quantity that went through the broker order.
+    """
+    indices = net.order_indices
+    quantities = columns.quantities[indices]
+    same_side = columns.actions[indices] == net.action
+    offset = quantities[~same_side].sum()
+    own = np.where(same_side, quantities, 0.0)
+    residual = np.clip(np.cumsum(own) - offset, 0.0, own)
+    residual[residual < 1e-9] = 0.0  # Float residue from fully offsetting orders
+    return residual
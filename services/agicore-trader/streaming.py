@@ -0,0 +1,152 @@
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from market_data import COLUMNS, MarketDataEngine
+
+logger = logging.getLogger(__name__)
+
+StreamKey = Tuple[str, str]  # (symbol, timeframe)
+
+
+class Subscriber:
+    """
+    One streaming client. Pending updates are kept per (symbol, timeframe): a newer bar
+    replaces an undelivered older one for the same key (coalesced), and when the queue is
+    full the oldest pending update is dropped. A slow client therefore only ever misses
+    intermediate states, and never holds more than `max_pending` messages in memory.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self.max_pending = max_pending
+        self.keys: Set[StreamKey] = set()
+        self._pending: "OrderedDict[StreamKey, str]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, key: StreamKey, message: str):
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending[key] = message
+        else:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[key] = message
+        self._ready.set()
+
+    async def get(self) -> str:
+        while not self._pending:
+            self._ready.clear()
+            await self._ready.wait()
+        _, message = self._pending.popitem(last=False)
+        self.delivered += 1
+        return message
+
+
+class MarketDataHub:
+    """
+    Fans out bar updates to streaming subscribers.
+
+    A single background task polls the market data engine once per subscribed
+    (symbol, timeframe), encodes each changed bar once, and hands the same encoded
+    message to every subscriber of that key.
+    """
+
+    def __init__(self, engine: MarketDataEngine, poll_interval: float = 1.0, max_pending: int = 64):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self._subscribers: Dict[StreamKey, Set[Subscriber]] = {}
+        self._last_sent: Dict[StreamKey, Tuple[float, ...]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.updates_published = 0
+
+    def connect(self) -> Subscriber:
+        return Subscriber(self.max_pending)
+
+    async def subscribe(self, subscriber: Subscriber, symbol: str, timeframe: str):
+        """Registers the subscriber for a key and immediately queues the current bar as a snapshot."""
+        self.engine.timeframe_seconds(timeframe)  # Raises ValueError for unsupported timeframes
+        key = (symbol, timeframe)
+        self._subscribers.setdefault(key, set()).add(subscriber)
+        subscriber.keys.add(key)
+        try:
+            bar = await self._latest_bar(key)
+        except BaseException:
+            # A subscription without a snapshot is not registered, so no dead entry stays in the fan-out.
+            self.unsubscribe(subscriber, symbol, timeframe)
+            raise
+        if bar is not None:
+            subscriber.offer(key, self._encode(key, bar))
+            # Only a bar every subscriber has seen counts as sent; otherwise the others would miss it.
+            if self._subscribers.get(key) == {subscriber}:
+                self._last_sent[key] = bar
+        self._ensure_running()
+
+    def unsubscribe(self, subscriber: Subscriber, symbol: str, timeframe: str):
+        key = (symbol, timeframe)
+        subscriber.keys.discard(key)
+        subscribers = self._subscribers.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[key]
+                self._last_sent.pop(key, None)
+
+    def disconnect(self, subscriber: Subscriber):
+        for symbol, timeframe in list(subscriber.keys):
+            self.unsubscribe(subscriber, symbol, timeframe)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    async def _latest_bar(self, key: StreamKey) -> Optional[Tuple[float, ...]]:
+        bars = await self.engine.get_bars(key[0], key[1], 1)
+        if len(bars) == 0:
+            return None
+        return tuple(float(v) for v in bars[-1])
+
+    @staticmethod
+    def _encode(key: StreamKey, bar: Tuple[float, ...]) -> str:
+        return json.dumps({"type": "bar", "symbol": key[0], "timeframe": key[1], **dict(zip(COLUMNS, bar))})
+
+    async def publish_changes(self):
+        """Publishes every subscribed key whose latest bar changed since it was last broadcast."""
+        for key in list(self._subscribers):
+            try:
+                bar = await self._latest_bar(key)
+            except Exception as e:
+                logger.error("Failed to refresh market data for %s: %s", key, e)
+                continue
+            if bar is None or self._last_sent.get(key) == bar or key not in self._subscribers:
+                continue
+            self._last_sent[key] = bar
+            message = self._encode(key, bar)
+            self.updates_published += 1
+            for subscriber in self._subscribers[key]:
+                subscriber.offer(key, message)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            await self.publish_changes()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
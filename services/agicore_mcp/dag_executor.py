@@ -0,0 +1,197 @@
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# A step runner receives the step definition and the outputs of the steps it
+# depends on (keyed by step id), and returns the step's own output.
+StepRunner = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Any]]
+
+
+class PlanValidationError(ValueError):
+    """Raised when a plan's dependency graph is malformed."""
+
+
+class StepTiming(BaseModel):
+    id: str
+    service: str
+    status: str  # "completed", "failed" or "skipped"
+    queued_ms: float = 0.0  # Time spent waiting for a concurrency slot
+    started_ms: Optional[float] = None  # Offset from the start of the plan
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    resumed: bool = False  # Completed by an earlier run; its checkpointed output was reused
+
+
+class DAGExecutionResult(BaseModel):
+    status: str  # "completed" or "failed"
+    duration_ms: float
+    steps: List[StepTiming]
+    outputs: Dict[str, Any]
+
+
+def topological_order(steps: List[Mapping[str, Any]]) -> List[str]:
+    """
+    Validates the dependency graph of a plan and returns its step ids in a valid execution order.
+    Raises PlanValidationError on duplicate ids, unknown dependencies or cycles.
+    """
+    ids = [step["id"] for step in steps]
+    if len(set(ids)) != len(ids):
+        raise PlanValidationError("Plan contains duplicate step ids.")
+
+    known = set(ids)
+    in_degree = {step_id: 0 for step_id in ids}
+    dependents = defaultdict(list)
+    for step in steps:
+        for dep in set(step.get("depends_on") or []):
+            if dep not in known:
+                raise PlanValidationError(f"Step '{step['id']}' depends on unknown step '{dep}'.")
+            in_degree[step["id"]] += 1
+            dependents[dep].append(step["id"])
+
+    queue = deque(step_id for step_id in ids if in_degree[step_id] == 0)
+    order = []
+    while queue:
+        step_id = queue.popleft()
+        order.append(step_id)
+        for child in dependents[step_id]:
+            in_degree[child] -= 1
+            if in_degree[child] == 0:
+                queue.append(child)
+
+    if len(order) != len(ids):
+        cyclic = sorted(step_id for step_id, degree in in_degree.items() if degree > 0)
+        raise PlanValidationError(f"Plan contains a dependency cycle between steps: {', '.join(cyclic)}.")
+    return order
+
+
+class DAGExecutor:
+    """
+    Runs plan steps concurrently as soon as their dependencies have completed.
+
+    Concurrency is bounded globally and per target service, so a plan that fans out
+    to one agent cannot starve the others. A failed step marks all of its transitive
+    dependents as skipped; independent branches keep running. Steps passed in `completed`
+    (with their outputs) are not run again, so an interrupted plan can be resumed.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        per_service_limit: int = 4,
+        service_limits: Optional[Mapping[str, int]] = None,
+    ):
+        if max_concurrency < 1 or per_service_limit < 1:
+            raise ValueError("Concurrency limits must be at least 1.")
+        self.max_concurrency = max_concurrency
+        self.per_service_limit = per_service_limit
+        self.service_limits = dict(service_limits or {})
+
+    async def run(
+        self, steps: List[Dict[str, Any]], run_step: StepRunner, completed: Optional[Mapping[str, Any]] = None,
+    ) -> DAGExecutionResult:
+        order = topological_order(steps)
+        by_id = {step["id"]: step for step in steps}
+        dependents = defaultdict(list)
+        remaining = {}
+        for step in steps:
+            deps = set(step.get("depends_on") or [])
+            remaining[step["id"]] = len(deps)
+            for dep in deps:
+                dependents[dep].append(step["id"])
+
+        global_slots = asyncio.Semaphore(self.max_concurrency)
+        service_slots: Dict[str, asyncio.Semaphore] = {}
+        timings: Dict[str, StepTiming] = {}
+        outputs: Dict[str, Any] = {}
+        plan_start = time.perf_counter()
+
+        def _ms(seconds: float) -> float:
+            return round(seconds * 1000, 3)
+
+        for step_id, output in (completed or {}).items():
+            if step_id not in by_id:
+                continue
+            outputs[step_id] = output
+            timings[step_id] = StepTiming(id=step_id, service=by_id[step_id]["service"], status="completed", resumed=True)
+            for child in dependents[step_id]:
+                remaining[child] -= 1
+
+        async def _run_one(step_id: str) -> str:
+            step = by_id[step_id]
+            service = step["service"]
+            if service not in service_slots:
+                service_slots[service] = asyncio.Semaphore(self.service_limits.get(service, self.per_service_limit))
+
+            enqueued = time.perf_counter()
+            # Take the service slot first so a step throttled by its service does not hold a global slot.
+            async with service_slots[service], global_slots:
+                started = time.perf_counter()
+                inputs = {dep: outputs[dep] for dep in step.get("depends_on") or []}
+                try:
+                    outputs[step_id] = await run_step(step, inputs)
+                    status, error = "completed", None
+                except Exception as e:
+                    logger.error("Step '%s' on service '%s' failed: %s", step_id, service, e)
+                    status, error = "failed", str(e)
+                finished = time.perf_counter()
+
+            timings[step_id] = StepTiming(
+                id=step_id,
+                service=service,
+                status=status,
+                queued_ms=_ms(started - enqueued),
+                started_ms=_ms(started - plan_start),
+                duration_ms=_ms(finished - started),
+                error=error,
+            )
+            return step_id
+
+        def _skip_descendants(failed_id: str):
+            queue = deque(dependents[failed_id])
+            while queue:
+                step_id = queue.popleft()
+                if step_id in timings:
+                    continue
+                timings[step_id] = StepTiming(
+                    id=step_id,
+                    service=by_id[step_id]["service"],
+                    status="skipped",
+                    error=f"Upstream step '{failed_id}' did not complete.",
+                )
+                queue.extend(dependents[step_id])
+
+        pending = set()
+        for step_id in order:
+            if remaining[step_id] == 0 and step_id not in timings:
+                pending.add(asyncio.ensure_future(_run_one(step_id)))
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step_id = task.result()
+                    if timings[step_id].status != "completed":
+                        _skip_descendants(step_id)
+                        continue
+                    for child in dependents[step_id]:
+                        remaining[child] -= 1
+                        if remaining[child] == 0 and child not in timings:
+                            pending.add(asyncio.ensure_future(_run_one(child)))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        status = "completed" if all(t.status == "completed" for t in timings.values()) else "failed"
+        return DAGExecutionResult(
+            status=status,
+            duration_ms=_ms(time.perf_counter() - plan_start),
+            steps=[timings[step["id"]] for step in steps],
+            outputs=outputs,
+        )
@@ -1,76 +1,388 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-import logging
-from typing import List, Dict, Any
+from decouple import config
+from contextlib import asynccontextmanager
+import asyncio
+import uuid
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Set
+
+from tools.http_client import ServiceCallError, call_service, close_http_client
+from tools.idempotency import install_idempotency
+from tools.metrics import install_metrics
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+from tools.startup import install_fast_start
+from tools.tracing import install_tracing
+from tools.utils import configure_logging, get_logger
+from dag_executor import DAGExecutor, PlanValidationError, StepRunner, StepTiming
+from plan_store import PlanStore, SQLitePlanStore, new_plan_record
+from plan_templates import PlanTemplateCache, goal_shape
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging("agicore-mcp")
+# Per-request INFO logs are rate limited; warnings and errors always get through.
+logger = get_logger(__name__, per_second=config("LOG_REQUESTS_PER_SECOND", default=200.0, cast=float))
+
+# Plans are persisted so that an execute can follow a create on any replica.
+plan_store: PlanStore = SQLitePlanStore(
+    path=config("MCP_PLAN_DB_PATH", default="plans.db"),
+    cache_size=config("MCP_PLAN_CACHE_SIZE", default=1024, cast=int),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_http_client()
+    plan_store.close()
 
 app = FastAPI(
     title="AGIcore - Multi-Cognitive Planner (MCP)",
     description="This service is responsible for creating, executing, and adapting plans based on high-level goals.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
+app.add_middleware(SerializationMiddleware)
+install_idempotency(app)
+metrics = install_metrics(app, service="agicore-mcp")
+tracer = install_tracing(app, service="agicore-mcp")
+install_fast_start(app)
 
 class Goal(BaseModel):
     description: str
     constraints: List[str] = []
+    # Named parameters, e.g. {"topic": "AI stocks"}. Goals that differ only in these share a plan template.
+    params: Dict[str, Any] = {}
+
+class Compensation(BaseModel):
+    action: str
+    service: Optional[str] = None # Defaults to the step's own service
+    params: Dict[str, Any] = {}
+
+class PlanStep(BaseModel):
+    id: str
+    action: str
+    service: str
+    params: Dict[str, Any] = {}
+    depends_on: List[str] = [] # Ids of steps that must complete before this one starts
+    compensation: Optional[Compensation] = None # Undoes the step when the plan is rolled back
 
 class Plan(BaseModel):
     id: str
-    steps: List[Dict[str, Any]]
+    steps: List[PlanStep]
     status: str
+    created_at: Optional[float] = None
+
+class PlanPage(BaseModel):
+    plans: List[Plan]
+    next_cursor: Optional[str] = None
+
+class PlanExecutionResult(BaseModel):
+    plan_id: str
+    status: str
+    duration_ms: float
+    steps: List[StepTiming]
 
 class Action(BaseModel):
     service: str
     endpoint: str
     payload: Dict[str, Any]
 
+# Steps run concurrently once their dependencies complete, bounded globally and per target service.
+executor = DAGExecutor(
+    max_concurrency=config("MCP_MAX_CONCURRENT_STEPS", default=16, cast=int),
+    per_service_limit=config("MCP_MAX_CONCURRENT_STEPS_PER_SERVICE", default=4, cast=int),
+)
+
+# Calls failing with a network error, 429 or 5xx are retried with exponential backoff. Every
+# attempt carries the same idempotency key, so a call that did land is not carried out twice.
+STEP_RETRIES = config("MCP_STEP_RETRIES", default=2, cast=int)
+STEP_RETRY_BACKOFF = config("MCP_STEP_RETRY_BACKOFF", default=0.2, cast=float)
+
+# Plans executing or rolling back in this process; a second run of one is refused.
+active_plans: Set[str] = set()
+
+# Plans are memoized by goal shape, so recurring goals skip the planner (0 disables).
+plan_cache = PlanTemplateCache(capacity=config("MCP_PLAN_TEMPLATE_CACHE_SIZE", default=1024, cast=int))
+metrics.collectors.append(plan_cache.prometheus)
+
+def build_example_steps(topic: str = "AI stocks", plan_id: str = "plan_example") -> List[PlanStep]:
+    """
+    The static plan used by this boilerplate until a real planner is in place. The report is
+    stored under the plan's own id, so rolling one plan back never deletes another's report.
+    """
+    report = {"bucket": "agicore-reports", "key": f"reports/{plan_id}.json"}
+    return [
+        PlanStep(
+            id="analyze", action="analyze_news", service="agicore-analytics",
+            params={"data_source": "market_data", "topic": topic, "analysis_type": "trend_forecast"},
+        ),
+        PlanStep(
+            id="report", action="store_object", service="agicore-storage",
+            params={**report, "content": {"topic": topic, "data": "..."}},
+            depends_on=["analyze"],
+            compensation=Compensation(action="delete_object", params=report),
+        ),
+    ]
+
+async def run_step(step: Dict[str, Any], inputs: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Executes a single plan step against its target service.
+    `inputs` holds the outputs of the steps it depends on, keyed by step id.
+    """
+    # Actions map onto the target service's endpoint of the same name, e.g. "store_object" -> "/store-object".
+    endpoint = "/" + step["action"].replace("_", "-")
+    logger.info("Executing step '%s': call service '%s' at '%s'", step['id'], step['service'], endpoint)
+    attributes = {"step.id": step["id"], "step.action": step["action"], "step.service": step["service"]}
+    with tracer.start_span(f"step {step['id']}", attributes=attributes):
+        return await call_service(step["service"], endpoint, json=step["params"], idempotency_key=idempotency_key)
+
+def is_transient(error: Exception) -> bool:
+    if not isinstance(error, ServiceCallError):
+        return False
+    return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+
+async def call_with_retries(call: Callable[[], Awaitable[Any]], description: str) -> Any:
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as e:
+            if attempt >= STEP_RETRIES or not is_transient(e):
+                raise
+            attempt += 1
+            logger.warning("%s failed, retrying (%s of %s): %s", description, attempt, STEP_RETRIES, e)
+            await asyncio.sleep(STEP_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+def checkpointed_runner(plan_id: str, run: int) -> StepRunner:
+    """
+    Runs a plan's steps with retries, keyed for idempotency by plan, run and step, and
+    checkpoints each step's outcome, output included, as soon as it is known.
+    """
+    async def run_checkpointed(step: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+        key = f"{plan_id}:{run}:{step['id']}"
+        try:
+            output = await call_with_retries(lambda: run_step(step, inputs, idempotency_key=key), f"Step '{step['id']}'")
+        except Exception as e:
+            await plan_store.save_checkpoint(plan_id, step["id"], "failed", error=str(e))
+            raise
+        await plan_store.save_checkpoint(plan_id, step["id"], "completed", output)
+        return output
+    return run_checkpointed
+
+def compensation_steps(steps: List[Dict[str, Any]], completed: Set[str]) -> List[Dict[str, Any]]:
+    """
+    The compensations to run when rolling back, one per completed step that has one, as a
+    dependency graph: each waits for the compensations of the steps that depended on its
+    step, so the plan is undone in reverse order and independent branches concurrently.
+    """
+    dependents: Dict[str, List[str]] = {step["id"]: [] for step in steps}
+    for step in steps:
+        for dep in step["depends_on"]:
+            dependents[dep].append(step["id"])
+
+    def descendants(step_id: str) -> Set[str]:
+        found, queue = set(), list(dependents[step_id])
+        while queue:
+            child = queue.pop()
+            if child not in found:
+                found.add(child)
+                queue.extend(dependents[child])
+        return found
+
+    undoable = [step for step in steps if step["id"] in completed and step.get("compensation")]
+    undoable_ids = {step["id"] for step in undoable}
+    return [
+        {
+            "id": step["id"],
+            "service": step["compensation"]["service"] or step["service"],
+            "action": step["compensation"]["action"],
+            "params": step["compensation"]["params"],
+            "depends_on": sorted(descendants(step["id"]) & undoable_ids),
+        }
+        for step in undoable
+    ]
+
+async def compose_steps(goal: Goal, plan_id: str) -> List[Dict[str, Any]]:
+    """
+    Breaks a goal down into a sequence of actions for other micro-agents.
+    In a real implementation, this would involve a complex planning algorithm.
+    For this boilerplate, we'll create a simple, static plan.
+    """
+    return [step.model_dump() for step in build_example_steps(str(goal.params.get("topic", "AI stocks")), plan_id)]
+
+async def plan_for_goal(goal: Goal) -> Plan:
+    """Plans a goal, from the template for its shape when there is one and with compose_steps otherwise."""
+    plan_id = f"plan_{uuid.uuid4().hex[:12]}"
+    # The plan id is a parameter like any other, so templates put each plan's own id into its steps.
+    shape = goal_shape(goal.description, goal.constraints, {**goal.params, "plan_id": plan_id})
+    steps, _ = await plan_cache.plan(shape, lambda: compose_steps(goal, plan_id))
+    return Plan(**new_plan_record(plan_id, steps))
+
 @app.post("/create-plan", response_model=Plan)
 async def create_plan(goal: Goal):
     """
     Receives a high-level goal and generates a multi-step plan to achieve it.
     This involves breaking down the goal into a sequence of actions for other micro-agents.
     """
-    logger.info(f"Received goal: {goal.description}")
-    # In a real implementation, this would involve a complex planning algorithm.
-    # For this boilerplate, we'll create a simple, static plan.
-    plan_id = "plan_001"
-    example_plan = Plan(
-        id=plan_id,
-        status="pending",
-        steps=[
-            {"action": "analyze_market", "service": "agicore-analytics", "params": {"topic": "AI stocks"}},
-            {"action": "generate_report", "service": "agicore-storage", "params": {"data": "..."}},
-        ]
+    logger.info("Received goal: %s", goal.description)
+    plan = await plan_for_goal(goal)
+    await plan_store.save(plan.model_dump())
+    logger.info("Generated plan %s with %s steps.", plan.id, len(plan.steps))
+    return plan
+
+@app.post("/create-plans", response_model=List[Plan])
+async def create_plans(goals: List[Goal]):
+    """
+    Creates one plan per goal and stores them all in a single batched write.
+    """
+    logger.info("Received %s goals for bulk planning.", len(goals))
+    plans = [await plan_for_goal(goal) for goal in goals]
+    await plan_store.save_many([plan.model_dump() for plan in plans])
+    return plans
+
+@app.get("/create-plan/cache")
+async def plan_cache_stats():
+    """Returns the plan template cache's hit rate and the time spent planning."""
+    return plan_cache.stats()
+
+@app.get("/plans", response_model=PlanPage)
+async def list_plans(
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """
+    Lists plans newest first, one page at a time. Pass `next_cursor` back as `cursor` to continue.
+    """
+    try:
+        records, next_cursor = await plan_store.list(status=status, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PlanPage(plans=[Plan(**record) for record in records], next_cursor=next_cursor)
+
+@app.get("/plans/{plan_id}", response_model=Plan)
+async def get_plan(plan_id: str):
+    record = await plan_store.get(plan_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return Plan(**record)
+
+async def execute(plan_id: str, resume: bool) -> PlanExecutionResult:
+    record = await plan_store.get(plan_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    if plan_id in active_plans:
+        raise HTTPException(status_code=409, detail="Plan is already running.")
+    if resume and record["status"] in ("rolling_back", "rolled_back"):
+        raise HTTPException(status_code=409, detail=f"Plan is {record['status'].replace('_', ' ')} and cannot be resumed.")
+
+    steps = [PlanStep(**step).model_dump() for step in record["steps"]]
+    active_plans.add(plan_id)
+    try:
+        completed = {}
+        # A plan that never ran has nothing to resume from.
+        if resume and "run" in record:
+            checkpoints = await plan_store.get_checkpoints(plan_id)
+            completed = {step_id: cp["output"] for step_id, cp in checkpoints.items() if cp["status"] == "completed"}
+            await plan_store.update_status(plan_id, "running")
+        else:
+            # Each fresh run gets its own idempotency keys, so its steps are carried out again.
+            record = {**record, "status": "running", "run": record.get("run", 0) + 1}
+            await plan_store.save(record)
+            await plan_store.clear_checkpoints(plan_id)
+        run = record["run"]
+
+        # Every step span (and the calls it makes downstream) is a child of this one.
+        span_name = "resume_plan" if resume else "execute_plan"
+        with tracer.start_span(span_name, attributes={"plan.id": plan_id, "plan.steps": len(steps), "plan.run": run}) as span:
+            try:
+                result = await executor.run(steps, checkpointed_runner(plan_id, run), completed=completed)
+            except PlanValidationError as e:
+                await plan_store.update_status(plan_id, "failed")
+                raise HTTPException(status_code=400, detail=str(e))
+            span.set_attribute("plan.status", result.status)
+        await plan_store.update_status(plan_id, result.status)
+    finally:
+        active_plans.discard(plan_id)
+
+    logger.info("Plan %s finished with status '%s' in %sms.", plan_id, result.status, result.duration_ms)
+    return PlanExecutionResult(
+        plan_id=plan_id,
+        status=result.status,
+        duration_ms=result.duration_ms,
+        steps=result.steps,
     )
-    logger.info(f"Generated plan {plan_id} with {len(example_plan.steps)} steps.")
-    # Here you would typically save the plan to a database or state manager.
-    return example_plan
 
-@app.post("/execute-plan/{plan_id}")
+@app.post("/execute-plan/{plan_id}", response_model=PlanExecutionResult)
 async def execute_plan(plan_id: str):
     """
-    Executes a pre-defined plan, orchestrating calls to other services.
+    Executes a stored plan, orchestrating calls to other services.
     This is the core of the perception -> planning -> action -> adaptation workflow.
+    Independent steps run concurrently, so the plan takes as long as its critical path.
+    Each step's outcome is checkpointed, so a failed or interrupted plan can be resumed
+    or rolled back.
     """
-    logger.info(f"Executing plan: {plan_id}")
-    # Fetch the plan from a persistent store.
-    # For now, we use a placeholder.
-    if plan_id != "plan_001":
+    logger.info("Executing plan: %s", plan_id)
+    return await execute(plan_id, resume=False)
+
+@app.post("/execute-plan/{plan_id}/resume", response_model=PlanExecutionResult)
+async def resume_plan(plan_id: str):
+    """
+    Resumes a failed or interrupted plan: steps that completed are not run again (their
+    checkpointed outputs feed their dependents), and the rest run with the same
+    idempotency keys as before, so a call that landed before the interruption is not repeated.
+    """
+    logger.info("Resuming plan: %s", plan_id)
+    return await execute(plan_id, resume=True)
+
+@app.post("/plans/{plan_id}/rollback", response_model=PlanExecutionResult)
+async def rollback_plan(plan_id: str):
+    """
+    Undoes a plan by running the compensation of each completed step that has one, in
+    reverse dependency order. A compensation that fails leaves its step completed, and the
+    compensations of the steps before it are skipped, so the rollback can be retried.
+    """
+    logger.info("Rolling back plan: %s", plan_id)
+    record = await plan_store.get(plan_id)
+    if record is None:
         raise HTTPException(status_code=404, detail="Plan not found")
+    if plan_id in active_plans:
+        raise HTTPException(status_code=409, detail="Plan is already running.")
+
+    steps = [PlanStep(**step).model_dump() for step in record["steps"]]
+    run = record.get("run", 1)
+    active_plans.add(plan_id)
+    try:
+        checkpoints = await plan_store.get_checkpoints(plan_id)
+        compensations = compensation_steps(steps, {step_id for step_id, cp in checkpoints.items() if cp["status"] == "completed"})
+        await plan_store.update_status(plan_id, "rolling_back")
+
+        async def compensate(step: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+            key = f"{plan_id}:{run}:{step['id']}:compensate"
+            output = await call_with_retries(
+                lambda: run_step(step, inputs, idempotency_key=key), f"Compensation of step '{step['id']}'"
+            )
+            await plan_store.save_checkpoint(plan_id, step["id"], "compensated", checkpoints[step["id"]]["output"])
+            return output
 
-    # Simulate executing each step. In a real scenario, this would be a saga pattern
-    # with proper state management and error handling (compensation).
-    for step in [{"service": "agicore-analytics", "task": "analyze_market"}, {"service": "agicore-storage", "task": "save_report"}]:
-        logger.info(f"Executing step: call service '{step['service']}' for task '{step['task']}'")
-        # Here you would make an async HTTP call to the actual service.
-        # e.g., await http_client.post(f"http://{step['service']}/execute", json={"task": step['task']})
-    
-    logger.info(f"Plan {plan_id} executed successfully.")
-    return {"plan_id": plan_id, "status": "completed"}
+        with tracer.start_span("rollback_plan", attributes={"plan.id": plan_id, "plan.compensations": len(compensations)}) as span:
+            result = await executor.run(compensations, compensate)
+            span.set_attribute("plan.status", result.status)
+        status = "rolled_back" if result.status == "completed" else "rollback_failed"
+        await plan_store.update_status(plan_id, status)
+    finally:
+        active_plans.discard(plan_id)
+
+    logger.info("Plan %s rollback finished with status '%s' in %sms.", plan_id, status, result.duration_ms)
+    return PlanExecutionResult(plan_id=plan_id, status=status, duration_ms=result.duration_ms, steps=result.steps)
+
+@app.get("/plans/{plan_id}/checkpoints", response_model=Dict[str, Dict[str, Any]])
+async def get_plan_checkpoints(plan_id: str):
+    """The checkpointed outcome of each step of the plan's latest run, by step id."""
+    if await plan_store.get(plan_id) is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return await plan_store.get_checkpoints(plan_id)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,277 @@
+
+import asyncio
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A stored plan is a plain dict: {"id", "status", "created_at", "steps", ...}.
+PlanRecord = Dict[str, Any]
+# A step checkpoint: {"step_id", "status", "output", "error", "updated_at"}.
+Checkpoint = Dict[str, Any]
+
+
+class PlanStore(ABC):
+    """Interface for plan repositories used by the MCP."""
+
+    @abstractmethod
+    async def save(self, plan: PlanRecord) -> None:
+        ...
+
+    @abstractmethod
+    async def save_many(self, plans: List[PlanRecord]) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, plan_id: str) -> Optional[PlanRecord]:
+        ...
+
+    @abstractmethod
+    async def update_status(self, plan_id: str, status: str) -> bool:
+        """Returns False if the plan does not exist."""
+
+    @abstractmethod
+    async def list(
+        self, status: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[PlanRecord], Optional[str]]:
+        """Returns one page of plans, newest first, and the cursor for the next page (or None)."""
+
+    @abstractmethod
+    async def save_checkpoint(
+        self, plan_id: str, step_id: str, status: str, output: Any = None, error: Optional[str] = None,
+    ) -> None:
+        """Records the outcome of one step of a plan's execution, replacing any earlier one."""
+
+    @abstractmethod
+    async def get_checkpoints(self, plan_id: str) -> Dict[str, Checkpoint]:
+        """Returns the plan's step checkpoints by step id."""
+
+    @abstractmethod
+    async def clear_checkpoints(self, plan_id: str) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class LRUCache:
+    """A small ordered-dict LRU used to keep recently created or executed plans off the disk."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, PlanRecord]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[PlanRecord]:
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key: str, value: PlanRecord) -> None:
+        if self.capacity <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def encode_cursor(created_at: float, plan_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, plan_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        created_at, plan_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(created_at), str(plan_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+class SQLitePlanStore(PlanStore):
+    """
+    Plan repository backed by SQLite in WAL mode.
+
+    Lookups by id go through the primary key index and listing uses keyset pagination
+    over (created_at, id), so neither ever scans or loads the whole table. Recently
+    written plans are served from an in-memory LRU without touching the database.
+    Blocking SQLite calls run in a worker thread so they never stall the event loop.
+    """
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS plans (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            body TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_plans_created ON plans (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_plans_status_created ON plans (status, created_at, id)",
+        """
+        CREATE TABLE IF NOT EXISTS step_checkpoints (
+            plan_id TEXT NOT NULL,
+            step_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            output TEXT,
+            error TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (plan_id, step_id)
+        )
+        """,
+    )
+
+    def __init__(self, path: str = "plans.db", cache_size: int = 1024):
+        self.path = path
+        self.cache = LRUCache(cache_size)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the service does not touch the disk.
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, fn):
+        with self._lock:
+            return fn(self._connection())
+
+    @staticmethod
+    def _row(plan: PlanRecord) -> Tuple[str, str, float, str]:
+        return plan["id"], plan["status"], plan["created_at"], json.dumps(plan)
+
+    @staticmethod
+    def _record(status: str, body: str) -> PlanRecord:
+        plan = json.loads(body)
+        plan["status"] = status
+        return plan
+
+    async def save(self, plan: PlanRecord) -> None:
+        await self.save_many([plan])
+
+    async def save_many(self, plans: List[PlanRecord]) -> None:
+        if not plans:
+            return
+        rows = [self._row(plan) for plan in plans]
+
+        def _insert(conn: sqlite3.Connection):
+            # A single transaction for the whole batch means a single WAL commit.
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO plans (id, status, created_at, body) VALUES (?, ?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        await asyncio.to_thread(self._execute, _insert)
+        for plan in plans:
+            self.cache.put(plan["id"], plan)
+
+    async def get(self, plan_id: str) -> Optional[PlanRecord]:
+        cached = self.cache.get(plan_id)
+        if cached is not None:
+            return cached
+
+        row = await asyncio.to_thread(
+            self._execute,
+            lambda conn: conn.execute("SELECT status, body FROM plans WHERE id = ?", (plan_id,)).fetchone(),
+        )
+        if row is None:
+            return None
+        plan = self._record(*row)
+        self.cache.put(plan_id, plan)
+        return plan
+
+    async def update_status(self, plan_id: str, status: str) -> bool:
+        updated = await asyncio.to_thread(
+            self._execute,
+            lambda conn: conn.execute("UPDATE plans SET status = ? WHERE id = ?", (status, plan_id)).rowcount,
+        )
+        cached = self.cache.get(plan_id)
+        if cached is not None:
+            cached["status"] = status
+        return bool(updated)
+
+    async def list(
+        self, status: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[PlanRecord], Optional[str]]:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor is not None:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Fetch one extra row to know whether another page exists.
+        query = f"SELECT status, body FROM plans {where} ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = await asyncio.to_thread(self._execute, lambda conn: conn.execute(query, params).fetchall())
+        plans = [self._record(*row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and plans:
+            next_cursor = encode_cursor(plans[-1]["created_at"], plans[-1]["id"])
+        return plans, next_cursor
+
+    async def save_checkpoint(
+        self, plan_id: str, step_id: str, status: str, output: Any = None, error: Optional[str] = None,
+    ) -> None:
+        # One small WAL commit per step, so a step's output is durable before its dependents start.
+        row = (plan_id, step_id, status, json.dumps(output), error, time.time())
+        await asyncio.to_thread(
+            self._execute,
+            lambda conn: conn.execute(
+                "INSERT OR REPLACE INTO step_checkpoints (plan_id, step_id, status, output, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", row,
+            ),
+        )
+
+    async def get_checkpoints(self, plan_id: str) -> Dict[str, Checkpoint]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            lambda conn: conn.execute(
+                "SELECT step_id, status, output, error, updated_at FROM step_checkpoints WHERE plan_id = ?",
+                (plan_id,),
+            ).fetchall(),
+        )
+        return {
+            step_id: {
+                "step_id": step_id, "status": status, "output": json.loads(output) if output is not None else None,
+                "error": error, "updated_at": updated_at,
+            }
+            for step_id, status, output, error, updated_at in rows
+        }
+
+    async def clear_checkpoints(self, plan_id: str) -> None:
+        await asyncio.to_thread(
+            self._execute, lambda conn: conn.execute("DELETE FROM step_checkpoints WHERE plan_id = ?", (plan_id,))
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def new_plan_record(plan_id: str, steps: List[Dict[str, Any]], status: str = "pending") -> PlanRecord:
+    return {"id": plan_id, "status": status, "created_at": time.time(), "steps": steps}
@@ -0,0 +1,251 @@
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# Parameters lifted out of goal text: quoted phrases, tickers (e.g. NVDA, $AAPL, BTC-USD) and numbers.
+_PARAMETER = re.compile(
+    r'"(?P<quoted>[^"]+)"'
+    r"|(?<![\w$])\$?(?P<ticker>[A-Z][A-Z0-9]{1,4}(?:[-.][A-Z]{1,4})?)(?!\w)"
+    r"|(?<![\w.])(?P<number>\d+(?:\.\d+)?)(?![\w.])"
+)
+_SEPARATORS = re.compile(r"[^\w<>]+")
+
+Steps = List[Dict[str, Any]]
+
+
+class GoalShape(NamedTuple):
+    """A goal with its parameters lifted out: the canonical key and the values, in slot order."""
+    key: str
+    values: List[Any]
+
+
+def _lift(text: str, named: Dict[str, str]) -> Tuple[str, List[str]]:
+    """Replaces named parameter values, then any other parameters, with typed slots."""
+    for name, value in named.items():
+        if value:
+            text = re.sub(rf"(?<!\w){re.escape(value)}(?!\w)", f"<{name}>", text)
+    values = []
+
+    def slot(match: "re.Match[str]") -> str:
+        kind = match.lastgroup
+        values.append(match.group(kind))
+        return f"<{kind}>"
+
+    text = _PARAMETER.sub(slot, text)
+    return _SEPARATORS.sub(" ", text.lower()).strip(), values
+
+
+def goal_shape(description: str, constraints: List[str], params: Optional[Dict[str, Any]] = None) -> GoalShape:
+    """
+    Normalizes a goal to a canonical key: case, punctuation and spacing are ignored (though
+    all-caps words are read as tickers), the constraints are deduplicated and sorted, and
+    parameters become slots. Goals that share a key differ only in their parameter values.
+    """
+    named = {name: str(value) for name, value in sorted((params or {}).items())}
+    shape, values = _lift(description, named)
+    # Sorted with their values so that listing the same constraints in another order gives the same slots.
+    lifted = sorted({(text, tuple(found)) for text, found in (_lift(constraint, named) for constraint in constraints)})
+    parts = [shape] + [text for text, _ in lifted] + ["params: " + ",".join(named)]
+    return GoalShape("\n".join(parts), list(named.values()) + values + [value for _, found in lifted for value in found])
+
+
+class _Text(NamedTuple):
+    """A string with parameters in it: literal pieces, and slot indexes where values go."""
+    parts: Tuple[Union[str, int], ...]
+
+
+class _Number(NamedTuple):
+    """A number that was one of the goal's numeric parameters."""
+    slot: int
+    cast: type
+
+
+def compile_template(steps: Any, values: List[Any]) -> Optional[Any]:
+    """
+    Turns a concrete plan into a template by replacing every whole-word occurrence of a
+    parameter value with its slot. Returns None when two parameters share a value, since it
+    would then be ambiguous which one a step used.
+    """
+    texts = [str(value) for value in values]
+    if len(set(texts)) != len(texts):
+        return None
+    if not texts:
+        return steps
+    slots = {text: index for index, text in enumerate(texts)}
+    numbers = {}
+    for index, text in enumerate(texts):
+        try:
+            numbers.setdefault(float(text), index)
+        except ValueError:
+            pass
+    pattern = re.compile(
+        r"(?<![A-Za-z0-9])(" + "|".join(re.escape(text) for text in sorted(texts, key=len, reverse=True)) + r")(?![A-Za-z0-9])"
+    )
+
+    def walk(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {key: walk(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [walk(value) for value in node]
+        if isinstance(node, str):
+            pieces = pattern.split(node)
+            if len(pieces) == 1:
+                return node
+            # re.split puts the matched values at the odd positions.
+            return _Text(tuple(slots[piece] if i % 2 else piece for i, piece in enumerate(pieces) if piece or i % 2))
+        if isinstance(node, (int, float)) and not isinstance(node, bool) and float(node) in numbers:
+            return _Number(numbers[float(node)], type(node))
+        return node
+
+    return walk(steps)
+
+
+def instantiate(template: Any, values: List[Any]) -> Any:
+    """Builds a concrete plan from a template by putting `values` into its slots."""
+    if isinstance(template, dict):
+        return {key: instantiate(value, values) for key, value in template.items()}
+    if isinstance(template, list):
+        return [instantiate(value, values) for value in template]
+    if isinstance(template, _Text):
+        return "".join(part if isinstance(part, str) else str(values[part]) for part in template.parts)
+    if isinstance(template, _Number):
+        number = float(values[template.slot])
+        return int(number) if template.cast is int and number.is_integer() else number
+    return template
+
+
+class _Entry:
+    __slots__ = ("template", "values", "verified")
+
+    def __init__(self, template: Any, values: List[Any]):
+        self.template = template
+        self.values = values  # The goal it was compiled from
+        self.verified = False
+
+
+# Cached for shapes whose plans cannot be derived by substitution; they are always planned in full.
+_NOT_TEMPLATABLE = object()
+
+
+class PlanTemplateCache:
+    """
+    Memoizes planning by goal shape.
+
+    The first goal of a shape is planned in full and its plan compiled into a template.
+    The next goal of that shape with other parameter values is planned in full too, and
+    the template is kept only if instantiating it gives exactly the same plan; otherwise
+    the planner derives something from a parameter that substitution cannot follow, and
+    the shape is always planned. From then on goals of the shape are planned by
+    instantiation alone. Shapes are kept in a bounded LRU.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.verified = 0
+        self.rejected = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.planning_seconds = 0.0
+        self.planned = 0
+        self.instantiate_seconds = 0.0
+
+    def _store(self, key: str, value: Any):
+        if self.capacity <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _plan(self, planner: Callable[[], Awaitable[Steps]]) -> Steps:
+        started = time.perf_counter()
+        try:
+            return await planner()
+        finally:
+            self.planning_seconds += time.perf_counter() - started
+            self.planned += 1
+
+    async def plan(self, shape: GoalShape, planner: Callable[[], Awaitable[Steps]]) -> Tuple[Steps, str]:
+        """
+        Returns the steps for a goal of `shape` and how they were made: "hit" (from the
+        template), "miss" (planned and compiled), "verify" (planned to confirm the
+        template) or "bypass" (planned; the shape is not templatable).
+        """
+        entry = self._entries.get(shape.key)
+        if entry is not None:
+            self._entries.move_to_end(shape.key)
+
+        if entry is _NOT_TEMPLATABLE:
+            self.bypassed += 1
+            return await self._plan(planner), "bypass"
+
+        # Unverified templates still reproduce the goal they were compiled from.
+        if entry is not None and (entry.verified or entry.values == shape.values):
+            self.hits += 1
+            started = time.perf_counter()
+            steps = instantiate(entry.template, shape.values)
+            self.instantiate_seconds += time.perf_counter() - started
+            return steps, "hit"
+
+        steps = await self._plan(planner)
+        if entry is None:
+            self.misses += 1
+            template = compile_template(steps, shape.values)
+            if template is not None:
+                self._store(shape.key, _Entry(template, shape.values))
+            return steps, "miss"
+
+        if instantiate(entry.template, shape.values) == steps:
+            entry.verified = True
+            self.verified += 1
+        else:
+            self.rejected += 1
+            self._store(shape.key, _NOT_TEMPLATABLE)
+        return steps, "verify"
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses + self.verified + self.rejected + self.bypassed
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "planner_calls": self.planned,
+            "planning_ms_mean": round(self.planning_seconds / self.planned * 1000, 3) if self.planned else 0.0,
+            "instantiate_ms_mean": round(self.instantiate_seconds / self.hits * 1000, 3) if self.hits else 0.0,
+        }
+
+    def prometheus(self, service: str) -> List[str]:
+        """The cache's counters and planning times in the Prometheus text format."""
+        outcomes = {"hit": self.hits, "miss": self.misses, "verify": self.verified + self.rejected, "bypass": self.bypassed}
+        lines = [
+            "# HELP agicore_mcp_plan_cache_requests_total Plans made, by how: from a template (hit) or by the planner.",
+            "# TYPE agicore_mcp_plan_cache_requests_total counter",
+        ]
+        lines += [f'agicore_mcp_plan_cache_requests_total{{service="{service}",outcome="{outcome}"}} {count}' for outcome, count in outcomes.items()]
+        lines += [
+            "# HELP agicore_mcp_plan_cache_templates Goal shapes with a cached template or marked as not templatable.",
+            "# TYPE agicore_mcp_plan_cache_templates gauge",
+            f'agicore_mcp_plan_cache_templates{{service="{service}"}} {len(self._entries)}',
+            "# HELP agicore_mcp_planning_seconds Time spent making plans, by the planner or from a template.",
+            "# TYPE agicore_mcp_planning_seconds summary",
+            f'agicore_mcp_planning_seconds_sum{{service="{service}",mode="planner"}} {self.planning_seconds:.6f}',
+            f'agicore_mcp_planning_seconds_count{{service="{service}",mode="planner"}} {self.planned}',
+            f'agicore_mcp_planning_seconds_sum{{service="{service}",mode="template"}} {self.instantiate_seconds:.6f}',
+            f'agicore_mcp_planning_seconds_count{{service="{service}",mode="template"}} {self.hits}',
+        ]
+        return lines
@@ -1,5 +1,6 @@
-import yaml
-from pathlib import Path
+import json
+
+from app.state import STATE_FILE, load_state, snapshot_path
 
 def main():
     """
@@ -7,16 +8,16 @@ def main():
     """
     print("Hello from AGIcore Operator!")
 
-    # Build a robust path to the state file from the project root
-    state_file = Path(__file__).resolve().parent.parent.parent.parent / "ops" / "state" / "STATE.yml"
+    # The state is read from its compiled snapshot when that is up to date, so YAML is only
+    # parsed (and the snapshot rebuilt) after the state file changes.
+    state_file = STATE_FILE
 
-    if state_file.exists():
+    if state_file.exists() or snapshot_path(state_file).exists():
         print(f"Found state file at {state_file}, attempting to read...")
         try:
-            with open(state_file, 'r') as f:
-                state = yaml.safe_load(f)
+            state = load_state(state_file)
             print("Successfully read state:")
-            print(yaml.dump(state, indent=2))
+            print(json.dumps(state, indent=2))
         except Exception as e:
             print(f"Error reading or parsing state file: {e}")
     else:
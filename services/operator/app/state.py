@@ -0,0 +1,89 @@
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from decouple import config
+
+from tools import serialization
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = Path(__file__).resolve().parent.parent.parent.parent / "ops" / "state" / "STATE.yml"
+STATE_FILE = Path(config("OPERATOR_STATE_FILE", default=str(DEFAULT_STATE_FILE)))
+# Where the compiled snapshot lives; by default next to the state file.
+STATE_SNAPSHOT = config("OPERATOR_STATE_SNAPSHOT", default="")
+
+
+def snapshot_path(state_file: Path) -> Path:
+    return Path(STATE_SNAPSHOT) if STATE_SNAPSHOT else state_file.with_name(state_file.name + ".snapshot.json")
+
+
+def _source_stamp(source: bytes) -> Dict[str, str]:
+    # A content hash rather than size and mtime, which image layer copies and checkouts do not preserve.
+    return {"blake2b": hashlib.blake2b(source, digest_size=16).hexdigest()}
+
+
+def compile_state(state_file: Path = STATE_FILE, snapshot: Optional[Path] = None, source: Optional[bytes] = None) -> Any:
+    """
+    Parses the YAML state file and writes it out as a JSON snapshot stamped with a hash of
+    the file's contents, so later loads can skip YAML parsing entirely. `source` is the
+    file's contents, when the caller has already read them. Values come back JSON-compatible
+    (e.g. timestamps as ISO strings) whichever path loaded them.
+    """
+    import yaml  # Only needed when the snapshot is missing or stale
+
+    snapshot = snapshot or snapshot_path(state_file)
+    if source is None:
+        source = state_file.read_bytes()
+    state = serialization.loads(serialization.dumps(yaml.safe_load(source)))
+
+    data = serialization.dumps({"source": _source_stamp(source), "state": state})
+    try:
+        fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=snapshot.parent)
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(temp_path, snapshot)
+    except OSError as e:
+        # A read-only image still works; it just parses the YAML on every start.
+        logger.warning("Could not write state snapshot %s: %s", snapshot, e)
+    return state
+
+
+def load_state(state_file: Path = STATE_FILE, snapshot: Optional[Path] = None) -> Optional[Any]:
+    """
+    Loads the operator state, from the compiled snapshot when it matches the state file
+    and from the YAML (recompiling the snapshot) otherwise. When only the snapshot was
+    shipped, it is used as is. Returns None when there is no state at all.
+    """
+    snapshot = snapshot or snapshot_path(state_file)
+    try:
+        source = state_file.read_bytes()
+    except FileNotFoundError:
+        source = None
+
+    try:
+        with open(snapshot, "rb") as handle:
+            compiled = serialization.loads(handle.read())
+    except (OSError, ValueError):
+        compiled = None
+
+    if compiled is not None and (source is None or compiled.get("source") == _source_stamp(source)):
+        return compiled.get("state")
+    if source is None:
+        return None
+    return compile_state(state_file, snapshot, source)
+
+
+if __name__ == "__main__":
+    # Precompiles at build time (see the operator's Dockerfile):  python -m app.state [STATE_FILE]
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else STATE_FILE
+    if not target.exists():
+        print(f"No state file at {target}; nothing to compile.")
+        sys.exit(0)
+    compile_state(target)
+    print(f"Compiled {target} to {snapshot_path(target)}")
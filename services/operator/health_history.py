@@ -0,0 +1,203 @@
+
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+from tools.startup import lazy_import
+
+np = lazy_import("numpy")
+
+# Latency histogram used by the rollups: log-spaced bucket edges from 1 ms to 60 s.
+LATENCY_EDGE_COUNT = 48
+_BINS = LATENCY_EDGE_COUNT + 1
+
+
+@lru_cache(maxsize=None)
+def latency_edges_ms() -> np.ndarray:
+    return np.geomspace(1.0, 60000.0, LATENCY_EDGE_COUNT)
+
+
+@lru_cache(maxsize=None)
+def _bin_latency_ms() -> np.ndarray:
+    """Representative latency of each bucket: the geometric midpoint, clamped to the edges at either end."""
+    edges = latency_edges_ms()
+    return np.concatenate(([edges[0]], np.sqrt(edges[:-1] * edges[1:]), [edges[-1]]))
+
+
+# Raw sample columns
+TS, LATENCY, OK = range(3)
+# Rollup columns; the latency histogram follows in columns HIST onwards
+START, COUNT, FAILURES, HIST = range(4)
+
+PERCENTILES = (50, 95, 99)
+
+
+class RingBuffer:
+    """A fixed-capacity table of float rows; appending beyond capacity overwrites the oldest row."""
+
+    def __init__(self, capacity: int, columns: int):
+        self._rows = np.zeros((capacity, columns), dtype=np.float64)
+        self._pos = 0
+        self._filled = 0
+
+    def __len__(self) -> int:
+        return self._filled
+
+    def append(self, row):
+        self._rows[self._pos] = row
+        self._pos = (self._pos + 1) % len(self._rows)
+        self._filled = min(self._filled + 1, len(self._rows))
+
+    def rows(self) -> np.ndarray:
+        """Returns the rows oldest first (a copy once the buffer has wrapped)."""
+        if self._filled < len(self._rows):
+            return self._rows[:self._filled]
+        return np.concatenate((self._rows[self._pos:], self._rows[:self._pos]))
+
+    @property
+    def full(self) -> bool:
+        return self._filled == len(self._rows)
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows.nbytes
+
+
+def _empty_summary(source: str) -> Dict[str, Any]:
+    return {"samples": 0, "uptime": None, "error_rate": None, **{f"p{p}": None for p in PERCENTILES}, "source": source}
+
+
+def _histogram_percentiles(histogram: np.ndarray) -> Dict[str, Optional[float]]:
+    total = histogram.sum()
+    cumulative = np.cumsum(histogram)
+    return {
+        f"p{p}": float(_bin_latency_ms()[np.searchsorted(cumulative, total * p / 100)])
+        for p in PERCENTILES
+    }
+
+
+class ServiceHistory:
+    """
+    Probe history of one service: the last `raw_capacity` samples verbatim, plus one rollup
+    row per `rollup_seconds` (probe and failure counts and a latency histogram) for the
+    last `rollup_capacity` periods. Memory is fixed when the history is created.
+    """
+
+    def __init__(self, raw_capacity: int, rollup_seconds: float, rollup_capacity: int):
+        self.rollup_seconds = rollup_seconds
+        self.raw = RingBuffer(raw_capacity, 3)
+        self.rollups = RingBuffer(rollup_capacity, HIST + _BINS)
+        self._current = np.zeros(HIST + _BINS, dtype=np.float64)
+        self._current[START] = np.nan
+
+    def record(self, timestamp: float, latency_ms: float, ok: bool):
+        self.raw.append((timestamp, latency_ms, 1.0 if ok else 0.0))
+
+        start = timestamp - timestamp % self.rollup_seconds
+        if self._current[START] != start:
+            if not np.isnan(self._current[START]):
+                self.rollups.append(self._current)
+            self._current[:] = 0.0
+            self._current[START] = start
+        self._current[COUNT] += 1
+        self._current[FAILURES] += 0.0 if ok else 1.0
+        self._current[HIST + np.searchsorted(latency_edges_ms(), latency_ms)] += 1
+
+    def summary(self, window: float, now: float) -> Dict[str, Any]:
+        since = now - window
+        raw = self.raw.rows()
+        # Exact figures while the raw samples still reach back to the start of the window.
+        if not self.raw.full or raw[0, TS] <= since:
+            return self._raw_summary(raw[raw[:, TS] >= since], now)
+        return self._rollup_summary(since)
+
+    def _raw_summary(self, samples: np.ndarray, now: float) -> Dict[str, Any]:
+        count = len(samples)
+        if count == 0:
+            return _empty_summary("raw")
+        # Uptime is time-weighted: each sample's state holds until the next sample (or now).
+        durations = np.diff(np.append(samples[:, TS], now))
+        total = durations.sum()
+        uptime = float((durations * samples[:, OK]).sum() / total) if total > 0 else float(samples[-1, OK])
+        latency = np.percentile(samples[:, LATENCY], PERCENTILES)
+        return {
+            "samples": count,
+            "uptime": round(uptime, 6),
+            "error_rate": round(float(1.0 - samples[:, OK].mean()), 6),
+            **{f"p{p}": round(float(value), 3) for p, value in zip(PERCENTILES, latency)},
+            "source": "raw",
+        }
+
+    def _rollup_summary(self, since: float) -> Dict[str, Any]:
+        rows = np.vstack((self.rollups.rows(), self._current[None, :]))
+        rows = rows[rows[:, START] + self.rollup_seconds > since]
+        count = rows[:, COUNT].sum()
+        if count == 0:
+            return _empty_summary("rollup")
+        error_rate = float(rows[:, FAILURES].sum() / count)
+        # Rollups keep counts, not timings, so uptime is approximated by the share of good probes.
+        return {
+            "samples": int(count),
+            "uptime": round(1.0 - error_rate, 6),
+            "error_rate": round(error_rate, 6),
+            **_histogram_percentiles(rows[:, HIST:].sum(axis=0)),
+            "source": "rollup",
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + self.rollups.nbytes + self._current.nbytes
+
+
+class HealthHistory:
+    """
+    In-memory probe history for every service, queryable over sliding windows.
+
+    Recent windows are answered exactly from raw samples; windows that reach further back
+    than the raw buffer fall back to the per-period rollups, with percentiles estimated
+    from their latency histograms. Each service's history has a fixed size, so memory is
+    bounded by `max_services` no matter how long the operator runs.
+    """
+
+    def __init__(
+        self,
+        raw_capacity: int = 2048,
+        rollup_seconds: float = 60.0,
+        rollup_capacity: int = 1440,
+        max_services: int = 500,
+    ):
+        self.raw_capacity = raw_capacity
+        self.rollup_seconds = rollup_seconds
+        self.rollup_capacity = rollup_capacity
+        self.max_services = max_services
+        self._services: Dict[str, ServiceHistory] = {}
+
+    def __contains__(self, service_name: str) -> bool:
+        return service_name in self._services
+
+    def record(self, service_name: str, ok: bool, latency_ms: float, timestamp: Optional[float] = None):
+        history = self._services.get(service_name)
+        if history is None:
+            if len(self._services) >= self.max_services:
+                raise ValueError(f"Health history is full ({self.max_services} services).")
+            history = self._services[service_name] = ServiceHistory(
+                self.raw_capacity, self.rollup_seconds, self.rollup_capacity
+            )
+        history.record(time.time() if timestamp is None else timestamp, latency_ms, ok)
+
+    def summary(self, service_name: str, window: float, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        history = self._services.get(service_name)
+        if history is None:
+            return None
+        return {"window_seconds": window, **history.summary(window, time.time() if now is None else now)}
+
+    def summaries(self, service_name: str, windows: Iterable[float], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if service_name not in self._services:
+            return None
+        now = time.time() if now is None else now
+        return {f"{int(window)}s": self.summary(service_name, window, now) for window in windows}
+
+    def memory_bytes(self) -> int:
+        return sum(history.nbytes for history in self._services.values())
@@ -0,0 +1,189 @@
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from tools.http_client import get_http_client, resolve_service_url
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeResult(NamedTuple):
+    service: str
+    healthy: bool
+    latency_ms: float
+    checked_at: float
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+# Probes one service and reports what it saw. Must not raise; the scheduler enforces the timeout.
+Prober = Callable[[str], Awaitable[ProbeResult]]
+# Notified after every probe, e.g. to update the operator's view of the service.
+ResultHook = Callable[[ProbeResult], Any]
+
+
+async def http_probe(service_name: str) -> ProbeResult:
+    """GETs the service's /health endpoint through the shared connection pool."""
+    started = time.perf_counter()
+    url = f"{resolve_service_url(service_name)}/health"
+    try:
+        response = await get_http_client().get(url)
+        healthy = response.status_code == 200
+        error = None if healthy else f"HTTP {response.status_code}"
+        status_code = response.status_code
+    except Exception as e:
+        healthy, error, status_code = False, f"{type(e).__name__}: {e}", None
+    latency_ms = (time.perf_counter() - started) * 1000
+    return ProbeResult(service_name, healthy, latency_ms, time.time(), status_code, error)
+
+
+class _ServiceState:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.last: Optional[ProbeResult] = None
+        self.next_probe_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class HealthProbeScheduler:
+    """
+    Probes every tracked service on its own schedule, concurrently.
+
+    Each service has a dedicated task, so a service that hangs only ever delays its own
+    probes, and every probe is cut off after `timeout` seconds. The delay between probes
+    is the service's interval, randomised by +/- `jitter` (a fraction) so that services
+    added together do not stay in lockstep. After consecutive failures the delay doubles
+    each time, up to `max_backoff` seconds, and drops back as soon as a probe succeeds.
+    `max_concurrent` caps how many probes are in flight across all services.
+    """
+
+    def __init__(
+        self,
+        prober: Prober = http_probe,
+        default_interval: float = 15.0,
+        timeout: float = 2.0,
+        jitter: float = 0.1,
+        max_backoff: float = 300.0,
+        max_concurrent: int = 32,
+        on_result: Optional[ResultHook] = None,
+    ):
+        self.prober = prober
+        self.default_interval = default_interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.max_concurrent = max_concurrent
+        self.on_result = on_result
+        self._services: Dict[str, _ServiceState] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running = False
+
+    def track(self, service_name: str, interval: Optional[float] = None):
+        state = self._services.get(service_name)
+        if state is None:
+            state = self._services[service_name] = _ServiceState(interval or self.default_interval)
+        elif interval:
+            state.interval = interval
+        if self._running and state.task is None:
+            state.task = asyncio.create_task(self._run(service_name, state))
+
+    async def untrack(self, service_name: str):
+        state = self._services.pop(service_name, None)
+        if state is not None and state.task is not None:
+            state.task.cancel()
+            await asyncio.gather(state.task, return_exceptions=True)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        for service_name, state in self._services.items():
+            state.task = asyncio.create_task(self._run(service_name, state))
+
+    async def stop(self):
+        self._running = False
+        tasks = [state.task for state in self._services.values() if state.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for state in self._services.values():
+            state.task = None
+
+    def next_delay(self, state: _ServiceState) -> float:
+        delay = state.interval
+        if state.consecutive_failures > 1:
+            delay = min(self.max_backoff, delay * 2 ** (state.consecutive_failures - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _run(self, service_name: str, state: _ServiceState):
+        # Start at a random point in the first interval so probes are spread out from the beginning.
+        delay = random.uniform(0, state.interval)
+        # Checked as well as relying on cancellation: before Python 3.12, wait_for can swallow a
+        # cancel that lands while it is timing out a probe.
+        while self._running and self._services.get(service_name) is state:
+            state.next_probe_at = time.time() + delay
+            await asyncio.sleep(delay)
+            try:
+                await self.probe(service_name)
+            except Exception as e:
+                logger.error("Health probe bookkeeping for '%s' failed: %s", service_name, e)
+            delay = self.next_delay(state)
+
+    async def probe(self, service_name: str) -> ProbeResult:
+        """Probes a tracked service immediately and records the result."""
+        state = self._services.get(service_name)
+        if state is None:
+            raise KeyError(service_name)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self.prober(service_name), self.timeout)
+            except asyncio.TimeoutError:
+                state.timeouts += 1
+                result = ProbeResult(
+                    service_name, False, (time.perf_counter() - started) * 1000, time.time(),
+                    error=f"Timed out after {self.timeout:.1f}s",
+                )
+
+        state.probes += 1
+        state.last = result
+        if result.healthy:
+            state.consecutive_failures = 0
+        else:
+            state.failures += 1
+            state.consecutive_failures += 1
+            logger.warning("Health probe of '%s' failed (%s in a row): %s", service_name, state.consecutive_failures, result.error)
+
+        if self.on_result is not None:
+            outcome = self.on_result(result)
+            if asyncio.iscoroutine(outcome):
+                await outcome
+        return result
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            service_name: {
+                "healthy": None if state.last is None else state.last.healthy,
+                "latency_ms": None if state.last is None else round(state.last.latency_ms, 3),
+                "last_checked_at": None if state.last is None else state.last.checked_at,
+                "last_error": None if state.last is None else state.last.error,
+                "interval_seconds": state.interval,
+                "next_probe_at": state.next_probe_at,
+                "consecutive_failures": state.consecutive_failures,
+                "probes": state.probes,
+                "failures": state.failures,
+                "timeouts": state.timeouts,
+            }
+            for service_name, state in self._services.items()
+        }
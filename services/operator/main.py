@@ -1,63 +1,210 @@
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-import logging
+from decouple import config
+from contextlib import asynccontextmanager
 import asyncio
+from typing import Any, Dict, Optional
+
+from tools.http_client import close_http_client
+from tools.idempotency import install_idempotency
+from tools.metrics import install_metrics
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+from tools.startup import install_fast_start
+from tools.tracing import install_tracing
+from tools.utils import configure_logging, get_logger
+from health_history import HealthHistory
+from health_probes import HealthProbeScheduler, ProbeResult
+from remediation import RemediationEngine
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging("operator")
+# Per-request INFO logs are rate limited; warnings and errors always get through.
+logger = get_logger(__name__, per_second=config("LOG_REQUESTS_PER_SECOND", default=200.0, cast=float))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config("OPERATOR_PROBES_ENABLED", default=True, cast=bool):
+        probe_scheduler.start()
+    yield
+    await remediation_engine.stop()
+    await probe_scheduler.stop()
+    await close_http_client()
 
 app = FastAPI(
     title="AGIcore - Operator (Auto-Healing)",
     description="Monitors service health, diagnoses issues, and performs remediation actions.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
+app.add_middleware(SerializationMiddleware)
+install_idempotency(app)
+install_metrics(app, service="operator")
+install_tracing(app, service="operator")
+install_fast_start(app)
 
 class ServiceHealth(BaseModel):
     service_name: str
     status: str # e.g., "healthy", "unhealthy", "degraded"
     details: str = ""
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
 
 class RemediationEvent(BaseModel):
     service_name: str
-    action_taken: str # e.g., "restarted", "scaled_up", "alert_sent"
+    action_taken: str # e.g., "queued_restart", "restart_in_progress", "rate_limited", "escalated"
     success: bool
+    detail: str = ""
+
+def parse_intervals(spec: str) -> Dict[str, float]:
+    """Parses OPERATOR_PROBE_INTERVALS, e.g. "agicore-trader=5,agicore-mediamaker=30"."""
+    intervals = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        service_name, _, seconds = entry.partition("=")
+        intervals[service_name.strip()] = float(seconds)
+    return intervals
 
-# In-memory store for service status (for demonstration purposes)
+TRACKED_SERVICES = [
+    name.strip()
+    for name in config("OPERATOR_TRACKED_SERVICES", default="agicore-trader,agicore-mediamaker").split(",")
+    if name.strip()
+]
+
+# In-memory store for service status, kept current by the probe scheduler
 health_status_db = {
-    "agicore-trader": ServiceHealth(service_name="agicore-trader", status="healthy"),
-    "agicore-mediamaker": ServiceHealth(service_name="agicore-mediamaker", status="healthy"),
+    name: ServiceHealth(service_name=name, status="healthy") for name in TRACKED_SERVICES
 }
 
+# Probe history per service, bounded in memory; summaries are served by /health-history.
+health_history = HealthHistory(
+    raw_capacity=config("OPERATOR_HISTORY_RAW_SAMPLES", default=2048, cast=int),
+    rollup_seconds=config("OPERATOR_HISTORY_ROLLUP_SECONDS", default=60.0, cast=float),
+    rollup_capacity=config("OPERATOR_HISTORY_ROLLUPS", default=1440, cast=int),
+)
+
+def record_probe(result: ProbeResult):
+    if result.service not in health_status_db:
+        return
+    health_history.record(result.service, result.healthy, result.latency_ms, result.checked_at)
+    health_status_db[result.service] = ServiceHealth(
+        service_name=result.service,
+        status="healthy" if result.healthy else "unhealthy",
+        details=result.error or "",
+        latency_ms=round(result.latency_ms, 3),
+        checked_at=result.checked_at,
+    )
+
+probe_scheduler = HealthProbeScheduler(
+    default_interval=config("OPERATOR_PROBE_INTERVAL", default=15.0, cast=float),
+    timeout=config("OPERATOR_PROBE_TIMEOUT", default=2.0, cast=float),
+    jitter=config("OPERATOR_PROBE_JITTER", default=0.1, cast=float),
+    max_backoff=config("OPERATOR_PROBE_MAX_BACKOFF", default=300.0, cast=float),
+    max_concurrent=config("OPERATOR_PROBE_MAX_CONCURRENT", default=32, cast=int),
+    on_result=record_probe,
+)
+_probe_intervals = parse_intervals(config("OPERATOR_PROBE_INTERVALS", default=""))
+for _name in TRACKED_SERVICES:
+    probe_scheduler.track(_name, _probe_intervals.get(_name))
+
 async def simulate_service_restart(service_name: str):
     """Simulates an asynchronous restart operation."""
-    logger.info(f"Attempting to restart service: {service_name}...")
+    logger.info("Attempting to restart service: %s...", service_name)
     await asyncio.sleep(5) # Simulate time taken to restart
     # In a real system, this would interact with a container orchestrator (e.g., Kubernetes, Cloud Run API)
     health_status_db[service_name].status = "healthy"
-    logger.info(f"Service {service_name} restart completed. Status set to 'healthy'.")
+    logger.info("Service %s restart completed. Status set to 'healthy'.", service_name)
     # Here you would publish a Pub/Sub event like 'operator.remediation.attempted'
 
+async def restart_and_verify(service_name: str) -> bool:
+    """Restarts a service and probes it, so a restart only counts as successful if the service is back."""
+    await simulate_service_restart(service_name)
+    if not config("OPERATOR_VERIFY_RESTARTS", default=True, cast=bool):
+        return True
+    return (await probe_scheduler.probe(service_name)).healthy
+
+def escalate(service_name: str, reason: str):
+    logger.critical("Automatic remediation of '%s' is paused; human attention needed. Last report: %s", service_name, reason)
+    # Here you would publish a Pub/Sub event like 'operator.remediation.escalated' or page on-call
+
+REMEDIATION_WINDOW = config("OPERATOR_REMEDIATION_WINDOW", default=120.0, cast=float)
+REMEDIATION_MIN_SAMPLES = config("OPERATOR_REMEDIATION_MIN_SAMPLES", default=3, cast=int)
+REMEDIATION_ERROR_RATE = config("OPERATOR_REMEDIATION_ERROR_RATE", default=0.5, cast=float)
+
+def restart_gate(service_name: str) -> Optional[str]:
+    """
+    Defers a restart while the service's own probes over the last REMEDIATION_WINDOW seconds
+    mostly succeed. Without enough probe history the unhealthy report is trusted as is.
+    """
+    window = health_history.summary(service_name, REMEDIATION_WINDOW)
+    if window is None or window["samples"] < REMEDIATION_MIN_SAMPLES:
+        return None
+    if window["error_rate"] < REMEDIATION_ERROR_RATE:
+        return (
+            f"Probe error rate over the last {REMEDIATION_WINDOW:.0f}s is {window['error_rate']:.0%} "
+            f"(threshold {REMEDIATION_ERROR_RATE:.0%}); not restarting on a single report."
+        )
+    return None
+
+remediation_engine = RemediationEngine(
+    restart=restart_and_verify,
+    restarts_per_service=config("OPERATOR_RESTARTS_PER_SERVICE", default=3, cast=float),
+    fleet_restarts=config("OPERATOR_FLEET_RESTARTS", default=10, cast=float),
+    window=config("OPERATOR_RESTART_WINDOW", default=600.0, cast=float),
+    failure_threshold=config("OPERATOR_BREAKER_FAILURES", default=3, cast=int),
+    reset_timeout=config("OPERATOR_BREAKER_RESET", default=900.0, cast=float),
+    on_escalate=escalate,
+    gate=restart_gate,
+)
+
 @app.post("/run-health-check/{service_name}", response_model=ServiceHealth)
 async def run_health_check(service_name: str):
     """
-    Actively probes a service to check its health.
+    Actively probes a service's /health endpoint right now, without waiting for its next scheduled probe.
     """
-    logger.info(f"Running health check for service: {service_name}")
+    logger.info("Running health check for service: %s", service_name)
     if service_name not in health_status_db:
         raise HTTPException(status_code=404, detail=f"Service '{service_name}' not tracked.")
-    
-    # In a real system, this would make an HTTP call to the service's /health endpoint.
-    # We'll just return the stored status.
+
+    await probe_scheduler.probe(service_name)
     return health_status_db[service_name]
 
+@app.get("/health-probes", response_model=Dict[str, Dict[str, Any]])
+async def health_probes():
+    """
+    Returns the probe scheduler's view of every tracked service: last status and latency,
+    failure counts and when the next probe is due.
+    """
+    return probe_scheduler.status()
+
+@app.get("/health-history/{service_name}", response_model=Dict[str, Any])
+async def service_health_history(service_name: str, windows: str = Query("60,300,3600")):
+    """
+    Summarizes a service's probe history over sliding windows (comma-separated seconds):
+    number of probes, uptime, error rate and p50/p95/p99 probe latency in milliseconds.
+    """
+    if service_name not in health_status_db:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not tracked.")
+    try:
+        window_seconds = [float(window) for window in windows.split(",") if window.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Windows must be comma-separated numbers of seconds.")
+    if not window_seconds or min(window_seconds) <= 0:
+        raise HTTPException(status_code=400, detail="Windows must be positive numbers of seconds.")
+
+    return {
+        "service_name": service_name,
+        "windows": health_history.summaries(service_name, window_seconds) or {},
+    }
+
 @app.post("/diagnose-and-remediate", response_model=RemediationEvent)
-async def diagnose_and_remediate(health_report: ServiceHealth, background_tasks: BackgroundTasks):
+async def diagnose_and_remediate(health_report: ServiceHealth):
     """
     Receives a health report (e.g., from a monitoring system) and takes action if unhealthy.
+    Restarts go through the remediation engine, which deduplicates, rate limits and
+    circuit-breaks them, so repeated reports about a flapping service cannot cause a restart storm.
     """
-    logger.info(f"Received health report for {health_report.service_name}: status is {health_report.status}")
+    logger.info("Received health report for %s: status is %s", health_report.service_name, health_report.status)
     
     if health_report.service_name not in health_status_db:
         raise HTTPException(status_code=404, detail=f"Service '{health_report.service_name}' not tracked.")
@@ -66,15 +213,13 @@ async def diagnose_and_remediate(health_report: ServiceHealth, background_tasks:
     health_status_db[health_report.service_name] = health_report
 
     if health_report.status == "unhealthy":
-        logger.warning(f"Service {health_report.service_name} is unhealthy. Attempting remediation.")
-        
-        # Add the restart task to run in the background
-        background_tasks.add_task(simulate_service_restart, health_report.service_name)
-        
+        logger.warning("Service %s is unhealthy. Attempting remediation.", health_report.service_name)
+        decision = remediation_engine.request_restart(health_report.service_name, health_report.details)
         return RemediationEvent(
             service_name=health_report.service_name,
-            action_taken=f"queued_restart",
-            success=True
+            action_taken=decision.action,
+            success=decision.accepted,
+            detail=decision.detail,
         )
 
     return RemediationEvent(
@@ -83,6 +228,18 @@ async def diagnose_and_remediate(health_report: ServiceHealth, background_tasks:
         success=True
     )
 
+@app.get("/remediation", response_model=Dict[str, Dict[str, Any]])
+async def remediation_status():
+    """
+    Returns the remediation state of every service that has been reported unhealthy:
+    circuit state, remaining restart budget and how many requests were deduplicated or rate limited.
+    """
+    return remediation_engine.status()
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
 @app.get("/")
 async def root():
     return {"message": "AGIcore Operator is running."}
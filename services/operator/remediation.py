@@ -0,0 +1,230 @@
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Restarts a service and reports whether it came back healthy.
+Restarter = Callable[[str], Awaitable[bool]]
+# Returns a reason to hold off restarting a service (e.g. its recent history looks fine), or None.
+RestartGate = Callable[[str], Optional[str]]
+# Notified when a service's circuit opens, i.e. automatic remediation has given up on it.
+EscalationHook = Callable[[str, str], Any]
+
+
+class TokenBucket:
+    """Allows `capacity` actions in a burst, refilled continuously at `capacity` per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self) -> bool:
+        self._refill()
+        return self.tokens >= 1
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def retry_after(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed remediations. While open nothing is
+    attempted; after `reset_timeout` seconds one trial is let through (half-open), which
+    closes the circuit if it succeeds and re-opens it if it fails.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 900.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """Records a failed remediation; returns True when this failure opened the circuit."""
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            return not was_open
+        return False
+
+
+class RemediationDecision(NamedTuple):
+    action: str  # "queued_restart", "restart_in_progress", "deferred", "rate_limited" or "escalated"
+    accepted: bool
+    detail: str = ""
+
+
+class _ServiceRemediation:
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.inflight: Optional[asyncio.Task] = None
+        self.restarts = 0
+        self.failed_restarts = 0
+        self.deduplicated = 0
+        self.deferred = 0
+        self.rate_limited = 0
+        self.escalations = 0
+        self.last_restart_at: Optional[float] = None
+
+
+class RemediationEngine:
+    """
+    Decides whether an unhealthy report may restart a service, so that a flapping service
+    cannot trigger a restart storm.
+
+    - At most one restart per service is in flight; further requests join it.
+    - An optional gate can defer a restart, e.g. when the service's recent probe history
+      says a single unhealthy report is a blip rather than an outage.
+    - Restarts are rate limited per service and across the whole fleet by token buckets.
+    - Repeated failed restarts open the service's circuit breaker, which escalates instead
+      of restarting until the breaker's reset timeout has passed.
+    """
+
+    def __init__(
+        self,
+        restart: Restarter,
+        restarts_per_service: float = 3,
+        fleet_restarts: float = 10,
+        window: float = 600.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 900.0,
+        on_escalate: Optional[EscalationHook] = None,
+        gate: Optional[RestartGate] = None,
+    ):
+        self.restart = restart
+        self.gate = gate
+        self.restarts_per_service = restarts_per_service
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_escalate = on_escalate
+        self.fleet_bucket = TokenBucket(fleet_restarts, window)
+        self._services: Dict[str, _ServiceRemediation] = {}
+
+    def _state(self, service_name: str) -> _ServiceRemediation:
+        state = self._services.get(service_name)
+        if state is None:
+            state = self._services[service_name] = _ServiceRemediation(
+                TokenBucket(self.restarts_per_service, self.window),
+                CircuitBreaker(self.failure_threshold, self.reset_timeout),
+            )
+        return state
+
+    def request_restart(self, service_name: str, reason: str = "") -> RemediationDecision:
+        state = self._state(service_name)
+
+        if state.inflight is not None and not state.inflight.done():
+            state.deduplicated += 1
+            return RemediationDecision("restart_in_progress", True, "Joined the restart already in flight.")
+
+        if self.gate is not None:
+            deferral = self.gate(service_name)
+            if deferral:
+                state.deferred += 1
+                return RemediationDecision("deferred", True, deferral)
+
+        if not state.breaker.allow():
+            return RemediationDecision(
+                "escalated", False,
+                f"Circuit open after {state.breaker.consecutive_failures} failed restarts; automatic remediation is paused.",
+            )
+
+        for scope, bucket in (("service", state.bucket), ("fleet", self.fleet_bucket)):
+            if not bucket.available():
+                state.rate_limited += 1
+                return RemediationDecision(
+                    "rate_limited", False,
+                    f"The {scope} restart budget is exhausted; next restart allowed in {bucket.retry_after():.0f}s.",
+                )
+        state.bucket.take()
+        self.fleet_bucket.take()
+
+        state.restarts += 1
+        state.last_restart_at = time.time()
+        state.inflight = asyncio.create_task(self._restart(service_name, state, reason))
+        return RemediationDecision("queued_restart", True)
+
+    async def _restart(self, service_name: str, state: _ServiceRemediation, reason: str):
+        try:
+            recovered = await self.restart(service_name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Restart of '%s' raised: %s", service_name, e)
+            recovered = False
+
+        if recovered:
+            state.breaker.record_success()
+            return
+        state.failed_restarts += 1
+        if state.breaker.record_failure():
+            state.escalations += 1
+            logger.error(
+                "Circuit opened for '%s' after %s failed restarts; escalating.",
+                service_name, state.breaker.consecutive_failures,
+            )
+            if self.on_escalate is not None:
+                outcome = self.on_escalate(service_name, reason)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+
+    async def wait_idle(self, service_name: str):
+        """Waits for the service's in-flight restart, if any, to finish."""
+        state = self._services.get(service_name)
+        if state is not None and state.inflight is not None:
+            await asyncio.gather(state.inflight, return_exceptions=True)
+
+    async def stop(self):
+        tasks = [state.inflight for state in self._services.values() if state.inflight is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            service_name: {
+                "restart_in_progress": state.inflight is not None and not state.inflight.done(),
+                "circuit": state.breaker.state,
+                "consecutive_failures": state.breaker.consecutive_failures,
+                "restart_tokens": round(state.bucket.tokens, 3),
+                "restarts": state.restarts,
+                "failed_restarts": state.failed_restarts,
+                "deduplicated": state.deduplicated,
+                "deferred": state.deferred,
+                "rate_limited": state.rate_limited,
+                "escalations": state.escalations,
+                "last_restart_at": state.last_restart_at,
+            }
+            for service_name, state in self._services.items()
+        }
@@ -0,0 +1,70 @@
+"""
+Measures the overhead of one agent-to-agent call (one plan step) through call_service when
+the target runs in the same process: over the HTTP stack via in-process ASGI, which is what
+the separate-container mode costs before any network time, against the monolith's direct
+dispatch to the handler coroutine.
+
+Run from the repository root:  python -m tests.bench.bench_dispatch
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("MCP_PLAN_DB_PATH", ":memory:")
+os.environ.setdefault("STORAGE_ROOT", tempfile.mkdtemp(prefix="agicore-bench-storage-"))
+os.environ.setdefault("TRACING_EXPORT_PATH", os.path.join(tempfile.mkdtemp(prefix="agicore-bench-traces-"), "traces.jsonl"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from tools import http_client
+from tools.local_dispatch import LocalService, LocalServiceTransport
+from tools.monolith import SERVICES, load_service_module
+
+CALLS = 5000
+# (service, method, path, body): an empty handler, then real plan steps.
+STEPS = [
+    ("agicore-analytics", "GET", "/", None),
+    ("agicore-analytics", "POST", "/analyze-news", {"data_source": "market_data", "topic": "AI stocks", "analysis_type": "trend_forecast"}),
+    ("agicore-trader", "POST", "/execute-trade", {"symbol": "BTC-USD", "action": "BUY", "quantity": 1.0}),
+]
+
+
+async def measure(service: str, method: str, path: str, body, calls: int):
+    """Returns the per-call latencies in microseconds."""
+    for _ in range(200):
+        await http_client.call_service(service, path, json=body, method=method)
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await http_client.call_service(service, path, json=body, method=method)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+def report(name: str, latencies):
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{name:<48}{statistics.mean(latencies):>10.1f}{cuts[49]:>10.1f}{cuts[98]:>10.1f}")
+
+
+async def main():
+    services = {name: LocalService(name, load_service_module(SERVICES[name]).app) for name in ("agicore-analytics", "agicore-trader")}
+    print(f"{'step':<48}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for service, method, path, body in STEPS:
+        # Separate-container mode, minus the network: the full HTTP request and response path.
+        http_client._client = httpx.AsyncClient(transport=LocalServiceTransport(services, httpx.AsyncHTTPTransport()))
+        report(f"{service} {method} {path} (asgi)", await measure(service, method, path, body, CALLS))
+        await http_client.close_http_client()
+
+        for name, local in services.items():
+            await http_client.register_local_service(name, local)
+        report(f"{service} {method} {path} (direct)", await measure(service, method, path, body, CALLS))
+        for name in services:
+            await http_client.register_local_service(name, None)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Measures how long a burst of concurrent small writes takes to become durable through the
+storage agent's object store: with one fsync per file and no group commit, and with the
+GroupCommitter syncing each batch with one fsync per file or with a single syncfs. For the
+group modes it also prints the time spent committing, which is where the sync mode shows.
+
+Run from the repository root:  python -m tests.bench.bench_group_commit [WRITES] [SIZE]
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+
+from tests.helpers import load_service_module
+
+object_store = load_service_module("agicore-storage", "object_store")
+
+WRITES = 2000
+SIZE = 512
+ROUNDS = 3
+
+
+def build_store(root: str, mode: str):
+    if mode == "no-group-commit":
+        return object_store.LocalFileObjectStore(root), None
+    committer = object_store.GroupCommitter(syncfs=mode == "group/syncfs")
+    return object_store.LocalFileObjectStore(root, committer=committer), committer
+
+
+async def burst(mode: str, writes: int, size: int) -> float:
+    """Returns the seconds it takes for `writes` concurrent puts of `size` bytes to complete."""
+    with tempfile.TemporaryDirectory(dir=".") as root:
+        store, committer = build_store(root, mode)
+        body = b"x" * size
+        started = time.perf_counter()
+        await asyncio.gather(*(store.put_bytes("agicore-bench", f"objects/{i}", body) for i in range(writes)))
+        elapsed = time.perf_counter() - started
+        if committer is not None:
+            stats = committer.stats()
+            print(
+                f"{'':<20}{stats['batches']} batches, {stats['data_syncs']} data syncs, "
+                f"{stats['directory_syncs']} directory syncs, {stats['commit_seconds']:.3f} s committing"
+            )
+        return elapsed
+
+
+async def main(writes: int, size: int):
+    modes = ["no-group-commit", "group/fsync"]
+    if object_store._syncfs is not None:
+        modes.append("group/syncfs")
+    print(f"{writes} concurrent writes of {size} bytes, median of {ROUNDS} rounds")
+    for mode in modes:
+        seconds = [await burst(mode, writes, size) for _ in range(ROUNDS)]
+        median = statistics.median(seconds)
+        print(f"{mode:<20}{median:>8.3f} s{writes / median:>12.0f} writes/s")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*args, *[WRITES, SIZE][len(args):]))
@@ -0,0 +1,129 @@
+"""
+Compares request latency when every request logs a line through a plain synchronous
+StreamHandler (writing to a file on the event loop) against the non-blocking pipeline:
+a bounded queue drained by a writer thread that formats JSON. Each is run against a fast
+local file and against a sink whose flush stalls briefly, like a backed-up stdout pipe.
+
+Run from the repository root:  python -m tests.bench.bench_logging
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from fastapi import FastAPI
+
+from tools.serialization import FastJSONResponse
+from tools.utils import JsonFormatter, NonBlockingQueueHandler
+
+REQUESTS = 20000
+SLOW_FLUSH_SECONDS = 0.0002
+
+
+class SlowStream:
+    """A file whose every flush stalls, standing in for a log collector that is falling behind."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w")
+
+    def write(self, data: str):
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+        time.sleep(SLOW_FLUSH_SECONDS)
+
+    def close(self):
+        self._file.close()
+
+
+def build_app(logger: logging.Logger) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/plans/{plan_id}")
+    async def get_plan(plan_id: str):
+        logger.info("Fetched plan %s", plan_id, extra={"plan_id": plan_id})
+        return {"id": plan_id, "status": "created"}
+
+    return app
+
+
+async def drive(app, requests: int):
+    """Returns the per-request latencies in microseconds."""
+    path = "/plans/plan_abc123"
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+def report(name: str, latencies):
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{name:<16}{statistics.mean(latencies):>10.2f}{cuts[49]:>10.2f}{cuts[98]:>10.2f}{max(latencies):>12.2f}")
+
+
+def open_sink(kind: str, path: str):
+    return open(path, "w") if kind == "file" else SlowStream(path)
+
+
+def sync_logger(name: str, stream) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.propagate = False
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    return logger
+
+
+def queued_logger(name: str, stream):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.propagate = False
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(queue.Queue(maxsize=10000), output)
+    handler = NonBlockingQueueHandler(listener.queue)
+    logger.addHandler(handler)
+    listener.start()
+    return logger, listener, handler
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'handler':<16}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>12}")
+        for sink in ("file", "slow"):
+            stream = open_sink(sink, os.path.join(directory, f"sync-{sink}.log"))
+            report(f"sync/{sink}", await drive(build_app(sync_logger(f"sync.{sink}", stream)), REQUESTS))
+            stream.close()
+
+            stream = open_sink(sink, os.path.join(directory, f"queued-{sink}.log"))
+            logger, listener, handler = queued_logger(f"queued.{sink}", stream)
+            report(f"queued/{sink}", await drive(build_app(logger), REQUESTS))
+            listener.stop()
+            stream.close()
+            print(f"{'':<16}queued records dropped: {handler.dropped}")
+
+
+if __name__ == "__main__":
+    logging.getLogger("bench").setLevel(logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Measures the per-request overhead of the metrics middleware by driving a small app
+directly over ASGI (no network or HTTP client), with and without install_metrics.
+
+Run from the repository root:  python -m tests.bench.bench_metrics
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from tools.metrics import MetricsMiddleware, MetricsRegistry, install_metrics
+from tools.serialization import FastJSONResponse
+
+REQUESTS = 20000
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/plans/{plan_id}")
+    async def get_plan(plan_id: str):
+        return {"id": plan_id, "status": "created"}
+
+    if with_metrics:
+        install_metrics(app, service="bench")
+    return app
+
+
+async def drive(app, path: str, requests: int) -> float:
+    """Returns the mean time per request in microseconds."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # Warm up (route matching caches, lazy middleware stack build)
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def main():
+    # The middleware around a do-nothing ASGI app isolates its own cost from FastAPI's.
+    routes = build_app(False)
+    bare = min([await drive(noop_app, "/plans/plan_abc123", REQUESTS) for _ in range(5)])
+    wrapped = MetricsMiddleware(noop_app, MetricsRegistry("bench"), routes_of=routes)
+    timed = min([await drive(wrapped, "/plans/plan_abc123", REQUESTS) for _ in range(5)])
+    print(f"Middleware alone: {timed - bare:.2f} µs per request\n")
+
+    print(f"{'path':<20}{'baseline µs':>14}{'metrics µs':>14}{'overhead µs':>14}")
+    for path in ("/health", "/plans/plan_abc123"):
+        baseline = min([await drive(build_app(False), path, REQUESTS) for _ in range(5)])
+        instrumented = min([await drive(build_app(True), path, REQUESTS) for _ in range(5)])
+        print(f"{path:<20}{baseline:>14.2f}{instrumented:>14.2f}{instrumented - baseline:>14.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
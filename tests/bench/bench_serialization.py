@@ -0,0 +1,81 @@
+"""
+Compares JSON (stdlib vs orjson) and MessagePack on representative AGIcore payloads:
+a large MCP plan and a 5000-bar market-data response, plus the stored size under each
+compression codec.
+
+Run from the repository root:  python -m tests.bench.bench_serialization
+"""
+
+import asyncio
+import json
+import time
+
+from tests.helpers import load_service_module
+from tools import serialization
+
+
+def plan_payload(steps: int = 500) -> dict:
+    mcp = load_service_module("agicore_mcp")
+    template = [step.model_dump() for step in mcp.build_example_steps()]
+    plan_steps = []
+    for i in range(steps // len(template)):
+        for step in template:
+            plan_steps.append({
+                **step,
+                "id": f"{step['id']}-{i}",
+                "depends_on": [f"{dep}-{i}" for dep in step["depends_on"]],
+            })
+    return {"id": "plan_benchmark", "status": "created", "created_at": time.time(), "steps": plan_steps}
+
+
+def market_data_payload(limit: int = 5000) -> dict:
+    market_data = load_service_module("agicore-trader", "market_data")
+    engine = market_data.MarketDataEngine()
+    bars = asyncio.run(engine.get_bars("BTC-USD", "5m", limit))
+    payload = {"symbol": "BTC-USD", "timeframe": "5m"}
+    payload.update({name: float(value) for name, value in zip(market_data.COLUMNS, bars[-1])})
+    payload["bars"] = market_data.bars_to_columns(bars)
+    return payload
+
+
+def _best_of(func, repeat: int = 5, number: int = 20) -> float:
+    """Best average time per call in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def bench_payload(name: str, payload: dict):
+    stdlib = json.dumps(payload).encode()
+    fast = serialization.dumps(payload)
+    rows = [
+        ("json (stdlib)", lambda: json.dumps(payload).encode(), lambda: json.loads(stdlib), len(stdlib)),
+        ("json (orjson)", lambda: serialization.dumps(payload), lambda: serialization.loads(fast), len(fast)),
+    ]
+    if serialization.msgpack is not None:
+        packed = serialization.packb(payload)
+        rows.append(("msgpack", lambda: serialization.packb(payload), lambda: serialization.unpackb(packed), len(packed)))
+
+    print(f"\n{name}")
+    print(f"  {'format':<16}{'encode µs':>12}{'decode µs':>12}{'bytes':>12}")
+    for label, encode, decode, size in rows:
+        print(f"  {label:<16}{_best_of(encode):>12.1f}{_best_of(decode):>12.1f}{size:>12,}")
+
+    print(f"  {'codec':<16}{'compress µs':>12}{'bytes':>12}{'ratio':>12}")
+    for codec in serialization.CODECS:
+        compressed = serialization.compress(fast, codec)
+        elapsed = _best_of(lambda: serialization.compress(fast, codec), number=5)
+        print(f"  {codec:<16}{elapsed:>12.1f}{len(compressed):>12,}{len(fast) / len(compressed):>12.2f}")
+
+
+def main():
+    bench_payload("MCP plan (500 steps)", plan_payload())
+    bench_payload("Market data (5000 bars)", market_data_payload())
+
+
+if __name__ == "__main__":
+    main()
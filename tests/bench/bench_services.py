@@ -0,0 +1,360 @@
+"""
+Load and latency benchmarks for every agent, run in-process: each FastAPI app is driven
+through httpx's ASGI transport, and calls between agents (e.g. the MCP executing a plan)
+are routed to the other apps in the same process, so no network is involved. With
+`--dispatch direct` those inter-agent calls skip HTTP entirely, as in monolith mode.
+
+Each scenario is run with `--concurrency` clients sharing `--requests` requests, and
+reports throughput and p50/p95/p99 latency. `--payload-size` scales the request bodies
+(object size in bytes, items per batch, bars per market data request).
+
+Run from the repository root:
+    python -m tests.bench.bench_services                          # print the results
+    python -m tests.bench.bench_services --save baseline.json     # record a baseline
+    python -m tests.bench.bench_services --check baseline.json    # exit 1 on a regression
+
+Baselines are only comparable on the same machine and settings; record one from the
+deployed branch, then check candidates against it before deploying.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+# Same isolation as the test suite: no plan database, objects or traces left in the working tree.
+os.environ.setdefault("MCP_PLAN_DB_PATH", ":memory:")
+os.environ.setdefault("STORAGE_ROOT", tempfile.mkdtemp(prefix="agicore-bench-storage-"))
+os.environ.setdefault("TRACING_EXPORT_PATH", os.path.join(tempfile.mkdtemp(prefix="agicore-bench-traces-"), "traces.jsonl"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from tests.helpers import load_service_module
+from tools import http_client
+from tools.local_dispatch import LocalService
+from tools.monolith import SERVICES as SERVICE_DIRS
+# Metrics compared by --check. Throughput regresses when it drops, latencies when they grow.
+TRACKED_METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+
+class BenchmarkError(Exception):
+    """Raised by a scenario when a request fails, so failures are counted rather than timed as successes."""
+
+
+class ServiceRouter(httpx.AsyncBaseTransport):
+    """Dispatches requests to in-process apps by the host their service name resolves to."""
+
+    def __init__(self, apps: Dict[str, Any]):
+        self._transports = {
+            urlsplit(http_client.resolve_service_url(service)).hostname: httpx.ASGITransport(app=app)
+            for service, app in apps.items()
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self._transports.get(request.url.host)
+        if transport is None:
+            raise httpx.ConnectError(f"No in-process app for host '{request.url.host}'", request=request)
+        return await transport.handle_async_request(request)
+
+
+class Clients:
+    """One client per agent, all sharing the in-process router."""
+
+    def __init__(self, apps: Dict[str, Any]):
+        self.router = ServiceRouter(apps)
+        self._clients = {
+            service: httpx.AsyncClient(transport=self.router, base_url=http_client.resolve_service_url(service))
+            for service in apps
+        }
+
+    def __getitem__(self, service: str) -> httpx.AsyncClient:
+        return self._clients[service]
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+
+
+def load_apps() -> Dict[str, Any]:
+    return {service: load_service_module(directory).app for service, directory in SERVICE_DIRS.items()}
+
+
+async def expect_ok(response: httpx.Response) -> httpx.Response:
+    if response.status_code >= 400:
+        raise BenchmarkError(f"{response.request.method} {response.request.url.path}: HTTP {response.status_code}")
+    await response.aread()
+    return response
+
+
+# A scenario makes one logical request: it gets the clients, the request number and the payload size.
+ScenarioCall = Callable[[Clients, int, int], Awaitable[Any]]
+
+
+class Scenario(NamedTuple):
+    name: str
+    call: ScenarioCall
+    setup: Optional[Callable[[Clients, int], Awaitable[Any]]] = None
+
+
+def post(service: str, path: str, body: Callable[[int, int], Any]) -> ScenarioCall:
+    async def call(clients: Clients, i: int, size: int):
+        return await expect_ok(await clients[service].post(path, json=body(i, size)))
+    return call
+
+
+def get(service: str, path: Callable[[int, int], str]) -> ScenarioCall:
+    async def call(clients: Clients, i: int, size: int):
+        return await expect_ok(await clients[service].get(path(i, size)))
+    return call
+
+
+TOPICS = ("AI stocks", "semiconductors", "energy", "biotech", "crypto", "banks", "retail", "autos")
+SYMBOLS = ("BTC-USD", "ETH-USD", "AAPL", "MSFT", "NVDA", "TSLA", "AMZN", "GOOG")
+
+
+def order(i: int) -> Dict[str, Any]:
+    return {"symbol": SYMBOLS[i % len(SYMBOLS)], "action": "BUY" if i % 3 else "SELL", "quantity": 1.0 + i % 5}
+
+
+async def put_objects(clients: Clients, size: int):
+    for i in range(64):
+        await expect_ok(await clients["agicore-storage"].put(f"/objects/bench/blob-{i}", content=b"x" * size))
+
+
+_plan_ids: List[str] = []
+
+
+async def create_plans(clients: Clients, size: int):
+    response = await expect_ok(await clients["agicore-mcp"].post("/create-plans", json=[{"description": f"goal {i}"} for i in range(64)]))
+    _plan_ids[:] = [plan["id"] for plan in response.json()]
+
+
+async def plan_flow(clients: Clients, i: int, size: int):
+    """The full request path of a goal: create a plan, then execute it across the agents."""
+    plan = (await expect_ok(await clients["agicore-mcp"].post("/create-plan", json={"description": f"Report on {TOPICS[i % len(TOPICS)]}"}))).json()
+    result = (await expect_ok(await clients["agicore-mcp"].post(f"/execute-plan/{plan['id']}"))).json()
+    if result["status"] != "completed":
+        raise BenchmarkError(f"Plan {plan['id']} finished with status '{result['status']}'")
+
+
+SCENARIOS = [
+    Scenario("analytics.analyze_news", post("agicore-analytics", "/analyze-news", lambda i, size: {
+        "data_source": "news_feed", "topic": TOPICS[i % len(TOPICS)], "analysis_type": "sentiment",
+    })),
+    Scenario("analytics.analyze_news_batch", post("agicore-analytics", "/analyze-news/batch", lambda i, size: {"requests": [
+        {"data_source": "news_feed", "topic": f"{TOPICS[j % len(TOPICS)]} {j % 16}", "analysis_type": "trend_forecast"} for j in range(size)
+    ]})),
+    Scenario("analytics.ingest_trends", post("agicore-analytics", "/trends/ingest", lambda i, size: {"points": [
+        {"series": f"price:{SYMBOLS[j % len(SYMBOLS)]}", "value": 100.0 + (i + j) % 17} for j in range(size)
+    ]})),
+    Scenario("mediamaker.generate_image", post("agicore-mediamaker", "/generate-image", lambda i, size: {
+        "prompt": f"A city skyline at dusk, variation {i % 256}",
+    })),
+    Scenario("storage.store_object", post("agicore-storage", "/store-object", lambda i, size: {
+        "bucket": "bench", "key": f"objects/{i}.json", "content": {"data": "x" * size},
+    })),
+    Scenario("storage.get_object", get("agicore-storage", lambda i, size: f"/objects/bench/blob-{i % 64}"), setup=put_objects),
+    Scenario("trader.execute_trade", post("agicore-trader", "/execute-trade", lambda i, size: order(i))),
+    Scenario("trader.execute_trades", post("agicore-trader", "/execute-trades", lambda i, size: [order(i + j) for j in range(size)])),
+    Scenario("trader.get_market_data", post("agicore-trader", "/get-market-data", lambda i, size: {
+        "symbol": SYMBOLS[i % len(SYMBOLS)], "timeframe": "1h", "limit": size,
+    })),
+    Scenario("mcp.create_plan", post("agicore-mcp", "/create-plan", lambda i, size: {"description": f"goal {i}"})),
+    Scenario("mcp.get_plan", get("agicore-mcp", lambda i, size: f"/plans/{_plan_ids[i % len(_plan_ids)]}"), setup=create_plans),
+    Scenario("mcp.plan_flow", plan_flow),
+    Scenario("operator.run_health_check", post("operator", "/run-health-check/agicore-trader", lambda i, size: None)),
+    Scenario("operator.health_probes", get("operator", lambda i, size: "/health-probes")),
+]
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(p / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round((len(latencies) + errors) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+async def run_scenario(clients: Clients, scenario: Scenario, requests: int, concurrency: int, size: int, warmup: int) -> Dict[str, Any]:
+    if scenario.setup is not None:
+        await scenario.setup(clients, size)
+    for i in range(warmup):
+        await scenario.call(clients, i, size)
+
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = []
+
+    async def worker():
+        while (i := next(counter)) < requests:
+            started = time.perf_counter()
+            try:
+                await scenario.call(clients, i, size)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    result = summarize(latencies, len(errors), time.perf_counter() - started)
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+async def run_suite(
+    requests: int = 500,
+    concurrency: int = 16,
+    size: int = 64,
+    warmup: int = 20,
+    rounds: int = 3,
+    only: Optional[List[str]] = None,
+    report: Callable[[str, Dict[str, Any]], Any] = lambda name, result: None,
+    dispatch: str = "asgi",
+) -> Dict[str, Any]:
+    """
+    Runs every scenario (or those whose name starts with one of `only`) `rounds` times and
+    keeps each scenario's fastest round, which is the least disturbed by the rest of the machine.
+    `dispatch` is how agents call each other: "asgi" (over HTTP, in-process) or "direct".
+    """
+    apps = load_apps()
+    clients = Clients(apps)
+    local = {service: LocalService(service, app) for service, app in apps.items()} if dispatch == "direct" else {}
+    for service, dispatcher in local.items():
+        await http_client.register_local_service(service, dispatcher)
+    # Calls one agent makes to another go through the same in-process router.
+    previous_client = http_client._client
+    http_client._client = httpx.AsyncClient(transport=clients.router)
+    results = {}
+    try:
+        for scenario in SCENARIOS:
+            if only and not any(scenario.name.startswith(prefix) for prefix in only):
+                continue
+            runs = [await run_scenario(clients, scenario, requests, concurrency, size, warmup) for _ in range(rounds)]
+            results[scenario.name] = max(runs, key=lambda run: run["throughput_rps"])
+            report(scenario.name, results[scenario.name])
+    finally:
+        await http_client._client.aclose()
+        http_client._client = previous_client
+        for service, dispatcher in local.items():
+            await http_client.register_local_service(service, None)
+            await dispatcher.aclose()
+        await clients.aclose()
+
+    return {
+        "meta": {
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "payload_size": size,
+            "rounds": rounds,
+            "dispatch": dispatch,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, tracked=TRACKED_METRICS) -> List[str]:
+    """
+    Returns a description of every tracked metric that is more than `threshold` (a fraction)
+    worse than in the baseline, and of every scenario that had failed requests.
+    Scenarios missing from either side are skipped.
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} failed requests ({result.get('first_error')})")
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        for metric in tracked:
+            before, after = previous.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > threshold:
+                regressions.append(f"{name}: {metric} {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+def print_result(name: str, result: Dict[str, Any]):
+    print(
+        f"{name:<32}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+        f"{result['p99_ms']:>10.2f}{result['errors']:>8}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and round.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients sending requests at the same time.")
+    parser.add_argument("--payload-size", type=int, default=64, help="Bytes per object, items per batch, bars per query.")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests before each round.")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per scenario; the fastest is kept.")
+    parser.add_argument("--dispatch", choices=("asgi", "direct"), default="asgi", help="How agents call each other: over HTTP or straight to the handler.")
+    parser.add_argument("--scenario", action="append", help="Only run scenarios starting with this name (repeatable).")
+    parser.add_argument("--save", metavar="PATH", help="Write the results to PATH as a JSON baseline.")
+    parser.add_argument("--check", metavar="PATH", help="Compare against the baseline at PATH; exit 1 on a regression.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative change before a metric counts as regressed.")
+    parser.add_argument("--track", default=",".join(TRACKED_METRICS), help="Comma-separated metrics compared by --check.")
+    args = parser.parse_args(argv)
+
+    print(f"{'scenario':<32}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    current = asyncio.run(run_suite(
+        requests=args.requests, concurrency=args.concurrency, size=args.payload_size,
+        warmup=args.warmup, rounds=args.rounds, only=args.scenario, report=print_result,
+        dispatch=args.dispatch,
+    ))
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(current, handle, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.check:
+        with open(args.check) as handle:
+            baseline = json.load(handle)
+        settings = ("requests", "concurrency", "payload_size", "dispatch")
+        recorded = {"dispatch": "asgi", **baseline["meta"]}  # Baselines from before --dispatch
+        if any(recorded.get(key) != current["meta"][key] for key in settings):
+            print(f"\nWarning: the baseline was recorded with different settings ({', '.join(settings)}).")
+        regressions = compare(baseline, current, args.threshold, tuple(args.track.split(",")))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+
+import os
+import tempfile
+
+# Keep service state out of the working tree while testing.
+os.environ.setdefault("MCP_PLAN_DB_PATH", ":memory:")
+os.environ.setdefault("STORAGE_ROOT", tempfile.mkdtemp(prefix="agicore-storage-"))
+os.environ.setdefault("TRACING_EXPORT_PATH", os.path.join(tempfile.mkdtemp(prefix="agicore-traces-"), "traces.jsonl"))
@@ -0,0 +1,4 @@
+# The loader lives with the monolith runner, which mounts every service the same way.
+from tools.monolith import SERVICES_DIR, load_service_module
+
+__all__ = ["SERVICES_DIR", "load_service_module"]
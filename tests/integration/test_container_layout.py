@@ -0,0 +1,73 @@
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+from tests.helpers import SERVICES_DIR
+
+ROOT = SERVICES_DIR.parent
+SERVICES = sorted(path.parent.name for path in SERVICES_DIR.glob("*/Dockerfile"))
+
+
+def build_context(service: str, app_dir: Path) -> List[List[str]]:
+    """
+    Lays out /app as the service's Dockerfile does, following its COPY instructions from the
+    repository root, and returns the build steps it runs with Python after the copies.
+    """
+    steps = []
+    for line in (SERVICES_DIR / service / "Dockerfile").read_text().splitlines():
+        parts = shlex.split(line)
+        if parts[:2] == ["RUN", "python"]:
+            steps.append(parts[1:])
+        if not parts or parts[0].upper() != "COPY":
+            continue
+        source, destination = ROOT / parts[1], app_dir / parts[2]
+        if source.is_dir():
+            shutil.copytree(source, destination, dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy(source, destination)
+    return steps
+
+
+def build_image(service: str, tmp_path: Path) -> Tuple[Path, Dict[str, str]]:
+    """Builds the service's /app under tmp_path and runs its Python build steps; returns it and the environment to run it with."""
+    app_dir = tmp_path / "app"
+    app_dir.mkdir()
+    steps = build_context(service, app_dir)
+    state_file = tmp_path / "ops" / "STATE.yml"
+    state_file.parent.mkdir()
+    state_file.write_text("services: {}\n")
+
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    env.update(
+        MCP_PLAN_DB_PATH=":memory:", STORAGE_ROOT=str(tmp_path / "objects"), TRACING_EXPORT_PATH=str(tmp_path / "traces.jsonl"),
+        OPERATOR_STATE_FILE=str(state_file),
+    )
+    for step in steps:
+        built = subprocess.run([sys.executable, *step[1:]], cwd=app_dir, env=env, capture_output=True, text=True, timeout=120)
+        assert built.returncode == 0, built.stderr[-2000:]
+    return app_dir, env
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("service", SERVICES)
+def test_service_imports_from_its_container_layout(service, tmp_path):
+    """Every agent's image must contain everything it imports, including the shared tools package."""
+    app_dir, env = build_image(service, tmp_path)
+    result = subprocess.run(
+        [sys.executable, "-c", "import main; print(main.app.title)"],
+        cwd=app_dir, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+@pytest.mark.integration
+def test_operator_image_ships_a_precompiled_state_snapshot(tmp_path):
+    build_image("operator", tmp_path)
+    assert (tmp_path / "ops" / "STATE.yml.snapshot.json").exists()
@@ -7,7 +7,7 @@ from unittest.mock import patch, AsyncMock
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'tools'))
-sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'services' / 'agicore-mcp'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'services' / 'agicore_mcp'))
 
 # Import the components to be tested
 from tools import market_analysis, image_generation
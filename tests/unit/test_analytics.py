@@ -0,0 +1,68 @@
+
+import json
+import pytest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from tests.helpers import load_service_module
+
+analytics = load_service_module("agicore-analytics")
+news_scoring = load_service_module("agicore-analytics", "news_scoring")
+client = TestClient(analytics.app)
+
+def test_score_articles_is_signed_by_lexicon():
+    scores = news_scoring.score_articles([
+        "NVDA shares surge after earnings beat",
+        "NVDA faces lawsuit and probe",
+        "NVDA holds annual meeting",
+    ])
+    assert scores[0] > 0 > scores[1]
+    assert scores[2] == 0
+
+def test_analyze_news_single_request():
+    response = client.post("/analyze-news", json={"data_source": "news_feed", "topic": "AI stocks", "analysis_type": "sentiment"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["topic"] == "AI stocks"
+    assert len(result["key_points"]) == 2
+
+def test_analyze_news_rejects_invalid_type():
+    response = client.post("/analyze-news", json={"data_source": "news_feed", "topic": "AI", "analysis_type": "astrology"})
+    assert response.status_code == 400
+
+def test_batch_streams_ndjson_and_fetches_each_topic_once():
+    requests = [
+        {"data_source": "news_feed", "topic": topic, "analysis_type": analysis_type}
+        for topic in ["NVDA", "TSLA", "AAPL"]
+        for analysis_type in ["sentiment", "trend_forecast"]
+    ] + [{"data_source": "news_feed", "topic": "NVDA", "analysis_type": "astrology"}]
+
+    with patch.object(analytics, "fetch_articles", wraps=analytics.fetch_articles) as fetch:
+        response = client.post("/analyze-news/batch", json={"requests": requests})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert fetch.call_count == 3
+    assert sorted(line["index"] for line in lines) == list(range(len(requests)))
+    by_index = {line["index"]: line for line in lines}
+    assert by_index[6]["error"] == "Invalid analysis type."
+    assert by_index[0]["analysis_type"] == "sentiment" and "summary" in by_index[0]
+
+def test_trend_ingest_and_query():
+    points = [{"series": "price:NVDA", "value": 100 + i, "timestamp": i} for i in range(10)]
+    response = client.post("/trends/ingest", json={"points": points})
+    assert response.json()["ingested"] == 10
+
+    trend = client.get("/trends/price:NVDA").json()
+    assert trend["last"] == 109
+    assert trend["slope"] == pytest.approx(1.0)
+    assert client.get("/trends/price:UNKNOWN").status_code == 404
+
+def test_trend_forecast_only_folds_in_new_articles():
+    request = {"data_source": "news_feed", "topic": "Semis", "analysis_type": "trend_forecast"}
+    assert client.post("/analyze-news", json=request).status_code == 200
+    first = analytics.trend_engine.snapshot("sentiment:semis")["count"]
+    client.post("/analyze-news", json=request)
+    assert analytics.trend_engine.snapshot("sentiment:semis")["count"] == first == 12
@@ -0,0 +1,38 @@
+
+from tests.bench import bench_services
+from tests.bench.bench_services import compare, percentile, run_suite
+
+
+def result(**metrics):
+    return {"requests": 100, "errors": 0, "throughput_rps": 1000.0, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 4.0, **metrics}
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([7.0], 95) == 7.0 and percentile([], 50) == 0.0
+
+
+def test_compare_flags_only_changes_beyond_the_threshold():
+    baseline = {"scenarios": {"a": result(), "b": result()}}
+    current = {"scenarios": {
+        "a": result(p99_ms=4.8, throughput_rps=900.0),  # +20% and -10%: within a 25% threshold
+        "b": result(p95_ms=3.0, throughput_rps=700.0),
+        "new": result(p50_ms=100.0),  # Not in the baseline
+    }}
+    regressions = compare(baseline, current, threshold=0.25)
+    assert len(regressions) == 2
+    assert all(line.startswith("b: ") for line in regressions)
+    assert any("throughput_rps" in line for line in regressions) and any("p95_ms" in line for line in regressions)
+
+
+def test_compare_reports_failed_requests():
+    current = {"scenarios": {"a": result(errors=3, first_error="BenchmarkError: HTTP 500")}}
+    assert compare({"scenarios": {}}, current, threshold=0.25) == ["a: 3 failed requests (BenchmarkError: HTTP 500)"]
+
+
+async def test_every_scenario_runs_in_process_without_errors():
+    results = await run_suite(requests=4, concurrency=2, size=4, warmup=0, rounds=1)
+    assert set(results["scenarios"]) == {scenario.name for scenario in bench_services.SCENARIOS}
+    assert all(run["errors"] == 0 for run in results["scenarios"].values()), results["scenarios"]
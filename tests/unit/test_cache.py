@@ -0,0 +1,65 @@
+
+import asyncio
+import pytest
+
+from tools.cache import async_cached
+
+async def test_concurrent_misses_are_coalesced():
+    calls = []
+
+    @async_cached(ttl=60, maxsize=10)
+    async def slow_lookup(topic):
+        calls.append(topic)
+        await asyncio.sleep(0.05)
+        return {"topic": topic}
+
+    results = await asyncio.gather(*[slow_lookup("AI stocks") for _ in range(10)])
+    again = await slow_lookup("AI stocks")
+
+    assert calls == ["AI stocks"]
+    assert all(result == {"topic": "AI stocks"} for result in results + [again])
+    stats = slow_lookup.cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 9, 1)
+
+async def test_entries_expire_after_ttl():
+    calls = []
+
+    @async_cached(ttl=0.05)
+    async def lookup(topic):
+        calls.append(topic)
+        return len(calls)
+
+    assert await lookup("x") == 1
+    assert await lookup("x") == 1
+    await asyncio.sleep(0.06)
+    assert await lookup("x") == 2
+
+async def test_lru_bound_evicts_oldest():
+    @async_cached(maxsize=2)
+    async def lookup(topic):
+        return topic
+
+    for topic in ["a", "b", "a", "c"]:
+        await lookup(topic)
+
+    stats = lookup.cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    await lookup("a")  # "b" was least recently used, so "a" is still cached
+    assert lookup.cache.stats()["hits"] == 2
+
+async def test_failures_are_shared_but_not_cached():
+    attempts = []
+
+    @async_cached()
+    async def flaky(topic):
+        attempts.append(topic)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream timeout")
+        return "ok"
+
+    results = await asyncio.gather(flaky("x"), flaky("x"), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert await flaky("x") == "ok"
+    assert len(attempts) == 2
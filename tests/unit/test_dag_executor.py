@@ -0,0 +1,89 @@
+
+import asyncio
+import pytest
+
+# Add the service directory to the Python path to allow imports
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'services' / 'agicore_mcp'))
+
+from dag_executor import DAGExecutor, PlanValidationError, topological_order
+
+def make_step(step_id, service="agicore-analytics", depends_on=None):
+    return {"id": step_id, "action": "test", "service": service, "depends_on": depends_on or []}
+
+def test_topological_order_rejects_cycles():
+    steps = [make_step("a", depends_on=["b"]), make_step("b", depends_on=["a"])]
+    with pytest.raises(PlanValidationError):
+        topological_order(steps)
+
+def test_topological_order_rejects_unknown_dependency():
+    with pytest.raises(PlanValidationError):
+        topological_order([make_step("a", depends_on=["missing"])])
+
+async def test_independent_steps_run_concurrently():
+    """Two independent 0.2s steps followed by a join should take ~0.4s, not 0.6s."""
+    steps = [
+        make_step("analytics", service="agicore-analytics"),
+        make_step("media", service="agicore-mediamaker"),
+        make_step("report", service="agicore-storage", depends_on=["analytics", "media"]),
+    ]
+
+    async def run_step(step, inputs):
+        await asyncio.sleep(0.2)
+        return sorted(inputs)
+
+    result = await DAGExecutor().run(steps, run_step)
+
+    assert result.status == "completed"
+    assert result.duration_ms < 550
+    assert result.outputs["report"] == ["analytics", "media"]
+    assert all(step.duration_ms >= 150 for step in result.steps)
+
+async def test_per_service_limit_is_enforced():
+    active = {"now": 0, "peak": 0}
+
+    async def run_step(step, inputs):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.05)
+        active["now"] -= 1
+
+    steps = [make_step(f"s{i}", service="agicore-trader") for i in range(6)]
+    result = await DAGExecutor(max_concurrency=10, per_service_limit=2).run(steps, run_step)
+
+    assert result.status == "completed"
+    assert active["peak"] == 2
+
+async def test_failed_step_skips_dependents_only():
+    steps = [
+        make_step("bad"),
+        make_step("child", depends_on=["bad"]),
+        make_step("independent", service="agicore-storage"),
+    ]
+
+    async def run_step(step, inputs):
+        if step["id"] == "bad":
+            raise RuntimeError("upstream unavailable")
+        return "ok"
+
+    result = await DAGExecutor().run(steps, run_step)
+    statuses = {step.id: step.status for step in result.steps}
+
+    assert result.status == "failed"
+    assert statuses == {"bad": "failed", "child": "skipped", "independent": "completed"}
+
+async def test_resume_skips_completed_steps():
+    steps = [make_step("a"), make_step("b", depends_on=["a"]), make_step("c", depends_on=["b"])]
+    ran = []
+
+    async def run_step(step, inputs):
+        ran.append(step["id"])
+        return inputs
+
+    result = await DAGExecutor().run(steps, run_step, completed={"a": "from a"})
+
+    assert ran == ["b", "c"]
+    assert result.status == "completed"
+    assert result.outputs["b"] == {"a": "from a"}
+    assert [step.resumed for step in result.steps] == [True, False, False]
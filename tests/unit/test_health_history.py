@@ -0,0 +1,62 @@
+
+import numpy as np
+import pytest
+
+from tests.helpers import load_service_module
+
+health_history = load_service_module("operator", "health_history")
+remediation = load_service_module("operator", "remediation")
+
+
+def test_raw_window_reports_exact_percentiles_and_uptime():
+    history = health_history.HealthHistory()
+    now = 10_000.0
+    latencies = np.arange(1, 101, dtype=float)
+    for i, latency in enumerate(latencies):
+        # One probe per second; the last 10 probes failed.
+        history.record("svc", i < 90, latency, timestamp=now - 100 + i)
+
+    summary = history.summary("svc", window=100, now=now)
+    assert summary["source"] == "raw" and summary["samples"] == 100
+    assert summary["p50"] == pytest.approx(np.percentile(latencies, 50))
+    assert summary["p99"] == pytest.approx(np.percentile(latencies, 99))
+    assert summary["error_rate"] == pytest.approx(0.1)
+    assert summary["uptime"] == pytest.approx(0.9)
+
+    recent = history.summary("svc", window=10, now=now)
+    assert recent["samples"] == 10 and recent["error_rate"] == 1.0
+
+
+def test_long_windows_fall_back_to_rollups_with_bounded_memory():
+    history = health_history.HealthHistory(raw_capacity=64, rollup_seconds=60, rollup_capacity=30)
+    history.record("svc", True, 10.0, timestamp=0.0)
+    size = history.memory_bytes()
+
+    for t in range(1, 7200):
+        history.record("svc", t % 10 != 0, 10.0 if t % 50 else 1000.0, timestamp=float(t))
+    assert history.memory_bytes() == size
+
+    summary = history.summary("svc", window=1200, now=7200.0)
+    assert summary["source"] == "rollup"
+    assert 1150 <= summary["samples"] <= 1260
+    assert summary["error_rate"] == pytest.approx(0.1, abs=0.01)
+    # Histogram buckets are log-spaced, so estimates land within one bucket of the true value.
+    assert 9.0 <= summary["p50"] <= 11.5
+    assert 900.0 <= summary["p99"] <= 1150.0
+
+
+def test_history_gate_defers_restarts_of_mostly_healthy_services():
+    history = health_history.HealthHistory()
+    for t in range(10):
+        history.record("svc", t != 9, 5.0)
+
+    def gate(service_name):
+        window = history.summary(service_name, 60)
+        return "mostly healthy" if window["error_rate"] < 0.5 else None
+
+    async def restart(service_name):
+        return True
+
+    engine = remediation.RemediationEngine(restart, gate=gate)
+    decision = engine.request_restart("svc")
+    assert decision.action == "deferred" and decision.detail == "mostly healthy"
@@ -0,0 +1,64 @@
+
+import asyncio
+import time
+
+import httpx
+
+from tests.helpers import load_service_module
+
+health_probes = load_service_module("operator", "health_probes")
+operator = load_service_module("operator")
+
+
+async def fake_prober(service_name):
+    if service_name == "hung":
+        await asyncio.sleep(3600)
+    await asyncio.sleep(0.001)
+    return health_probes.ProbeResult(service_name, service_name != "down", 1.0, time.time())
+
+
+async def test_hung_service_does_not_delay_other_probes():
+    scheduler = health_probes.HealthProbeScheduler(fake_prober, default_interval=0.02, timeout=0.05, jitter=0.0)
+    for name in ("fast", "hung"):
+        scheduler.track(name)
+    scheduler.start()
+    await asyncio.sleep(0.3)
+    await scheduler.stop()
+
+    status = scheduler.status()
+    assert status["fast"]["probes"] >= 5 and status["fast"]["healthy"]
+    assert status["hung"]["timeouts"] >= 1 and status["hung"]["healthy"] is False
+    assert "Timed out" in status["hung"]["last_error"]
+
+
+async def test_failing_service_backs_off_up_to_the_cap():
+    scheduler = health_probes.HealthProbeScheduler(fake_prober, default_interval=1.0, jitter=0.0, max_backoff=8.0)
+    scheduler.track("down")
+    delays = []
+    for _ in range(6):
+        await scheduler.probe("down")
+        delays.append(scheduler.next_delay(scheduler._services["down"]))
+    assert delays == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+    scheduler.prober = lambda name: fake_prober("up")
+    await scheduler.probe("down")
+    assert scheduler.next_delay(scheduler._services["down"]) == 1.0
+
+
+async def test_jitter_spreads_probe_delays():
+    scheduler = health_probes.HealthProbeScheduler(fake_prober, default_interval=10.0, jitter=0.2)
+    scheduler.track("fast")
+    delays = {scheduler.next_delay(scheduler._services["fast"]) for _ in range(20)}
+    assert len(delays) > 1 and all(8.0 <= delay <= 12.0 for delay in delays)
+
+
+async def test_run_health_check_probes_the_service(monkeypatch):
+    monkeypatch.setattr(operator.probe_scheduler, "prober", fake_prober)
+    transport = httpx.ASGITransport(app=operator.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://operator") as client:
+        response = await client.post("/run-health-check/agicore-trader")
+        assert response.json()["status"] == "healthy"
+        assert response.json()["latency_ms"] is not None
+
+        probes = (await client.get("/health-probes")).json()
+        assert probes["agicore-trader"]["probes"] >= 1
@@ -0,0 +1,71 @@
+
+import json
+
+import httpx
+import pytest
+
+from tools import http_client
+from tools.market_analysis import get_market_analysis
+
+@pytest.fixture
+def mock_transport():
+    """Routes the shared client through an in-memory transport and records each request."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path == "/missing":
+            return httpx.Response(404, json={"detail": "Not Found"})
+        return httpx.Response(200, json={"path": request.url.path, "host": request.url.host})
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    get_market_analysis.cache.clear()
+    yield requests
+    http_client._client = None
+    http_client._host_slots.clear()
+
+def test_resolve_service_url_uses_env_override(monkeypatch):
+    assert http_client.resolve_service_url("agicore-trader") == "http://agicore-trader:8080"
+    monkeypatch.setenv("AGICORE_TRADER_URL", "https://trader.example.com/")
+    assert http_client.resolve_service_url("agicore-trader") == "https://trader.example.com"
+
+async def test_calls_share_one_pooled_client(mock_transport):
+    client = http_client.get_http_client()
+    result = await get_market_analysis("AI stocks")
+    await http_client.call_service("agicore-storage", "/store-object", json={})
+
+    assert http_client.get_http_client() is client
+    assert result == {"path": "/analyze-news", "host": "agicore-analytics"}
+    assert [r.url.host for r in mock_transport] == ["agicore-analytics", "agicore-storage"]
+
+async def test_error_status_raises_service_call_error(mock_transport):
+    with pytest.raises(http_client.ServiceCallError) as exc_info:
+        await http_client.call_service("agicore-storage", "/missing")
+    assert exc_info.value.status_code == 404
+    assert exc_info.value.service == "agicore-storage"
+
+async def test_close_http_client_resets_pool(mock_transport):
+    await http_client.close_http_client()
+    assert http_client._client is None
+
+async def test_registering_a_local_service_closes_the_old_client(mock_transport):
+    client = http_client.get_http_client()
+    await http_client.register_local_service("agicore-trader", object())
+    await http_client.register_local_service("agicore-trader", None)
+
+    assert client.is_closed and http_client._client is None
+    assert http_client._local_services == {}
+
+async def test_topics_sharing_a_cache_entry_send_the_same_topic(mock_transport):
+    def handler(request):
+        topic = json.loads(request.content)["topic"]
+        mock_transport.append(topic)
+        return httpx.Response(200, json={"topic": topic})
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    first = await get_market_analysis("  AI   stocks ")
+    second = await get_market_analysis("AI stocks")
+    other = await get_market_analysis("ai stocks")
+
+    assert first == second == {"topic": "AI stocks"} and other == {"topic": "ai stocks"}
+    assert mock_transport == ["AI stocks", "ai stocks"]
@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import msgpack
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from tools import http_client, serialization
+from tools.idempotency import IdempotencyStore, install_idempotency
+from tools.local_dispatch import LocalService
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+
+app = FastAPI()
+store = install_idempotency(app)
+calls = []
+
+@app.post("/orders")
+async def create_order(order: dict):
+    calls.append(order)
+    await asyncio.sleep(0.01)
+    if order.get("fail"):
+        raise HTTPException(status_code=503, detail="Exchange unavailable")
+    return {"order": len(calls), **order}
+
+negotiating = FastAPI(default_response_class=FastJSONResponse)
+negotiating.add_middleware(SerializationMiddleware)
+install_idempotency(negotiating)
+
+@negotiating.post("/orders")
+async def create_negotiated_order(order: dict):
+    calls.append(order)
+    return {"order": len(calls), **order}
+
+async def post(client, body, key):
+    return await client.post("/orders", json=body, headers={"Idempotency-Key": key} if key else {})
+
+async def test_retries_with_a_key_get_the_first_response():
+    calls.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first, second = await asyncio.gather(post(client, {"qty": 1}, "k1"), post(client, {"qty": 1}, "k1"))
+        third = await post(client, {"qty": 1}, "k1")
+        unkeyed = await post(client, {"qty": 1}, None)
+
+    assert len(calls) == 2  # The keyed request ran once; the unkeyed one always runs
+    assert first.json() == second.json() == third.json() == {"order": 1, "qty": 1}
+    assert third.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in unkeyed.headers
+
+async def test_reusing_a_key_for_another_request_is_rejected():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await post(client, {"qty": 1}, "k2")
+        conflict = await post(client, {"qty": 2}, "k2")
+
+    assert conflict.status_code == 422 and "different request" in conflict.json()["detail"]
+
+async def test_server_errors_are_not_remembered():
+    calls.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = [await post(client, {"fail": True}, "k3") for _ in range(2)]
+
+    assert [response.status_code for response in responses] == [503, 503]
+    assert len(calls) == 2
+
+async def test_concurrent_requests_sharing_a_server_error_are_not_replays():
+    calls.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(post(client, {"fail": True}, "k5") for _ in range(3)))
+
+    assert [response.status_code for response in responses] == [503] * 3
+    assert not any("idempotent-replayed" in response.headers for response in responses)
+
+async def test_replays_are_encoded_for_each_requests_accept_header():
+    calls.clear()
+    msgpack_headers = {"Idempotency-Key": "k6", "Accept": serialization.MSGPACK_MEDIA_TYPE}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=negotiating), base_url="http://test") as client:
+        first = await client.post("/orders", json={"qty": 5}, headers=msgpack_headers)
+        as_json = await client.post("/orders", json={"qty": 5}, headers={"Idempotency-Key": "k6"})
+        as_msgpack = await client.post("/orders", json={"qty": 5}, headers=msgpack_headers)
+
+    assert len(calls) == 1
+    assert first.headers["content-type"] == serialization.MSGPACK_MEDIA_TYPE
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_json.headers["idempotent-replayed"] == "true"
+    assert as_json.json() == msgpack.unpackb(first.content) == msgpack.unpackb(as_msgpack.content) == {"order": 1, "qty": 5}
+
+async def test_direct_dispatch_honors_the_key():
+    calls.clear()
+    service = LocalService("orders", app)
+    first = await service.call("POST", "/orders", {"qty": 3}, idempotency_key="k4")
+    second = await service.call("POST", "/orders", {"qty": 3}, idempotency_key="k4")
+    with pytest.raises(http_client.ServiceCallError) as conflict:
+        await service.call("POST", "/orders", {"qty": 4}, idempotency_key="k4")
+
+    assert conflict.value.status_code == 422
+    assert first == second and len(calls) == 1 and service.direct_calls == 3
+
+async def test_store_counts_replays():
+    local = IdempotencyStore(ttl=60, maxsize=10)
+
+    async def execute():
+        return "done"
+
+    assert await local.run("key", "a", execute) == ("done", False)
+    assert await local.run("key", "a", execute) == ("done", True)
+    assert local.stats()["executed"] == 1 and local.stats()["replayed"] == 1
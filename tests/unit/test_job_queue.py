@@ -0,0 +1,98 @@
+
+import asyncio
+
+import pytest
+
+from tests.helpers import load_service_module
+
+job_queue = load_service_module("agicore-mediamaker", "job_queue")
+
+async def test_compatible_jobs_are_batched_and_priority_is_respected():
+    batches = []
+
+    async def process(payloads):
+        batches.append(list(payloads))
+        await asyncio.sleep(0.01)
+        return [p.upper() for p in payloads]
+
+    queue = job_queue.BatchingJobQueue(process, batch_key=lambda p: p[0], workers=1, max_batch_size=3, batch_window=0.01)
+    jobs = [queue.submit(p, priority=5) for p in ["a1", "b1", "a2", "a3", "a4"]]
+    urgent = queue.submit("b2", priority=0)
+
+    finished = await asyncio.gather(*[queue.wait(job.id, timeout=2) for job in jobs + [urgent]])
+    await queue.stop()
+
+    assert all(job.status == "completed" for job in finished)
+    assert urgent.result == "B2"
+    # The urgent job goes first and takes its compatible sibling along; "a" jobs batch up to the limit.
+    assert batches == [["b2", "b1"], ["a1", "a2", "a3"], ["a4"]]
+    metrics = queue.metrics()
+    assert (metrics["batches"], metrics["max_batch_size"], metrics["queue_depth"]) == (3, 3, 0)
+
+async def test_failed_batch_marks_every_job_failed():
+    async def process(payloads):
+        raise RuntimeError("model backend unavailable")
+
+    queue = job_queue.BatchingJobQueue(process, batch_key=lambda p: 0, batch_window=0)
+    job = await queue.wait(queue.submit("x").id, timeout=2)
+    await queue.stop()
+
+    assert job.status == "failed"
+    assert job.error == "model backend unavailable"
+    assert queue.metrics()["failed"] == 1
+
+async def test_long_poll_times_out_for_unfinished_job():
+    async def process(payloads):
+        await asyncio.sleep(10)
+
+    queue = job_queue.BatchingJobQueue(process, batch_key=lambda p: 0, batch_window=0)
+    job = await queue.wait(queue.submit("slow").id, timeout=0.05)
+    assert job.status in ("queued", "running")
+    await queue.stop()
+
+async def test_short_result_list_fails_the_whole_batch():
+    async def process(payloads):
+        return payloads[:1]
+
+    queue = job_queue.BatchingJobQueue(process, batch_key=lambda p: 0, workers=1, batch_window=0.01)
+    jobs = [queue.submit(p) for p in ("a", "b")]
+    finished = await asyncio.gather(*[queue.wait(job.id, timeout=2) for job in jobs])
+    await queue.stop()
+
+    assert [job.status for job in finished] == ["failed", "failed"]
+    assert "1 results for 2 jobs" in finished[0].error
+
+async def test_queue_is_bounded_and_batches_scan_a_bounded_window():
+    batches = []
+
+    async def process(payloads):
+        batches.append(list(payloads))
+        return payloads
+
+    queue = job_queue.BatchingJobQueue(process, batch_key=lambda p: p[0], workers=1, max_batch_size=2, batch_window=0, max_queued=6)
+    jobs = [queue.submit(p) for p in ["a1", "b1", "b2", "b3", "a2", "a3"]]
+    with pytest.raises(asyncio.QueueFull):
+        queue.submit("overflow")
+    await asyncio.gather(*[queue.wait(job.id, timeout=2) for job in jobs])
+    await queue.stop()
+
+    # "a1" only looks at the next two jobs, so "a2" waits for a later batch.
+    assert batches[0] == ["a1"]
+    assert sorted(p for batch in batches for p in batch) == ["a1", "a2", "a3", "b1", "b2", "b3"]
+    assert max(len(batch) for batch in batches) == 2
+
+async def test_stop_waits_for_completion_callbacks():
+    delivered = []
+
+    async def process(payloads):
+        return payloads
+
+    async def on_complete(job):
+        await asyncio.sleep(0.05)
+        delivered.append(job.id)
+
+    queue = job_queue.BatchingJobQueue(process, batch_key=lambda p: 0, batch_window=0, on_complete=on_complete)
+    job = await queue.wait(queue.submit("x", callback_url="https://hooks.example.com/done").id, timeout=2)
+    await queue.stop()
+
+    assert delivered == [job.id] and not queue._callbacks
@@ -0,0 +1,94 @@
+
+import io
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+
+from tools import tracing
+from tools.utils import JsonFormatter, NonBlockingQueueHandler, RateLimitFilter
+
+
+def pipeline(name, maxsize=100):
+    """A private copy of the configure_logging pipeline, writing to a buffer."""
+    log_queue = queue.Queue(maxsize=maxsize)
+    buffer = io.StringIO()
+    output = logging.StreamHandler(buffer)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, output)
+    handler = NonBlockingQueueHandler(log_queue)
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler, listener, buffer
+
+
+class Recorder:
+    """Records which thread formats it."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.get_ident())
+        return "recorded"
+
+
+def test_messages_are_rendered_at_the_call_and_encoded_as_json_by_the_writer():
+    logger, _, listener, buffer = pipeline("test.json")
+    arg = Recorder()
+    logger.debug("skipped %s", arg)
+    assert arg.threads == []  # Disabled levels format nothing
+
+    fills = [1]
+    tracer = tracing.Tracer("agicore-test", tracing.BatchSpanExporter(lambda spans: None))
+    with tracer.start_span("op") as span:
+        logger.info("order %s filled %s", arg, fills, extra={"symbol": "BTC-USD"})
+    fills.append(2)  # Changed after the call, before the writer gets to the record
+    assert arg.threads == [threading.get_ident()]
+    listener.start()
+    listener.stop()
+
+    entry = json.loads(buffer.getvalue())
+    assert entry["message"] == "order recorded filled [1]"
+    assert entry["level"] == "INFO" and entry["symbol"] == "BTC-USD"
+    assert entry["trace_id"] == span.context.trace_id and entry["service"] == "agicore-test"
+
+
+def test_bad_format_strings_fail_at_the_call_site(monkeypatch):
+    logger, handler, listener, buffer = pipeline("test.bad_format")
+    failed = []
+    monkeypatch.setattr(handler, "handleError", lambda record: failed.append(threading.get_ident()))
+    logger.info("%d orders", "many")
+
+    assert failed == [threading.get_ident()]
+    assert handler.queue.empty()
+
+
+def test_full_queue_drops_instead_of_blocking():
+    logger, handler, listener, buffer = pipeline("test.full", maxsize=2)
+    for i in range(5):
+        logger.info("message %s", i)
+    assert handler.dropped == 3
+    listener.start()
+    listener.stop()
+    assert len(buffer.getvalue().splitlines()) == 2
+
+
+def test_rate_limit_suppresses_info_but_not_warnings():
+    logger, _, listener, buffer = pipeline("test.rate")
+    limiter = RateLimitFilter(per_second=0.001, burst=2)
+    logger.addFilter(limiter)
+    listener.start()
+    for i in range(10):
+        logger.info("hot path %s", i)
+    logger.warning("still visible")
+    limiter.tokens = 1  # Let one more through, as if time had passed
+    logger.info("after the burst")
+    listener.stop()
+
+    entries = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries] == ["hot path 0", "hot path 1", "still visible", "after the burst"]
+    assert entries[-1]["suppressed"] == 8
@@ -0,0 +1,76 @@
+
+import numpy as np
+import pytest
+
+from tests.helpers import load_service_module
+
+market_data = load_service_module("agicore-trader", "market_data")
+
+class CountingProvider(market_data.SyntheticBarProvider):
+    def __init__(self):
+        self.calls = []
+
+    async def fetch_bars(self, symbol, start, end, interval):
+        self.calls.append((symbol, start, end))
+        return await super().fetch_bars(symbol, start, end, interval)
+
+def test_ring_buffer_returns_contiguous_views_across_wraparound():
+    buffer = market_data.BarRingBuffer(capacity=4)
+    bars = np.zeros((6, 6))
+    bars[:, market_data.TIMESTAMP] = np.arange(6)
+    buffer.extend(bars[:3])
+    buffer.extend(bars[3:])
+
+    last = buffer.last(3)
+    assert last[:, market_data.TIMESTAMP].tolist() == [3, 4, 5]
+    assert np.shares_memory(last, buffer._data)
+    assert buffer.size == 4 and buffer.last_timestamp == 5
+
+def test_resample_aggregates_ohlcv():
+    bars = np.array([
+        # ts, open, high, low, close, volume
+        [0, 10, 12, 9, 11, 1],
+        [1800, 11, 15, 10, 14, 2],
+        [3600, 14, 14, 13, 13, 3],
+    ], dtype=float)
+    hourly = market_data.resample(bars, 3600)
+    assert hourly.tolist() == [[0, 10, 15, 9, 14, 3], [3600, 14, 14, 13, 13, 3]]
+
+async def test_engine_serves_all_timeframes_from_one_fetch():
+    provider = CountingProvider()
+    engine = market_data.MarketDataEngine(provider=provider, base_seconds=300, capacity=2016)
+    now = 1_700_000_000.0
+
+    five_min = await engine.get_bars("BTC", "5m", limit=10, now=now)
+    hourly = await engine.get_bars("BTC", "1h", limit=5, now=now)
+    daily = await engine.get_bars("BTC", "1d", limit=3, now=now)
+    again = await engine.get_bars("BTC", "1h", limit=5, now=now + 10)
+
+    assert len(provider.calls) == 1
+    assert len(five_min) == 10 and len(hourly) == 5 and len(daily) == 3
+    assert again is not hourly and np.shares_memory(again, hourly)
+    assert np.all(np.diff(hourly[:, market_data.TIMESTAMP]) == 3600)
+
+    # Once the next base bar closes only that bar is fetched.
+    await engine.get_bars("BTC", "1h", now=now + 300)
+    assert len(provider.calls) == 2
+    assert provider.calls[1][2] - provider.calls[1][1] == 300
+
+async def test_engine_keeps_a_bounded_number_of_symbols():
+    provider = CountingProvider()
+    engine = market_data.MarketDataEngine(provider=provider, base_seconds=300, capacity=288, max_symbols=2)
+    now = 1_700_000_000.0
+
+    for symbol in ("BTC", "ETH", "BTC", "SOL"):
+        await engine.get_bars(symbol, "1h", now=now)
+    await engine.get_bars("BTC", "1h", now=now)
+
+    assert [call[0] for call in provider.calls] == ["BTC", "ETH", "SOL"]  # ETH was least recently used
+    assert list(engine._series) == ["SOL", "BTC"]
+    assert all(symbol != "ETH" for symbol, _ in engine._resampled)
+    assert engine.stats()["evicted_symbols"] == 1
+
+def test_engine_rejects_unknown_timeframe():
+    engine = market_data.MarketDataEngine(base_seconds=300)
+    with pytest.raises(ValueError, match="Unsupported timeframe"):
+        engine.timeframe_seconds("1m")
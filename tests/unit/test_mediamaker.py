@@ -0,0 +1,86 @@
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from tests.helpers import load_service_module
+
+mediamaker = load_service_module("agicore-mediamaker")
+client = TestClient(mediamaker.app)
+
+def test_content_hash_is_stable_and_covers_all_inputs():
+    request = mediamaker.ImageRequest(prompt="A futuristic   city")
+    assert mediamaker.content_hash(request) == mediamaker.content_hash(mediamaker.ImageRequest(prompt="A futuristic city"))
+    assert mediamaker.content_hash(request) != mediamaker.content_hash(mediamaker.ImageRequest(prompt="A futuristic city", style="sketch"))
+    # Precomputed: the digest must not depend on the process (unlike the built-in hash()).
+    assert mediamaker.content_hash(request).startswith("7e6f45b10a0c")
+
+def test_generate_image_returns_cached_artifact_for_repeat_prompt():
+    payload = {"prompt": "A lighthouse at dusk", "style": "watercolor"}
+    first = client.post("/generate-image", json=payload).json()
+    with patch.object(mediamaker, "render_image") as render:
+        second = client.post("/generate-image", json=payload).json()
+    render.assert_not_called()
+    assert first == second
+    assert first["content_hash"] in first["image_url"]
+
+async def test_concurrent_duplicate_requests_generate_once():
+    calls = []
+    original = mediamaker.render_image
+
+    async def slow_render(request, digest):
+        calls.append(digest)
+        await asyncio.sleep(0.05)
+        return await original(request, digest)
+
+    transport = httpx.ASGITransport(app=mediamaker.app)
+    with patch.object(mediamaker, "render_image", slow_render):
+        async with httpx.AsyncClient(transport=transport, base_url="http://mediamaker") as async_client:
+            responses = await asyncio.gather(*[
+                async_client.post("/generate-image", json={"prompt": "A red fox in snow"}) for _ in range(5)
+            ])
+
+    assert len(calls) == 1
+    assert len({r.json()["image_url"] for r in responses}) == 1
+
+async def test_image_job_submit_and_long_poll():
+    transport = httpx.ASGITransport(app=mediamaker.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mediamaker") as async_client:
+        submitted = await async_client.post("/jobs/generate-image", json={"prompt": "A quiet harbor", "priority": 1})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+
+        job = (await async_client.get(f"/jobs/{job_id}", params={"wait": 5})).json()
+        assert job["status"] == "completed"
+        assert job["result"]["content_hash"] in job["result"]["image_url"]
+
+        # The artifact is now cached, so a repeat submission completes without queueing.
+        repeat = (await async_client.post("/jobs/generate-image", json={"prompt": "A quiet harbor"})).json()
+        assert repeat["status"] == "completed"
+        assert repeat["result"] == job["result"]
+
+        metrics = (await async_client.get("/jobs/metrics")).json()
+        assert metrics["completed"] >= 2
+        assert (await async_client.get("/jobs/job_missing")).status_code == 404
+    await mediamaker.image_jobs.stop()
+
+def test_callback_urls_must_be_on_the_allowlist(monkeypatch):
+    monkeypatch.setattr(mediamaker, "CALLBACK_ALLOWED_HOSTS", ["hooks.example.com", ".partner.example.org"])
+    allowed = ["https://hooks.example.com/done", "https://media.partner.example.org/cb"]
+    rejected = [
+        "http://hooks.example.com/done",  # Scheme not allowed
+        "https://169.254.169.254/computeMetadata/v1/",
+        "https://agicore-storage:8080/delete-object",
+        "https://hooks.example.com@evil.example.net/",
+        "https://hooks.example.com.evil.example.net/",
+        "https://partner.example.org.evil.net/",
+        "https://hooks.example.com:bad/",
+        "file:///etc/passwd",
+    ]
+
+    assert all(mediamaker.callback_url_allowed(url) for url in allowed)
+    assert not any(mediamaker.callback_url_allowed(url) for url in rejected)
+    response = client.post("/jobs/generate-image", json={"prompt": "A lighthouse", "callback_url": rejected[1]})
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+
+import re
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from tools.metrics import install_metrics
+
+app = FastAPI()
+registry = install_metrics(app, service="test-agent")
+
+
+@app.get("/items/{item_id}")
+async def get_item(item_id: int):
+    if item_id == 0:
+        raise HTTPException(status_code=404, detail="No item 0.")
+    return {"id": item_id}
+
+
+client = TestClient(app)
+
+
+def _sample(text, name, **labels):
+    for line in text.splitlines():
+        match = re.fullmatch(r'(\w+)\{(.*)\} (\S+)', line)
+        if match and match.group(1) == name:
+            line_labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2)))
+            if all(line_labels.get(key) == str(value) for key, value in labels.items()):
+                return float(match.group(3))
+    return None
+
+
+def test_requests_are_labelled_by_route_template_and_status():
+    for item_id in (1, 2, 3, 0):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert _sample(text, "agicore_http_requests_total", service="test-agent", route="/items/{item_id}", status=200) == 3
+    assert _sample(text, "agicore_http_requests_total", route="/items/{item_id}", status=404) == 1
+    assert _sample(text, "agicore_http_requests_total", route="<unmatched>", status=404) == 1
+    assert "/items/1" not in text
+
+
+def test_latency_histogram_is_cumulative_and_in_flight_returns_to_zero():
+    client.get("/items/7")
+    text = client.get("/metrics").text
+    labels = {"method": "GET", "route": "/items/{item_id}"}
+    count = _sample(text, "agicore_http_request_duration_seconds_count", **labels)
+    assert _sample(text, "agicore_http_request_duration_seconds_bucket", le="+Inf", **labels) == count
+    assert _sample(text, "agicore_http_request_duration_seconds_bucket", le="0.001", **labels) <= count
+    assert _sample(text, "agicore_http_requests_in_flight", **labels) == 0
+
+
+def test_every_agent_serves_metrics():
+    from tests.helpers import load_service_module
+
+    for service_dir in ("agicore_mcp", "agicore-trader", "agicore-analytics", "agicore-mediamaker", "agicore-storage", "operator"):
+        service = load_service_module(service_dir)
+        with TestClient(service.app) as agent:
+            agent.get("/health")
+            assert "agicore_http_requests_total" in agent.get("/metrics").text
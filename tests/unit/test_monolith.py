@@ -0,0 +1,111 @@
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from tests.helpers import load_service_module
+from tools import http_client, tracing
+from tools.idempotency import install_idempotency
+from tools.local_dispatch import LocalService
+from tools.monolith import build_monolith
+
+trader = load_service_module("agicore-trader").app
+mcp = load_service_module("agicore_mcp").app
+
+
+async def test_direct_dispatch_returns_what_the_http_call_would():
+    service = LocalService("agicore-trader", trader)
+    order = {"symbol": "BTC-USD", "action": "BUY", "quantity": 2}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=trader), base_url="http://test") as client:
+        expected = (await client.post("/execute-trade", json=order)).json()
+    result = await service.call("POST", "/execute-trade", order)
+
+    assert service.direct_calls == 1 and service.asgi_calls == 0
+    assert result.keys() == expected.keys()
+    assert all(isinstance(value, (str, int, float, bool, type(None), list, dict)) for value in result.values())
+    assert result["symbol"] == expected["symbol"] and result["status"] == expected["status"]
+
+
+async def test_direct_dispatch_errors_carry_the_http_status():
+    service = LocalService("agicore-mcp", mcp)
+    with pytest.raises(http_client.ServiceCallError) as missing:
+        await service.call("GET", "/plans/plan_missing")
+    with pytest.raises(http_client.ServiceCallError) as invalid:
+        await service.call("POST", "/create-plan", {"constraints": []})
+
+    assert missing.value.status_code == 404 and '"Plan not found"' in str(missing.value)
+    assert invalid.value.status_code == 422 and "description" in str(invalid.value)
+    assert service.direct_calls == 2
+
+
+async def test_other_routes_go_through_the_app_over_asgi():
+    service = LocalService("agicore-mcp", mcp)
+    page = await service.call("GET", "/plans?limit=1")  # Query parameters need the request
+    with pytest.raises(http_client.ServiceCallError) as missing:
+        await service.call("GET", "/no-such-route")
+    await service.aclose()
+
+    assert "plans" in page and missing.value.status_code == 404
+    assert service.asgi_calls == 2 and service.direct_calls == 0
+
+
+async def test_direct_calls_are_recorded_in_the_agent_metrics():
+    service = LocalService("agicore-trader", trader)
+    route = trader.state.metrics.route("POST", "/execute-trade")
+    before = route.count
+
+    await service.call("POST", "/execute-trade", {"symbol": "ETH-USD", "action": "SELL", "quantity": 1})
+
+    assert route.count == before + 1 and route.responses.get(200)
+
+
+async def test_direct_calls_get_the_callees_server_span_and_idempotency():
+    spans = []
+    exporter = tracing.BatchSpanExporter(spans.extend)
+    callee = FastAPI()
+    callee.state.tracer = tracing.Tracer("agicore-callee", exporter)
+    install_idempotency(callee)
+    placed = []
+
+    @callee.post("/orders/{order_id}")
+    async def place_order(order_id: str, order: dict):
+        placed.append(order_id)
+        if order["quantity"] > 10:
+            raise HTTPException(status_code=409, detail="Over the position limit")
+        return {"id": order_id}
+
+    service = LocalService("agicore-callee", callee)
+    with tracing.Tracer("agicore-caller", exporter).start_span("POST agicore-callee/orders", "client") as client_span:
+        await service.call("POST", "/orders/o1", {"quantity": 1})
+        for _ in range(2):
+            with pytest.raises(http_client.ServiceCallError) as rejected:
+                await service.call("POST", "/orders/o2", {"quantity": 50}, idempotency_key="k1")
+    await exporter.shutdown()
+
+    # As over HTTP, the rejection is remembered and replayed rather than placed twice.
+    assert rejected.value.status_code == 409 and placed == ["o1", "o2"]
+    server = [span for span in spans if span["kind"] == "server"]
+    assert [span["name"] for span in server] == ["POST /orders/{order_id}"] * 3
+    assert [span["attributes"]["http.status_code"] for span in server] == [200, 409, 409]
+    assert all(span["status"] == "ok" and span["service"] == "agicore-callee" for span in server)
+    assert all(span["parent_id"] == client_span.context.span_id for span in server)
+    assert all(span["trace_id"] == client_span.context.trace_id for span in server)
+
+
+async def test_monolith_runs_a_plan_in_process():
+    app = build_monolith(["agicore-mcp", "agicore-analytics", "agicore-storage"])
+    async with app.router.lifespan_context(app):
+        local = dict(http_client._local_services)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://monolith") as client:
+            assert (await client.get("/health")).json()["services"] == ["agicore-mcp", "agicore-analytics", "agicore-storage"]
+            plan = (await client.post("/agicore-mcp/create-plan", json={"description": "Report on AI stocks"})).json()
+            result = (await client.post(f"/agicore-mcp/execute-plan/{plan['id']}")).json()
+
+    assert result["status"] == "completed", result
+    assert local["agicore-analytics"].direct_calls == 1 and local["agicore-storage"].direct_calls == 1
+    assert http_client._local_services == {}  # Calls go back over the network once the monolith stops
+
+
+def test_monolith_rejects_unknown_services():
+    with pytest.raises(ValueError, match="agicore-cad"):
+        build_monolith(["agicore-cad"])
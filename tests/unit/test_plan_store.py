@@ -0,0 +1,48 @@
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'services' / 'agicore_mcp'))
+
+from plan_store import SQLitePlanStore, new_plan_record
+
+async def test_plans_survive_a_cold_cache(tmp_path):
+    """Plans written by one store instance are readable from disk by another."""
+    path = str(tmp_path / "plans.db")
+    writer = SQLitePlanStore(path=path)
+    await writer.save_many([new_plan_record(f"plan_{i}", []) for i in range(3)])
+    await writer.update_status("plan_1", "completed")
+    writer.close()
+
+    reader = SQLitePlanStore(path=path, cache_size=2)
+    plan = await reader.get("plan_1")
+    assert plan["status"] == "completed"
+    assert await reader.get("missing") is None
+    journal_mode = reader._execute(lambda conn: conn.execute("PRAGMA journal_mode").fetchone()[0])
+    assert journal_mode == "wal"
+    reader.close()
+
+async def test_lru_evicts_least_recently_used():
+    store = SQLitePlanStore(path=":memory:", cache_size=2)
+    await store.save_many([new_plan_record(f"plan_{i}", []) for i in range(3)])
+    assert store.cache.get("plan_0") is None
+    assert store.cache.get("plan_2") is not None
+    assert (await store.get("plan_0"))["id"] == "plan_0"
+
+async def test_checkpoints_persist_until_cleared(tmp_path):
+    path = str(tmp_path / "plans.db")
+    writer = SQLitePlanStore(path=path)
+    await writer.save_checkpoint("plan_1", "analyze", "failed", error="timeout")
+    await writer.save_checkpoint("plan_1", "analyze", "completed", {"trend": "up"})
+    await writer.save_checkpoint("plan_2", "analyze", "completed", [1, 2])
+    writer.close()
+
+    reader = SQLitePlanStore(path=path)
+    checkpoints = await reader.get_checkpoints("plan_1")
+    assert list(checkpoints) == ["analyze"]
+    assert checkpoints["analyze"]["status"] == "completed" and checkpoints["analyze"]["output"] == {"trend": "up"}
+    assert checkpoints["analyze"]["error"] is None
+
+    await reader.clear_checkpoints("plan_1")
+    assert await reader.get_checkpoints("plan_1") == {}
+    assert (await reader.get_checkpoints("plan_2"))["analyze"]["output"] == [1, 2]
+    reader.close()
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'services' / 'agicore_mcp'))
+
+from plan_templates import PlanTemplateCache, compile_template, goal_shape, instantiate
+
+def trade_steps(symbol, quantity, topic="AI stocks"):
+    return [
+        {"id": "analyze", "params": {"topic": f"{topic} and {symbol}", "limit": 100}},
+        {"id": "trade", "params": {"symbol": symbol, "quantity": quantity}, "depends_on": ["analyze"]},
+    ]
+
+def test_goals_differing_only_in_parameters_share_a_key():
+    a = goal_shape("Buy 5 shares of NVDA", ["Use public data only", "Max 10% exposure"], {"topic": "AI stocks"})
+    b = goal_shape("buy 7 shares of  $TSLA.", ["max 20% exposure", "use public data only", "Use public data only"], {"topic": "energy"})
+
+    assert a.key == b.key
+    assert a.values == ["AI stocks", "5", "NVDA", "10"]
+    assert b.values == ["energy", "7", "TSLA", "20"]
+    assert goal_shape("Sell 5 shares of NVDA", []).key != goal_shape("Buy 5 shares of NVDA", []).key
+
+def test_templates_substitute_whole_values_only():
+    shape = goal_shape("Buy 5 shares of NVDA", [])
+    template = compile_template(trade_steps("NVDA", 5), shape.values)
+
+    assert instantiate(template, ["7", "TSLA"]) == trade_steps("TSLA", 7)
+    assert instantiate(template, ["5", "NVDA"]) == trade_steps("NVDA", 5)
+    assert compile_template([{"note": "NVDAX"}], ["NVDA"]) == [{"note": "NVDAX"}]
+    assert compile_template(trade_steps("NVDA", 5), ["NVDA", "NVDA"]) is None  # Ambiguous
+
+async def test_verified_templates_skip_the_planner():
+    cache = PlanTemplateCache(capacity=8)
+    calls = []
+
+    def goal(symbol, quantity):
+        async def planner():
+            calls.append(symbol)
+            return trade_steps(symbol, quantity)
+        return goal_shape(f"Buy {quantity} shares of {symbol}", []), planner
+
+    outcomes = []
+    for symbol, quantity in [("NVDA", 5), ("NVDA", 5), ("TSLA", 7), ("AAPL", 3), ("MSFT", 2)]:
+        shape, planner = goal(symbol, quantity)
+        steps, outcome = await cache.plan(shape, planner)
+        assert steps == trade_steps(symbol, quantity)
+        outcomes.append(outcome)
+
+    assert outcomes == ["miss", "hit", "verify", "hit", "hit"]
+    assert calls == ["NVDA", "TSLA"]
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["planner_calls"] == 2 and stats["hit_rate"] == 0.6
+
+async def test_shapes_the_planner_does_not_follow_are_always_planned():
+    cache = PlanTemplateCache(capacity=8)
+
+    async def plan(symbol):
+        shape = goal_shape(f"Report on {symbol}", [])
+        async def planner():
+            return [{"id": "report", "params": {"key": f"reports/{symbol.lower()}.json"}}]  # Not a whole value
+        return await cache.plan(shape, planner)
+
+    outcomes = [(await plan(symbol))[1] for symbol in ("NVDA", "TSLA", "AAPL")]
+    steps, _ = await plan("MSFT")
+
+    assert outcomes == ["miss", "verify", "bypass"]
+    assert steps == [{"id": "report", "params": {"key": "reports/msft.json"}}]
+    assert cache.stats()["rejected"] == 1
+    assert 'outcome="bypass"} 2' in "\n".join(cache.prometheus("agicore-mcp"))
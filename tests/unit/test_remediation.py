@@ -0,0 +1,102 @@
+
+import asyncio
+
+import httpx
+
+from tests.helpers import load_service_module
+
+remediation = load_service_module("operator", "remediation")
+operator = load_service_module("operator")
+
+
+async def test_duplicate_restarts_join_the_one_in_flight():
+    release = asyncio.Event()
+    calls = []
+
+    async def restart(service_name):
+        calls.append(service_name)
+        await release.wait()
+        return True
+
+    engine = remediation.RemediationEngine(restart)
+    decisions = [engine.request_restart("agicore-trader").action for _ in range(5)]
+    assert decisions == ["queued_restart"] + ["restart_in_progress"] * 4
+
+    release.set()
+    await engine.wait_idle("agicore-trader")
+    assert calls == ["agicore-trader"]
+    assert engine.status()["agicore-trader"]["deduplicated"] == 4
+
+
+async def test_restarts_are_rate_limited_per_service_and_fleet():
+    async def restart(service_name):
+        return True
+
+    engine = remediation.RemediationEngine(restart, restarts_per_service=2, fleet_restarts=3, window=3600)
+    actions = []
+    for _ in range(3):
+        actions.append(engine.request_restart("a").action)
+        await engine.wait_idle("a")
+    assert actions == ["queued_restart", "queued_restart", "rate_limited"]
+
+    assert engine.request_restart("b").action == "queued_restart"
+    await engine.wait_idle("b")
+    decision = engine.request_restart("c")
+    assert decision.action == "rate_limited" and "fleet" in decision.detail
+
+
+async def test_failed_restarts_open_the_circuit_and_escalate():
+    escalations = []
+
+    async def restart(service_name):
+        return False
+
+    engine = remediation.RemediationEngine(
+        restart, restarts_per_service=10, failure_threshold=2, reset_timeout=3600,
+        on_escalate=lambda name, reason: escalations.append((name, reason)),
+    )
+    for _ in range(2):
+        engine.request_restart("a", "broker down")
+        await engine.wait_idle("a")
+
+    assert escalations == [("a", "broker down")]
+    assert engine.request_restart("a").action == "escalated"
+    assert engine.status()["a"]["circuit"] == "open"
+
+
+async def test_half_open_circuit_closes_after_a_successful_trial():
+    outcomes = iter([False, True])
+
+    async def restart(service_name):
+        return next(outcomes)
+
+    engine = remediation.RemediationEngine(restart, failure_threshold=1, reset_timeout=0)
+    engine.request_restart("a")
+    await engine.wait_idle("a")
+    assert engine.status()["a"]["circuit"] == "open"
+
+    assert engine.request_restart("a").action == "queued_restart"
+    await engine.wait_idle("a")
+    assert engine.status()["a"]["circuit"] == "closed"
+
+
+async def test_unhealthy_reports_do_not_stack_restarts(monkeypatch):
+    release = asyncio.Event()
+
+    async def restart(service_name):
+        await release.wait()
+        return True
+
+    monkeypatch.setattr(operator.remediation_engine, "restart", restart)
+    report = {"service_name": "agicore-mediamaker", "status": "unhealthy", "details": "OOM"}
+    transport = httpx.ASGITransport(app=operator.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://operator") as client:
+        first = (await client.post("/diagnose-and-remediate", json=report)).json()
+        second = (await client.post("/diagnose-and-remediate", json=report)).json()
+        assert first["action_taken"] == "queued_restart"
+        assert second["action_taken"] == "restart_in_progress"
+
+        release.set()
+        await operator.remediation_engine.wait_idle("agicore-mediamaker")
+        status = (await client.get("/remediation")).json()
+        assert status["agicore-mediamaker"]["restarts"] == 1
@@ -0,0 +1,69 @@
+
+import msgpack
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from tools import serialization
+from tools.serialization import FastJSONResponse, SerializationMiddleware
+
+
+class Echo(BaseModel):
+    name: str
+    values: list
+
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(SerializationMiddleware)
+
+
+@app.post("/echo")
+async def echo(body: Echo):
+    return {"name": body.name, "total": sum(body.values)}
+
+
+client = TestClient(app)
+
+
+def test_dumps_handles_numpy_and_is_compact():
+    assert serialization.dumps({"a": np.arange(3), 1: "x"}) == b'{"a":[0,1,2],"1":"x"}'
+
+
+def test_json_is_the_default():
+    response = client.post("/echo", json={"name": "n", "values": [1, 2]})
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"name": "n", "total": 3}
+
+
+def test_msgpack_request_and_response_are_negotiated():
+    response = client.post(
+        "/echo",
+        content=msgpack.packb({"name": "n", "values": [1, 2, 3]}),
+        headers={"Content-Type": "application/x-msgpack", "Accept": "application/x-msgpack"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-msgpack"
+    assert msgpack.unpackb(response.content) == {"name": "n", "total": 6}
+
+
+def test_malformed_msgpack_body_is_rejected():
+    response = client.post("/echo", content=b"\xc1", headers={"Content-Type": "application/x-msgpack"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_compression_round_trip_detects_codec(codec):
+    data = serialization.dumps({"steps": [{"id": i} for i in range(500)]})
+    compressed = serialization.compress(data, codec)
+    assert len(compressed) < len(data)
+    assert serialization.decompress(compressed) == data
+    assert serialization.decompress(data) == data
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_corrupt_compressed_data_raises_value_error(codec):
+    compressed = serialization.compress(serialization.dumps({"rows": list(range(100))}), codec)
+    with pytest.raises(ValueError):
+        serialization.decompress(compressed[:8] + b"corrupt" + compressed[15:])
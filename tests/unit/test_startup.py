@@ -0,0 +1,108 @@
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from services.operator.app import state as operator_state
+from tools import startup, startup_profiler
+
+
+@pytest.fixture
+def fast_start(monkeypatch, tmp_path):
+    monkeypatch.setattr(startup, "FAST_START", True)
+    monkeypatch.setattr(startup, "_deferred", {})
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "heavy_dependency.py").write_text("import builtins\nbuiltins.heavy_loads = getattr(builtins, 'heavy_loads', 0) + 1\nVALUE = 42\n")
+    yield
+    sys.modules.pop("heavy_dependency", None)
+    import builtins
+    builtins.__dict__.pop("heavy_loads", None)
+
+
+def test_deferred_module_is_imported_on_first_use(fast_start):
+    import builtins
+    module = startup.lazy_import("heavy_dependency")
+    assert "heavy_dependency" not in sys.modules and not hasattr(builtins, "heavy_loads")
+    assert module.VALUE == 42 and module.VALUE == 42
+    assert builtins.heavy_loads == 1
+    assert "VALUE" in vars(module)  # Later lookups are plain attribute hits
+    assert startup.warm_up() == []
+
+
+async def test_deferred_modules_are_warmed_up_once_the_app_has_started(fast_start):
+    startup.lazy_import("heavy_dependency")
+
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "lifespan.startup.complete"})
+
+    middleware = startup.FastStartMiddleware(app)
+    sent = []
+
+    async def receive():
+        return {"type": "lifespan.startup"}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware({"type": "lifespan"}, receive, send)
+    await asyncio.to_thread(middleware._warming.join, 5)
+    assert sent == [{"type": "lifespan.startup.complete"}]
+    assert "heavy_dependency" in sys.modules
+
+
+def test_lazy_import_is_a_plain_import_outside_fast_start(monkeypatch):
+    monkeypatch.setattr(startup, "FAST_START", False)
+    assert startup.lazy_import("json") is sys.modules["json"]
+
+
+def test_state_is_loaded_from_the_snapshot_until_the_yaml_changes(tmp_path, monkeypatch):
+    state_file = tmp_path / "STATE.yml"
+    state_file.write_text("services:\n  trader: {replicas: 2}\ndeployed_at: 2024-05-01\n")
+    expected = {"services": {"trader": {"replicas": 2}}, "deployed_at": "2024-05-01"}
+    assert operator_state.load_state(state_file) == expected
+    assert operator_state.snapshot_path(state_file).exists()
+
+    compiled = []
+    original = operator_state.compile_state
+    monkeypatch.setattr(operator_state, "compile_state", lambda *args: compiled.append(args) or original(*args))
+    assert operator_state.load_state(state_file) == expected
+    assert compiled == []  # No YAML parsing while the snapshot is current
+
+    os.utime(state_file, ns=(1, 1))  # E.g. copied into an image layer: only the contents count
+    assert operator_state.load_state(state_file) == expected
+    assert compiled == []
+
+    state_file.write_text("services:\n  trader: {replicas: 2}\ndeployed_at: 2024-05-02\n")
+    assert operator_state.load_state(state_file)["deployed_at"] == "2024-05-02"
+    state_file.write_text("services:\n  trader: {replicas: 3}\n")
+    assert operator_state.load_state(state_file) == {"services": {"trader": {"replicas": 3}}}
+    assert len(compiled) == 2
+
+    state_file.unlink()  # Only the snapshot was shipped
+    assert operator_state.load_state(state_file) == {"services": {"trader": {"replicas": 3}}}
+    assert operator_state.load_state(tmp_path / "missing.yml") is None
+
+
+def test_importtime_output_is_grouped_by_package(tmp_path):
+    (tmp_path / "order_batching.py").write_text("")
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:      2000 |       2000 |     numpy.core\n"
+        "import time:      1000 |       3000 |   numpy\n"
+        "import time:       500 |        500 |   order_batching\n"
+        "import time:      4000 |       7500 | main\n"
+    )
+    modules = startup_profiler.parse_importtime(stderr)
+    assert [(m["module"], m["depth"]) for m in modules] == [("numpy.core", 2), ("numpy", 1), ("order_batching", 1), ("main", 0)]
+    assert startup_profiler.group_by_package(modules, tmp_path) == {"main": 4.0, "numpy": 3.0, "order_batching": 0.5}
+    assert startup_profiler.parse_budgets("operator=800, agicore-trader=1200") == {"operator": 800.0, "agicore-trader": 1200.0}
+
+
+def test_cold_start_reports_each_phase():
+    result = startup_profiler.cold_start("agicore-storage", fast_start=True)
+    assert result["status"] == 200
+    assert result["import_ms"] > 0 and result["total_ms"] >= result["import_ms"]
+    assert "fastapi" in result["packages_ms"] and "main" in result["packages_ms"]
@@ -0,0 +1,207 @@
+
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.helpers import load_service_module
+
+storage = load_service_module("agicore-storage")
+object_store = load_service_module("agicore-storage", "object_store")
+client = TestClient(storage.app)
+
+def test_store_and_retrieve_json_object():
+    payload = {"bucket": "agicore-reports", "key": "reports/q4.json", "content": {"revenue": 42}}
+    stored = client.post("/store-object", json=payload)
+    assert stored.status_code == 200
+    assert stored.json()["url"].endswith("/agicore-reports/reports/q4.json")
+
+    retrieved = client.post("/retrieve-object", json={"bucket": "agicore-reports", "key": "reports/q4.json"})
+    assert retrieved.json()["content"] == {"revenue": 42}
+
+def test_integers_wider_than_64_bits_round_trip():
+    payload = {"bucket": "agicore-reports", "key": "reports/wide.json", "content": {"n": 2**70}}
+    assert client.post("/store-object", json=payload).status_code == 200
+
+    retrieved = client.post("/retrieve-object", json={"bucket": "agicore-reports", "key": "reports/wide.json"})
+    assert retrieved.status_code == 200
+    assert f'"n":{2**70}' in retrieved.text  # Exact, not rounded through a float
+    assert retrieved.json()["content"] == {"n": 2**70}
+
+def test_retrieve_missing_object_returns_404():
+    response = client.post("/retrieve-object", json={"bucket": "agicore-reports", "key": "missing.json"})
+    assert response.status_code == 404
+
+def test_path_traversal_is_rejected():
+    payload = {"bucket": "agicore-reports", "key": "../../etc/passwd", "content": {}}
+    assert client.post("/store-object", json=payload).status_code == 400
+
+def test_delete_object():
+    target = {"bucket": "agicore-reports", "key": "reports/draft.json"}
+    client.post("/store-object", json={**target, "content": {"draft": True}})
+
+    assert client.post("/delete-object", json=target).json() == {"status": "deleted"}
+    assert client.post("/delete-object", json=target).json() == {"status": "not_found"}
+    assert client.post("/retrieve-object", json=target).status_code == 404
+
+def test_streaming_upload_and_range_download():
+    body = bytes(range(256)) * 4096  # 1 MiB, spans several read chunks
+    upload = client.put("/objects/agicore-blobs/large/blob.bin", content=body)
+    assert upload.json()["size"] == len(body)
+
+    full = client.get("/objects/agicore-blobs/large/blob.bin")
+    assert full.status_code == 200 and full.content == body
+
+    partial = client.get("/objects/agicore-blobs/large/blob.bin", headers={"Range": "bytes=1000-1999"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 1000-1999/{len(body)}"
+    assert partial.content == body[1000:2000]
+
+    suffix = client.get("/objects/agicore-blobs/large/blob.bin", headers={"Range": "bytes=-10"})
+    assert suffix.content == body[-10:]
+
+    beyond = client.get("/objects/agicore-blobs/large/blob.bin", headers={"Range": f"bytes={len(body)}-"})
+    assert beyond.status_code == 416
+
+def test_download_is_consistent_when_the_object_is_replaced_meanwhile(monkeypatch):
+    client.put("/objects/agicore-blobs/replaced.bin", content=b"a" * 10)
+    open_object = storage.object_store.open_object
+
+    def open_then_replace(bucket, key):
+        reader = open_object(bucket, key)
+        path = storage.object_store.path_for(bucket, key)
+        replacement = path.with_name("replacement.bin")
+        replacement.write_bytes(b"b" * 100)
+        os.replace(replacement, path)  # An atomic rename by a concurrent upload
+        return reader
+
+    monkeypatch.setattr(storage.object_store, "open_object", open_then_replace)
+    response = client.get("/objects/agicore-blobs/replaced.bin", headers={"Range": "bytes=5-"})
+
+    assert response.headers["content-range"] == "bytes 5-9/10"
+    assert response.headers["content-length"] == "5" and response.content == b"a" * 5
+
+async def test_failed_upload_leaves_no_partial_object(tmp_path):
+    store = object_store.LocalFileObjectStore(str(tmp_path))
+
+    async def broken_stream():
+        yield b"partial data"
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        await store.put_stream("agicore-blobs", "a/b.bin", broken_stream())
+
+    with pytest.raises(object_store.ObjectNotFound):
+        store.stat("agicore-blobs", "a/b.bin")
+    assert os.listdir(tmp_path / "agicore-blobs" / "a") == []
+
+def _ndjson(items):
+    return "".join(json.dumps(item) + "\n" for item in items)
+
+def _parse_ndjson(text):
+    return sorted((json.loads(line) for line in text.splitlines()), key=lambda line: line["index"])
+
+def test_bulk_store_and_retrieve_stream_ndjson():
+    objects = [{"bucket": "agicore-bulk", "key": f"step-{i}.json", "content": {"i": i}} for i in range(40)]
+    stored = client.post("/store-objects", content=_ndjson(objects), headers={"Content-Type": "application/x-ndjson"})
+    assert stored.headers["content-type"] == "application/x-ndjson"
+    lines = _parse_ndjson(stored.text)
+    assert [line["index"] for line in lines] == list(range(40))
+    assert all(line["status"] == "success" for line in lines)
+
+    # Concurrent puts from one bulk call share commits.
+    metrics = client.get("/store-objects/metrics").json()
+    assert metrics["enabled"] and metrics["batches"] < metrics["commits"]
+
+    requests = [{"bucket": "agicore-bulk", "key": "step-3.json"}, {"bucket": "agicore-bulk", "key": "nope.json"}]
+    retrieved = _parse_ndjson(client.post("/retrieve-objects", content=_ndjson(requests) + "not json\n").text)
+    assert retrieved[0]["content"] == {"i": 3}
+    assert retrieved[1]["status_code"] == 404
+    assert retrieved[2]["status_code"] == 400
+
+def test_bulk_store_reports_key_conflicts_per_item():
+    client.post("/store-object", json={"bucket": "agicore-bulk", "key": "nested/leaf", "content": {}})
+    objects = [
+        {"bucket": "agicore-bulk", "key": "nested/leaf/child.json", "content": {}},  # "nested/leaf" is an object
+        {"bucket": "agicore-bulk", "key": "nested/other.json", "content": {}},
+    ]
+    lines = _parse_ndjson(client.post("/store-objects", content=_ndjson(objects)).text)
+
+    assert lines[0]["status_code"] == 409 and lines[1]["status"] == "success"
+    assert client.post("/store-object", json=objects[0]).status_code == 409
+
+def test_corrupt_compressed_object_is_not_a_server_error():
+    for body in (b"\x28\xb5\x2f\xfdnot zstd", b"\x1f\x8bnot gzip"):
+        client.put("/objects/agicore-reports/corrupt.json", content=body)
+        response = client.post("/retrieve-object", json={"bucket": "agicore-reports", "key": "corrupt.json"})
+        assert response.status_code == 415
+
+async def test_group_commit_batches_concurrent_writes(tmp_path):
+    committer = object_store.GroupCommitter(max_delay=0.05, max_batch=100)
+    store = object_store.LocalFileObjectStore(str(tmp_path), committer=committer)
+
+    await asyncio.gather(*(store.put_bytes("agicore-bulk", f"k{i}", b"x" * i) for i in range(10)))
+
+    assert committer.stats()["batches"] == 1
+    assert committer.stats()["directory_syncs"] == 1
+    assert store.stat("agicore-bulk", "k9").size == 9
+
+@pytest.mark.parametrize("use_syncfs", [True, False])
+async def test_group_commit_syncs_a_batch_once(tmp_path, use_syncfs):
+    committer = object_store.GroupCommitter(max_delay=0.05, max_batch=100, syncfs=use_syncfs)
+    store = object_store.LocalFileObjectStore(str(tmp_path), committer=committer)
+
+    await asyncio.gather(*(store.put_bytes("agicore-bulk", f"k{i}", b"x" * i) for i in range(10)))
+
+    # With syncfs the whole batch costs one data sync; without it, one fsync per file.
+    expected = 1 if committer.stats()["sync_mode"] == "syncfs" else 10
+    assert committer.stats()["data_syncs"] == expected
+    assert committer.syncfs == (use_syncfs and object_store._syncfs is not None)
+    assert [store.stat("agicore-bulk", f"k{i}").size for i in range(10)] == list(range(10))
+
+async def test_uploads_are_written_off_the_event_loop(tmp_path):
+    store = object_store.LocalFileObjectStore(str(tmp_path), fsync=False)
+    open_temp = store._open_temp
+    writer_threads = set()
+
+    class RecordingHandle:
+        def __init__(self, handle):
+            self._handle = handle
+
+        def writelines(self, chunks):
+            writer_threads.add(threading.get_ident())
+            self._handle.writelines(chunks)
+
+        def __getattr__(self, name):
+            return getattr(self._handle, name)
+
+    def recording_open_temp(path):
+        handle, temp_path = open_temp(path)
+        return RecordingHandle(handle), temp_path
+
+    store._open_temp = recording_open_temp
+    body = os.urandom(3 * object_store.CHUNK_SIZE + 123)
+
+    async def chunks():
+        for offset in range(0, len(body), 64 * 1024):
+            yield body[offset:offset + 64 * 1024]
+
+    info = await store.put_stream("agicore-blobs", "large/upload.bin", chunks())
+
+    assert info.size == len(body) and await store.get_bytes("agicore-blobs", "large/upload.bin") == body
+    assert writer_threads and threading.get_ident() not in writer_threads
+
+def test_bucket_codec_compresses_large_json_objects(monkeypatch):
+    monkeypatch.setitem(storage.STORAGE_BUCKET_CODECS, "agicore-archive", "zstd")
+    content = {"rows": [{"n": i, "label": "repeated"} for i in range(200)]}
+    client.post("/store-object", json={"bucket": "agicore-archive", "key": "big.json", "content": content})
+
+    raw = client.get("/objects/agicore-archive/big.json").content
+    assert raw.startswith(b"\x28\xb5\x2f\xfd")
+    assert len(raw) < len(json.dumps(content))
+
+    retrieved = client.post("/retrieve-object", json={"bucket": "agicore-archive", "key": "big.json"})
+    assert retrieved.json()["content"] == content
@@ -0,0 +1,98 @@
+
+import asyncio
+import json
+import numpy as np
+import pytest
+
+from tests.helpers import load_service_module
+
+load_service_module("agicore-trader", "market_data")
+streaming = load_service_module("agicore-trader", "streaming")
+
+def test_subscriber_coalesces_per_key_and_drops_oldest_when_full():
+    subscriber = streaming.Subscriber(max_pending=2)
+    subscriber.offer(("BTC", "1h"), "btc-1")
+    subscriber.offer(("BTC", "1h"), "btc-2")
+    subscriber.offer(("ETH", "1h"), "eth-1")
+    subscriber.offer(("SOL", "1h"), "sol-1")
+
+    assert (subscriber.coalesced, subscriber.dropped) == (1, 1)
+
+    async def drain():
+        return [await subscriber.get(), await subscriber.get()]
+
+    assert asyncio.run(drain()) == ["eth-1", "sol-1"]
+
+class FakeEngine:
+    """Returns a single bar whose close can be changed by the test."""
+
+    def __init__(self):
+        self.close = 100.0
+        self.fetches = 0
+
+    def timeframe_seconds(self, timeframe):
+        return 3600
+
+    async def get_bars(self, symbol, timeframe, limit=1):
+        self.fetches += 1
+        return np.array([[0.0, 99.0, 101.0, 98.0, self.close, 10.0]])
+
+async def test_hub_computes_each_update_once_for_all_subscribers():
+    engine = FakeEngine()
+    hub = streaming.MarketDataHub(engine, poll_interval=3600)
+    subscribers = [hub.connect() for _ in range(50)]
+    for subscriber in subscribers:
+        await hub.subscribe(subscriber, "BTC", "1h")
+    snapshots = [await s.get() for s in subscribers]
+    assert json.loads(snapshots[0])["close"] == 100.0
+
+    engine.fetches = 0
+    engine.close = 105.0
+    await hub.publish_changes()
+    updates = [await s.get() for s in subscribers]
+
+    assert engine.fetches == 1
+    assert hub.updates_published == 1
+    assert all(update is updates[0] for update in updates)
+    assert json.loads(updates[0])["close"] == 105.0
+
+    # Unchanged bars are not republished.
+    await hub.publish_changes()
+    assert hub.updates_published == 1
+    for subscriber in subscribers:
+        hub.disconnect(subscriber)
+    assert hub.subscriber_count == 0
+    await hub.stop()
+
+async def test_a_new_subscribers_snapshot_does_not_hide_the_update_from_the_others():
+    engine = FakeEngine()
+    hub = streaming.MarketDataHub(engine, poll_interval=3600)
+    early, late = hub.connect(), hub.connect()
+    await hub.subscribe(early, "BTC", "1h")
+    await early.get()
+
+    engine.close = 105.0  # A new bar arrives before the next poll...
+    await hub.subscribe(late, "BTC", "1h")  # ...and the late subscriber gets it as its snapshot
+    await hub.publish_changes()
+
+    assert json.loads(await late.get())["close"] == 105.0
+    assert json.loads(await early.get())["close"] == 105.0
+    assert hub.updates_published == 1
+    await hub.publish_changes()
+    assert hub.updates_published == 1
+    await hub.stop()
+
+async def test_failed_subscribe_leaves_no_subscriber_behind():
+    engine = FakeEngine()
+    hub = streaming.MarketDataHub(engine, poll_interval=3600)
+    subscriber = hub.connect()
+
+    async def unknown_symbol(symbol, timeframe, limit=1):
+        raise ValueError(f"Unknown symbol '{symbol}'.")
+
+    engine.get_bars = unknown_symbol
+    with pytest.raises(ValueError):
+        await hub.subscribe(subscriber, "NOPE", "1h")
+
+    assert hub.subscriber_count == 0 and subscriber.keys == set()
+    await hub.stop()
@@ -0,0 +1,115 @@
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from tools import http_client, tracing
+from services.agicore_mcp import main as mcp
+
+
+def memory_tracer(service="test", sample_ratio=1.0):
+    spans = []
+    exporter = tracing.BatchSpanExporter(spans.extend)
+    return tracing.Tracer(service, exporter, sample_ratio), exporter, spans
+
+
+def test_traceparent_round_trip():
+    tracer, _, _ = memory_tracer()
+    span = tracer.create_span("op")
+    context = tracing.parse_traceparent(span.traceparent())
+    assert context == span.context
+    assert tracing.parse_traceparent("garbage") is None
+    assert tracing.parse_traceparent("00-" + "a" * 32 + "-" + "b" * 16 + "-00").sampled is False
+
+
+async def test_nested_spans_share_the_trace_and_are_batched():
+    tracer, exporter, spans = memory_tracer()
+    with tracer.start_span("parent") as parent:
+        with tracer.start_span("child") as child:
+            await asyncio.sleep(0)
+            assert tracing.current_span() is child
+        assert tracing.current_span() is parent
+    assert tracing.current_span() is None
+
+    assert spans == []  # Nothing is written on the request path.
+    await exporter.shutdown()
+    by_name = {span["name"]: span for span in spans}
+    assert by_name["child"]["parent_id"] == by_name["parent"]["span_id"]
+    assert by_name["child"]["trace_id"] == by_name["parent"]["trace_id"]
+
+
+async def test_unsampled_traces_export_nothing_but_still_propagate():
+    tracer, exporter, spans = memory_tracer(sample_ratio=0.0)
+    with tracer.start_span("root") as root:
+        headers = tracing.inject_headers()
+    await exporter.shutdown()
+    assert spans == []
+    assert headers["traceparent"].endswith("-00")
+    assert tracing.parse_traceparent(headers["traceparent"]).trace_id == root.context.trace_id
+
+
+def test_middleware_continues_incoming_trace():
+    tracer, exporter, spans = memory_tracer()
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware, tracer=tracer)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"trace_id": tracing.current_span().context.trace_id}
+
+    incoming = "00-" + "1" * 32 + "-" + "2" * 16 + "-01"
+    response = TestClient(app).get("/items/5", headers={"traceparent": incoming})
+    assert response.json()["trace_id"] == "1" * 32
+    exporter.flush()
+    assert spans[0]["name"] == "GET /items/{item_id}"
+    assert spans[0]["parent_id"] == "2" * 16 and spans[0]["kind"] == "server"
+
+
+def test_json_lines_exporter_appends_spans(tmp_path):
+    path = tmp_path / "nested" / "traces.jsonl"
+    sink = tracing.JsonLinesFileExporter(str(path))
+    sink.write([{"name": "a"}, {"name": "b"}])
+    sink.write([{"name": "c"}])
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["a", "b", "c"]
+
+
+async def test_plan_execution_produces_a_connected_trace(monkeypatch):
+    tracer, exporter, spans = memory_tracer("agicore-mcp")
+    monkeypatch.setattr(mcp, "tracer", tracer)
+    for middleware in mcp.app.user_middleware:
+        if middleware.cls is tracing.TracingMiddleware:
+            monkeypatch.setitem(middleware.kwargs, "tracer", tracer)
+    mcp.app.middleware_stack = None
+
+    seen_headers = []
+
+    def downstream(request):
+        seen_headers.append(request.headers.get("traceparent"))
+        return httpx.Response(200, json={"status": "success"})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(downstream)))
+
+    transport = httpx.ASGITransport(app=mcp.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mcp") as client:
+        plan_id = (await client.post("/create-plan", json={"description": "trace me"})).json()["id"]
+        await exporter.shutdown()
+        spans.clear()
+        assert (await client.post(f"/execute-plan/{plan_id}")).json()["status"] == "completed"
+    await exporter.shutdown()
+    mcp.app.middleware_stack = None
+
+    by_name = {span["name"]: span for span in spans}
+    server = by_name["POST /execute-plan/{plan_id}"]
+    plan = by_name["execute_plan"]
+    assert plan["parent_id"] == server["span_id"]
+    for step_id, service in (("analyze", "agicore-analytics"), ("report", "agicore-storage")):
+        step = by_name[f"step {step_id}"]
+        assert step["parent_id"] == plan["span_id"]
+        client_span = next(s for s in spans if s["kind"] == "client" and s["parent_id"] == step["span_id"])
+        assert client_span["attributes"]["peer.service"] == service
+        assert f"-{client_span['span_id']}-01" in " ".join(seen_headers)
+    assert {span["trace_id"] for span in spans} == {server["trace_id"]}
@@ -0,0 +1,104 @@
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.helpers import load_service_module
+
+trader = load_service_module("agicore-trader")
+client = TestClient(trader.app)
+
+def test_execute_trade_single_order():
+    response = client.post("/execute-trade", json={"symbol": "BTC", "action": "BUY", "quantity": 1})
+    assert response.status_code == 200
+    assert response.json()["status"] == "filled"
+
+def test_execute_trades_nets_opposing_orders_per_symbol():
+    orders = [
+        {"symbol": "AAPL", "action": "BUY", "quantity": 10},
+        {"symbol": "AAPL", "action": "SELL", "quantity": 4},
+        {"symbol": "MSFT", "action": "SELL", "quantity": 5},
+        {"symbol": "MSFT", "action": "BUY", "quantity": 5},
+    ]
+    response = client.post("/execute-trades", json=orders)
+    assert response.status_code == 200
+    batch = response.json()
+
+    # AAPL nets to one BUY of 6; MSFT offsets completely and never reaches the broker.
+    assert [(o["symbol"], o["action"], o["quantity"]) for o in batch["broker_orders"]] == [("AAPL", "BUY", 6.0)]
+    assert all(r["status"] == "filled" for r in batch["results"])
+    assert batch["results"][0]["trade_id"] == batch["broker_orders"][0]["trade_id"]
+    assert batch["results"][0]["crossed_quantity"] == 4.0
+    assert [r["trade_id"] for r in batch["results"][1:]] == [None, None, None]
+
+def test_execute_trades_gives_the_broker_trade_id_only_to_the_residual():
+    orders = [
+        {"symbol": "ETH", "action": "SELL", "quantity": 3},
+        {"symbol": "ETH", "action": "BUY", "quantity": 2},
+        {"symbol": "ETH", "action": "BUY", "quantity": 5},
+    ]
+    sell, first_buy, second_buy = client.post("/execute-trades", json=orders).json()["results"]
+
+    # The SELL offsets the first BUY and 1 of the second; only the second BUY reaches the broker.
+    assert (sell["trade_id"], sell["filled_price"], sell["crossed_quantity"]) == (None, None, 3.0)
+    assert (first_buy["trade_id"], first_buy["crossed_quantity"]) == (None, 2.0)
+    assert second_buy["trade_id"] is not None and second_buy["crossed_quantity"] == 1.0
+
+def test_unknown_order_types_are_rejected():
+    response = client.post("/execute-trade", json={"symbol": "BTC", "action": "BUY", "quantity": 1, "order_type": "YOLO"})
+    assert response.status_code == 422
+
+    batch = client.post("/execute-trades", json=[{"symbol": "BTC", "action": "BUY", "quantity": 1, "order_type": "YOLO"}]).json()
+    assert batch["results"][0]["status"] == "rejected" and batch["broker_orders"] == []
+
+def test_execute_trades_rejects_invalid_orders_individually():
+    orders = [
+        {"symbol": "AAPL", "action": "BUY", "quantity": 1},
+        {"symbol": "AAPL", "action": "HOLD", "quantity": 1},
+        {"symbol": "", "action": "BUY", "quantity": 1},
+        {"symbol": "TSLA", "action": "sell", "quantity": -3},
+        {"symbol": "TSLA", "action": "BUY", "quantity": "lots"},
+        {"symbol": "NVDA", "action": "BUY", "quantity": 2, "order_type": "LIMIT"},
+    ]
+    batch = client.post("/execute-trades", json=orders).json()
+    statuses = [r["status"] for r in batch["results"]]
+
+    assert statuses == ["filled", "rejected", "rejected", "rejected", "rejected", "filled"]
+    assert batch["results"][3]["error"] == "Quantity must be positive."
+    assert batch["results"][4]["error"] == "Quantity must be a number."
+    assert (batch["accepted"], batch["rejected"]) == (2, 4)
+    assert {o["order_type"] for o in batch["broker_orders"]} == {"MARKET", "LIMIT"}
+
+def test_execute_trades_broker_failure_is_partial(monkeypatch):
+    original = trader.submit_to_broker
+
+    async def flaky_broker(symbol, action, quantity, order_type="MARKET"):
+        if symbol == "FAIL":
+            raise RuntimeError("broker rejected symbol")
+        return await original(symbol, action, quantity, order_type)
+
+    monkeypatch.setattr(trader, "submit_to_broker", flaky_broker)
+    orders = [{"symbol": "FAIL", "action": "BUY", "quantity": 1}, {"symbol": "OK", "action": "BUY", "quantity": 1}]
+    batch = client.post("/execute-trades", json=orders).json()
+
+    assert [r["status"] for r in batch["results"]] == ["failed", "filled"]
+    assert batch["failed"] == 1
+
+def test_get_market_data_returns_latest_bar_and_history():
+    response = client.post("/get-market-data", json={"symbol": "BTC", "timeframe": "4h", "limit": 6})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["close"] == data["bars"]["close"][-1]
+    assert len(data["bars"]["timestamp"]) == 6
+
+def test_get_market_data_rejects_unknown_timeframe():
+    response = client.post("/get-market-data", json={"symbol": "BTC", "timeframe": "7m"})
+    assert response.status_code == 400
+
+def test_stream_market_data_sends_snapshot_on_subscribe():
+    with client.websocket_connect("/stream/market-data") as websocket:
+        websocket.send_json({"action": "subscribe", "symbol": "ETH", "timeframe": "1h"})
+        message = websocket.receive_json()
+        assert (message["type"], message["symbol"], message["timeframe"]) == ("bar", "ETH", "1h")
+
+        websocket.send_json({"action": "subscribe", "symbol": "ETH", "timeframe": "7m"})
+        assert websocket.receive_json()["type"] == "error"
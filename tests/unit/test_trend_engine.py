@@ -0,0 +1,57 @@
+
+import numpy as np
+import pytest
+
+from tests.helpers import load_service_module
+
+trend_engine = load_service_module("agicore-analytics", "trend_engine")
+
+def test_incremental_indicators_match_full_recompute():
+    engine = trend_engine.TrendEngine(window=16, alpha=0.2)
+    values = np.random.default_rng(7).normal(100, 5, size=50) + np.arange(50) * 0.5
+    for t, value in enumerate(values):
+        engine.update("BTC", value, timestamp=t)
+
+    window = values[-16:]
+    expected_ewma = values[0]
+    for value in values[1:]:
+        expected_ewma = 0.2 * value + 0.8 * expected_ewma
+
+    snapshot = engine.snapshot("BTC")
+    assert snapshot["count"] == 50 and snapshot["window_size"] == 16
+    assert snapshot["mean"] == pytest.approx(window.mean())
+    assert snapshot["std"] == pytest.approx(window.std())
+    assert snapshot["slope"] == pytest.approx(np.polyfit(np.arange(16), window, 1)[0])
+    assert snapshot["ewma"] == pytest.approx(expected_ewma)
+
+def test_indicators_stay_accurate_on_long_series_of_large_values():
+    engine = trend_engine.TrendEngine(window=64)
+    values = 1e9 + np.random.default_rng(3).normal(0, 1, size=20000) + np.arange(20000) * 1e-3
+    for t, value in enumerate(values[:-10]):  # Ends mid-window, between recomputes
+        engine.update("s", value, timestamp=t)
+
+    window = values[-74:-10]
+    snapshot = engine.snapshot("s")
+    assert snapshot["std"] == pytest.approx(window.std(), rel=1e-6)
+    assert snapshot["slope"] == pytest.approx(np.polyfit(np.arange(64), window - 1e9, 1)[0], rel=1e-4)
+
+def test_zscore_breakout_is_detected():
+    engine = trend_engine.TrendEngine(window=8, z_threshold=3.0)
+    for t, value in enumerate([10, 11, 10, 9, 10, 11, 10, 9]):
+        engine.update("s", value, timestamp=t)
+    assert not engine.snapshot("s")["breakout"]
+    engine.update("s", 30, timestamp=9)
+    snapshot = engine.snapshot("s")
+    assert snapshot["breakout"] and snapshot["breakouts"] == 1
+    assert snapshot["last_breakout_timestamp"] == 9
+
+def test_series_count_and_memory_are_bounded():
+    engine = trend_engine.TrendEngine(window=4, max_series=100, initial_capacity=8)
+    for i in range(250):
+        engine.update(f"series-{i}", float(i))
+        engine.update("hot", float(i))
+    assert len(engine) == 100
+    assert engine.evictions == 151
+    assert "series-249" in engine and "series-0" not in engine
+    assert "hot" in engine  # Updated most recently, so never the one evicted
+    assert engine.memory_bytes() == 100 * (4 + 13) * 8
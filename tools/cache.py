@@ -0,0 +1,122 @@
+
+import asyncio
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncTTLCache:
+    """
+    A bounded LRU of results that expire after `ttl` seconds, with single-flight loading.
+
+    When several callers miss on the same key at once, only the first one calls
+    upstream; the others await the same in-flight task. Failures are shared with
+    the waiting callers but never cached.
+    """
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns a fresh cached value without loading it; counts as a hit when found."""
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+        return default
+
+    def put(self, key: Hashable, value: Any):
+        self._store(key, value)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+        try:
+            # Shielded so that one caller being cancelled does not cancel the load for everyone else.
+            value = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+            else:
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        self._store(key, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+def _default_key(args: tuple, kwargs: dict) -> Hashable:
+    return args, tuple(sorted(kwargs.items()))
+
+
+def async_cached(
+    ttl: float = 60.0,
+    maxsize: int = 1024,
+    key: Optional[Callable[..., Hashable]] = None,
+):
+    """
+    Caches the results of an async function in an AsyncTTLCache.
+    The cache is available as `func.cache`, e.g. `func.cache.stats()`.
+    """
+
+    def decorator(func):
+        cache = AsyncTTLCache(ttl=ttl, maxsize=maxsize)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key is not None else _default_key(args, kwargs)
+            return await cache.get_or_load(cache_key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
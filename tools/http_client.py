@@ -0,0 +1,137 @@
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from decouple import config
+
+from tools import tracing
+from tools.startup import lazy_import
+
+httpx = lazy_import("httpx")
+
+logger = logging.getLogger(__name__)
+
+# --- Connection Pool Configuration ---
+MAX_CONNECTIONS = config("HTTP_MAX_CONNECTIONS", default=100, cast=int)
+MAX_CONNECTIONS_PER_HOST = config("HTTP_MAX_CONNECTIONS_PER_HOST", default=20, cast=int)
+MAX_KEEPALIVE_CONNECTIONS = config("HTTP_MAX_KEEPALIVE_CONNECTIONS", default=50, cast=int)
+KEEPALIVE_EXPIRY = config("HTTP_KEEPALIVE_EXPIRY", default=30.0, cast=float)
+CONNECT_TIMEOUT = config("HTTP_CONNECT_TIMEOUT", default=2.0, cast=float)
+READ_TIMEOUT = config("HTTP_READ_TIMEOUT", default=30.0, cast=float)
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+# Agents served by this process (monolith mode), by name; see tools.local_dispatch.
+_local_services: Dict[str, Any] = {}
+
+
+class ServiceCallError(Exception):
+    """Raised when a call to another agent fails or returns an error status."""
+
+    def __init__(self, service: str, message: str, status_code: Optional[int] = None):
+        super().__init__(f"Call to '{service}' failed: {message}")
+        self.service = service
+        self.status_code = status_code
+
+
+def resolve_service_url(service_name: str) -> str:
+    """
+    Resolves an agent name (e.g. "agicore-analytics") to its base URL.
+    Set AGICORE_ANALYTICS_URL (upper-cased, dashes as underscores) to override the default,
+    which assumes the service is reachable by name, as under Docker Compose.
+    """
+    env_name = f"{service_name.upper().replace('-', '_')}_URL"
+    return config(env_name, default=f"http://{service_name}:8080").rstrip("/")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide HTTP client. Connections are kept alive and reused
+    across calls, so only the first request to a host pays for the TCP/TLS handshake.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        transport = None
+        if _local_services:
+            # Requests for co-located agents are served in-process over ASGI.
+            from tools.local_dispatch import LocalServiceTransport
+            transport = LocalServiceTransport(_local_services, httpx.AsyncHTTPTransport(limits=limits))
+        _client = httpx.AsyncClient(
+            limits=limits,
+            transport=transport,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+    return _client
+
+
+async def register_local_service(service_name: str, service: Optional[Any]):
+    """
+    Routes calls to `service_name` to a tools.local_dispatch.LocalService in this process
+    instead of over the network, or back to the network when `service` is None.
+    """
+    if service is None:
+        _local_services.pop(service_name, None)
+    else:
+        _local_services[service_name] = service
+    # The shared client is closed, releasing its connection pool, and rebuilt on next
+    # use with the new routing.
+    await close_http_client()
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    # httpx only limits connections pool-wide, so cap each host separately to keep
+    # one slow agent from occupying the whole pool.
+    host = urlsplit(url).netloc
+    if host not in _host_slots:
+        _host_slots[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    return _host_slots[host]
+
+
+async def call_service(
+    service_name: str,
+    path: str,
+    json: Optional[Dict[str, Any]] = None,
+    method: str = "POST",
+    idempotency_key: Optional[str] = None,
+) -> Any:
+    """
+    Calls an endpoint on another agent through the shared connection pool and returns the decoded JSON body.
+    When the agent runs in this process, the call goes straight to its handler instead.
+    Pass the same `idempotency_key` when retrying a call, so that the callee does the work only once.
+    """
+    url = f"{resolve_service_url(service_name)}/{path.lstrip('/')}"
+    local = _local_services.get(service_name)
+    if local is not None:
+        with tracing.start_span(f"{method} {service_name}{path}", "client", {"peer.service": service_name, "dispatch": "in-process"}):
+            return await local.call(method, "/" + path.lstrip("/"), json, idempotency_key=idempotency_key)
+    # Inside a trace, the call gets a client span and carries it to the callee in a traceparent header.
+    with tracing.start_span(f"{method} {service_name}{path}", "client", {"peer.service": service_name, "http.url": url}) as span:
+        async with _host_slot(url):
+            try:
+                headers = tracing.inject_headers({"Idempotency-Key": idempotency_key} if idempotency_key else None)
+                response = await get_http_client().request(method, url, json=json, headers=headers)
+            except httpx.HTTPError as e:
+                raise ServiceCallError(service_name, f"{type(e).__name__}: {e}")
+        if span is not None:
+            span.set_attribute("http.status_code", response.status_code)
+    if response.status_code >= 400:
+        raise ServiceCallError(service_name, f"HTTP {response.status_code}: {response.text}", response.status_code)
+    return response.json()
+
+
+async def close_http_client():
+    """Closes the shared client. Call this from the FastAPI lifespan on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
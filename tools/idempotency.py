@@ -0,0 +1,173 @@
+
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Hashable, List, Tuple
+
+from decouple import config
+
+from tools.cache import AsyncTTLCache
+from tools.serialization import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, negotiated_media_type, transcode
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL_SECONDS = config("IDEMPOTENCY_TTL_SECONDS", default=86400.0, cast=float)
+IDEMPOTENCY_MAX_KEYS = config("IDEMPOTENCY_MAX_KEYS", default=10000, cast=int)
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different request."""
+
+
+class _NotStored(Exception):
+    """Carries a result that is returned to the caller but not remembered (e.g. a server error)."""
+
+    def __init__(self, result: Any):
+        self.result = result
+
+
+class IdempotencyStore:
+    """
+    Remembers the result of each request made with an idempotency key, so that a retry
+    gets the first result back instead of repeating the work. Concurrent requests with
+    the same key wait for the first one rather than running alongside it. Failed requests
+    are not remembered, so they can be retried.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, maxsize: int = IDEMPOTENCY_MAX_KEYS):
+        self._results = AsyncTTLCache(ttl=ttl, maxsize=maxsize)
+        self.executed = 0
+        self.replayed = 0
+
+    async def run(self, key: Hashable, fingerprint: str, execute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Returns the result for `key`, calling `execute` only if there is none yet, and
+        whether it was a replay. `fingerprint` identifies the request; reusing a key for a
+        different request raises IdempotencyConflict. `execute` may raise _NotStored to
+        return a result without remembering it.
+        """
+        executed = False
+
+        async def load():
+            nonlocal executed
+            executed = True
+            self.executed += 1
+            return fingerprint, await execute()
+
+        try:
+            stored_fingerprint, result = await self._results.get_or_load(key, load)
+        except _NotStored as e:
+            # Requests that joined a failed one share its result, but nothing was replayed from the store.
+            return e.result, False
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflict("This idempotency key was already used for a different request.")
+        if not executed:
+            self.replayed += 1
+        return result, not executed
+
+    def stats(self):
+        return {"executed": self.executed, "replayed": self.replayed, **self._results.stats()}
+
+
+def fingerprint(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that makes mutating requests carrying an Idempotency-Key header safe
+    to retry: the first response for a key (method and path) is stored and replayed, with
+    an `Idempotent-Replayed: true` header, to every later request with that key. A JSON or
+    MessagePack response is re-encoded for each request's Accept header, so clients that
+    negotiate different encodings can share a key. Responses with a 5xx status are not stored. Requests with a key are buffered in full, bodies and
+    responses alike, so send large streaming uploads without one.
+    """
+
+    def __init__(self, app, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            return await self.app(scope, receive, send)
+        key = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"idempotency-key"), None)
+        if not key:
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        async def execute() -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+            delivered = False
+
+            async def replay_body():
+                nonlocal delivered
+                if not delivered:
+                    delivered = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            messages = []
+
+            async def capture(message):
+                messages.append(message)
+
+            await self.app(scope, replay_body, capture)
+            start = next(message for message in messages if message["type"] == "http.response.start")
+            response = (
+                start["status"],
+                list(start.get("headers", [])),
+                b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body"),
+            )
+            if response[0] >= 500:
+                raise _NotStored(response)
+            return response
+
+        try:
+            (status, headers, content), replayed = await self.store.run(
+                (scope["method"], scope["path"], key), fingerprint(scope.get("query_string", b""), body), execute
+            )
+        except IdempotencyConflict as e:
+            content = json.dumps({"detail": str(e)}).encode()
+            headers = [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]
+            status, replayed = 422, False
+
+        accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept"), "")
+        headers, content = _encode_for(negotiated_media_type(accept), headers, content)
+        if replayed:
+            headers = headers + [(b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content, "more_body": False})
+
+
+def _encode_for(media_type: str, headers: List[Tuple[bytes, bytes]], content: bytes) -> Tuple[List[Tuple[bytes, bytes]], bytes]:
+    """Re-encodes a stored JSON or MessagePack response as `media_type`; other responses are returned as is."""
+    content_type = next((value for name, value in headers if name == b"content-type"), b"")
+    stored_type = content_type.split(b";")[0].strip().decode("latin-1")
+    if stored_type not in (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE) or stored_type == media_type:
+        return headers, content
+    content = transcode(content, stored_type, media_type)
+    headers = [(name, value) for name, value in headers if name not in (b"content-type", b"content-length")]
+    return headers + [(b"content-type", media_type.encode()), (b"content-length", str(len(content)).encode())], content
+
+
+def install_idempotency(app) -> IdempotencyStore:
+    """
+    Honors Idempotency-Key headers on the app's mutating endpoints (see IdempotencyMiddleware).
+    The store is also available as `app.state.idempotency`, for in-process dispatch.
+    """
+    store = IdempotencyStore()
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    app.state.idempotency = store
+    return store
@@ -1,21 +1,14 @@
 
-import asyncio
 import logging
 from typing import Dict, Any
 
+from tools.http_client import call_service
+
 logger = logging.getLogger(__name__)
 
 async def generate_image(prompt: str) -> Dict[str, Any]:
     """
-    Placeholder for a tool that generates an image.
-    
-    In a real implementation, this would call the agicore-mediamaker service.
+    Generates an image by calling the agicore-mediamaker service.
     """
-    logger.info(f"Generating image for prompt: {prompt}")
-    # Simulate an async operation
-    await asyncio.sleep(5)
-    return {
-        "prompt": prompt,
-        "image_url": f"https://example.com/generated_images/{hash(prompt)}.png",
-        "status": "completed",
-    }
+    logger.info("Generating image for prompt: %s", prompt)
+    return await call_service("agicore-mediamaker", "/generate-image", json={"prompt": prompt})
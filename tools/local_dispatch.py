@@ -0,0 +1,239 @@
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+from starlette.responses import Response
+from starlette.routing import Match
+
+from tools import serialization, tracing
+from tools.http_client import ServiceCallError, resolve_service_url
+from tools.idempotency import IDEMPOTENCY_HEADER, MUTATING_METHODS, IdempotencyConflict, fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler:
+    """A route whose endpoint can be awaited directly: path parameters and at most one JSON body."""
+
+    __slots__ = ("route", "path_params", "body_name", "body_embedded", "body", "response")
+
+    def __init__(self, route: APIRoute):
+        dependant = route.dependant
+        self.route = route
+        self.path_params = {param.name: TypeAdapter(param.field_info.annotation) for param in dependant.path_params}
+        self.body_name = self.body = None
+        self.body_embedded = False
+        if dependant.body_params:
+            param = dependant.body_params[0]
+            self.body_name = param.name
+            self.body_embedded = bool(getattr(param.field_info, "embed", False))
+            self.body = TypeAdapter(param.field_info.annotation)
+        self.response = TypeAdapter(route.response_model) if route.response_model is not None else None
+
+    @staticmethod
+    def supports(route: APIRoute) -> bool:
+        dependant = route.dependant
+        special = (
+            dependant.request_param_name, dependant.websocket_param_name, dependant.http_connection_param_name,
+            dependant.response_param_name, dependant.background_tasks_param_name, dependant.security_scopes_param_name,
+        )
+        return (
+            asyncio.iscoroutinefunction(route.endpoint)
+            and not dependant.dependencies
+            and not (dependant.query_params or dependant.header_params or dependant.cookie_params)
+            and len(dependant.body_params) <= 1
+            and not any(special)
+        )
+
+
+class LocalService:
+    """
+    Calls an agent's FastAPI app inside this process instead of over HTTP.
+
+    Routes that take only path parameters and a JSON body are dispatched straight to their
+    handler coroutine: the body is validated into the handler's model from the caller's
+    objects, and the result is converted the way the response model would render it, with
+    no JSON encoding, ASGI messages or sockets in between. Anything else (query parameters,
+    dependencies, raw requests, streaming responses) goes through the app over in-process ASGI.
+    Errors surface as ServiceCallError with the status code the HTTP call would have had.
+    Direct calls get what the app's middleware gives a request: a server span in the caller's
+    trace, an entry in the request metrics, and Idempotency-Key handling (errors below 500
+    are remembered and replayed too).
+    """
+
+    def __init__(self, name: str, app: FastAPI, cache_size: int = 4096):
+        self.name = name
+        self.app = app
+        self.cache_size = cache_size
+        self.transport = httpx.ASGITransport(app=app)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._handlers: Dict[int, Optional[_Handler]] = {}  # By id(route); routes are not hashable
+        self._routes: Dict[Tuple[str, str], Tuple[Optional[APIRoute], Dict[str, Any]]] = {}
+        self.direct_calls = 0
+        self.asgi_calls = 0
+
+    def _resolve(self, method: str, path: str) -> Tuple[Optional[APIRoute], Dict[str, Any]]:
+        key = (method, path)
+        cached = self._routes.get(key)
+        if cached is not None:
+            return cached
+        scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+        resolved: Tuple[Optional[APIRoute], Dict[str, Any]] = (None, {})
+        for route in self.app.router.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                resolved = (route if isinstance(route, APIRoute) else None, child_scope.get("path_params", {}))
+                break
+        if len(self._routes) < self.cache_size:
+            self._routes[key] = resolved
+        return resolved
+
+    def _handler(self, route: Optional[APIRoute]) -> Optional[_Handler]:
+        if route is None:
+            return None
+        key = id(route)
+        if key not in self._handlers:
+            self._handlers[key] = _Handler(route) if _Handler.supports(route) else None
+        return self._handlers[key]
+
+    async def call(self, method: str, path: str, json: Optional[Any] = None, idempotency_key: Optional[str] = None) -> Any:
+        route, path_params = self._resolve(method, path)
+        handler = self._handler(route)
+        if handler is None:
+            return await self._call_asgi(method, path, json, idempotency_key)
+        self.direct_calls += 1
+        tracer = getattr(self.app.state, "tracer", None)
+        if tracer is None:
+            return await self._measured(handler, path_params, method, path, json, idempotency_key)
+
+        # The server span TracingMiddleware would open; the caller's client span is its parent.
+        attributes = {"http.method": method, "http.target": path, "dispatch": "in-process"}
+        error = None
+        with tracer.start_span(f"{method} {handler.route.path}", "server", attributes=attributes) as span:
+            try:
+                result = await self._measured(handler, path_params, method, path, json, idempotency_key)
+                span.set_attribute("http.status_code", handler.route.status_code or 200)
+            except ServiceCallError as e:
+                error = e  # Raised outside the span, so client errors do not mark it as failed
+                span.set_attribute("http.status_code", e.status_code)
+                if e.status_code is None or e.status_code >= 500:
+                    span.status = "error"
+        if error is not None:
+            raise error
+        return result
+
+    async def _measured(
+        self, handler: _Handler, path_params: Dict[str, Any], method: str, path: str, json: Optional[Any], idempotency_key: Optional[str],
+    ) -> Any:
+        """Runs the call, replays included, and records it in the app's request metrics."""
+        status_code = handler.route.status_code or 200
+        started = time.perf_counter()
+        try:
+            return await self._idempotent(handler, path_params, method, path, json, idempotency_key)
+        except ServiceCallError as e:
+            status_code = e.status_code or 500
+            raise
+        finally:
+            registry = getattr(self.app.state, "metrics", None)
+            if registry is not None:
+                registry.route(method, handler.route.path).observe(status_code, time.perf_counter() - started)
+
+    async def _idempotent(
+        self, handler: _Handler, path_params: Dict[str, Any], method: str, path: str, json: Optional[Any], idempotency_key: Optional[str],
+    ) -> Any:
+        store = getattr(self.app.state, "idempotency", None)
+        if not idempotency_key or store is None or method not in MUTATING_METHODS:
+            return await self._dispatch(handler, path_params, method, path, json)
+
+        async def execute():
+            try:
+                return await self._dispatch(handler, path_params, method, path, json), None
+            except ServiceCallError as e:
+                if e.status_code is None or e.status_code >= 500:
+                    raise  # Not remembered, so the call can be retried
+                return None, e
+
+        try:
+            (result, error), _ = await store.run(
+                ("direct", method, path, idempotency_key), fingerprint(serialization.dumps(json)), execute,
+            )
+        except IdempotencyConflict as e:
+            raise ServiceCallError(self.name, f"HTTP 422: {e}", 422)
+        if error is not None:
+            raise error.with_traceback(None)
+        return result
+
+    async def _dispatch(self, handler: _Handler, path_params: Dict[str, Any], method: str, path: str, json: Optional[Any]) -> Any:
+        try:
+            kwargs = {name: adapter.validate_python(path_params[name]) for name, adapter in handler.path_params.items()}
+            if handler.body is not None:
+                body = json.get(handler.body_name) if handler.body_embedded and isinstance(json, dict) else json
+                kwargs[handler.body_name] = handler.body.validate_python(body)
+            result = await handler.route.endpoint(**kwargs)
+        except HTTPException as e:
+            raise ServiceCallError(self.name, f"HTTP {e.status_code}: {serialization.dumps({'detail': e.detail}).decode()}", e.status_code)
+        except ValidationError as e:
+            detail = serialization.dumps({"detail": jsonable_encoder(e.errors(include_url=False))}).decode()
+            raise ServiceCallError(self.name, f"HTTP 422: {detail}", 422)
+        except Exception as e:
+            # Over HTTP the callee would have answered 500; the caller sees the same either way.
+            logger.exception("In-process call to %s %s on '%s' failed: %s", method, path, self.name, e)
+            raise ServiceCallError(self.name, "HTTP 500: Internal Server Error", 500)
+        return self._render(handler, result)
+
+    def _render(self, handler: _Handler, result: Any) -> Any:
+        """Converts a handler's return value into what the caller would have decoded from the HTTP response."""
+        if isinstance(result, Response):
+            if result.status_code >= 400:
+                raise ServiceCallError(self.name, f"HTTP {result.status_code}: {bytes(result.body).decode()}", result.status_code)
+            if not hasattr(result, "body"):
+                raise ServiceCallError(self.name, "Streaming responses cannot be returned to an in-process caller.")
+            return serialization.loads(result.body)
+        if handler.response is not None:
+            # As FastAPI does: validate against the response model, then render it as JSON-compatible data.
+            return handler.response.dump_python(handler.response.validate_python(result, from_attributes=True), mode="json", by_alias=True)
+        return jsonable_encoder(result)
+
+    async def _call_asgi(self, method: str, path: str, json: Optional[Any], idempotency_key: Optional[str] = None) -> Any:
+        self.asgi_calls += 1
+        if self._client is None:
+            self._client = httpx.AsyncClient(transport=self.transport, base_url=f"http://{self.name}")
+        headers = tracing.inject_headers({IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else None)
+        response = await self._client.request(method, path, json=json, headers=headers)
+        if response.status_code >= 400:
+            raise ServiceCallError(self.name, f"HTTP {response.status_code}: {response.text}", response.status_code)
+        return response.json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalServiceTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that serves requests for in-process agents over ASGI and sends
+    everything else to `fallback`, so code using the shared HTTP client directly (health
+    probes, job callbacks) reaches co-located agents without a network hop too.
+    """
+
+    def __init__(self, services: Dict[str, LocalService], fallback: httpx.AsyncBaseTransport):
+        self.fallback = fallback
+        self._hosts = {
+            httpx.URL(resolve_service_url(name)).host: service.transport
+            for name, service in services.items()
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self._hosts.get(request.url.host, self.fallback)
+        return await transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.fallback.aclose()
@@ -1,22 +1,35 @@
 
-import asyncio
 import logging
 from typing import Dict, Any
 
+from decouple import config
+
+from tools.cache import async_cached
+from tools.http_client import call_service
+
 logger = logging.getLogger(__name__)
 
+def normalize_topic(topic: str) -> str:
+    """
+    Collapses leading, trailing and repeated whitespace. Used both as the cache key and as the
+    topic sent upstream, so every caller that shares a cache entry asked for the same analysis.
+    """
+    return " ".join(topic.split())
+
+# Concurrent requests for the same hot topic share one upstream call, and results are reused for the TTL.
+@async_cached(
+    ttl=config("MARKET_ANALYSIS_CACHE_TTL", default=60.0, cast=float),
+    maxsize=config("MARKET_ANALYSIS_CACHE_SIZE", default=1024, cast=int),
+    key=normalize_topic,
+)
 async def get_market_analysis(topic: str) -> Dict[str, Any]:
     """
-    Placeholder for a tool that performs market analysis.
-    
-    In a real implementation, this would call the agicore-analytics service
-    or another third-party API.
+    Performs market analysis for a topic by calling the agicore-analytics service.
     """
-    logger.info(f"Getting market analysis for topic: {topic}")
-    # Simulate an async operation
-    await asyncio.sleep(2)
-    return {
-        "topic": topic,
-        "sentiment": "bullish",
-        "forecast": "10% increase over the next quarter",
-    }
+    topic = normalize_topic(topic)
+    logger.info("Getting market analysis for topic: %s", topic)
+    return await call_service(
+        "agicore-analytics",
+        "/analyze-news",
+        json={"data_source": "market_data", "topic": topic, "analysis_type": "trend_forecast"},
+    )
@@ -0,0 +1,153 @@
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+# Upper bounds (seconds) of the request latency histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteMetrics:
+    """Counters for one (method, route) pair. Plain ints: they are only touched from the event loop."""
+
+    __slots__ = ("in_flight", "responses", "buckets", "count", "total_seconds")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.responses: Dict[int, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def observe(self, status_code: int, seconds: float):
+        self.responses[status_code] = self.responses.get(status_code, 0) + 1
+        # Non-cumulative per bucket; made cumulative only when rendered.
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+
+
+class MetricsRegistry:
+    def __init__(self, service: str):
+        self.service = service
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        # Extra metrics rendered after the request metrics: each is called with the escaped service name.
+        self.collectors: List[Callable[[str], List[str]]] = []
+
+    def route(self, method: str, template: str) -> RouteMetrics:
+        metrics = self.routes.get((method, template))
+        if metrics is None:
+            metrics = self.routes[(method, template)] = RouteMetrics()
+        return metrics
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        service = _escape(self.service)
+        requests: List[str] = [
+            "# HELP agicore_http_requests_total Requests handled, by route and status code.",
+            "# TYPE agicore_http_requests_total counter",
+        ]
+        in_flight = [
+            "# HELP agicore_http_requests_in_flight Requests currently being handled, by route.",
+            "# TYPE agicore_http_requests_in_flight gauge",
+        ]
+        latency = [
+            "# HELP agicore_http_request_duration_seconds Time to handle a request, including streaming the body.",
+            "# TYPE agicore_http_request_duration_seconds histogram",
+        ]
+        for (method, template), metrics in sorted(self.routes.items()):
+            labels = f'service="{service}",method="{method}",route="{_escape(template)}"'
+            for status_code, count in sorted(metrics.responses.items()):
+                requests.append(f'agicore_http_requests_total{{{labels},status="{status_code}"}} {count}')
+            in_flight.append(f"agicore_http_requests_in_flight{{{labels}}} {metrics.in_flight}")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.buckets):
+                cumulative += count
+                latency.append(f'agicore_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            latency.append(f"agicore_http_request_duration_seconds_sum{{{labels}}} {metrics.total_seconds:.6f}")
+            latency.append(f"agicore_http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+        extra = [line for collect in self.collectors for line in collect(service)]
+        return "\n".join(requests + in_flight + latency + extra) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records request count, in-flight requests and latency per route.
+
+    Requests are labelled by the route's path template (e.g. /plans/{plan_id}), never the
+    raw path, so the number of series stays bounded. Latency runs until the last body chunk
+    has been sent, which makes streaming endpoints report their full duration.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry, routes_of: FastAPI, cache_size: int = 4096):
+        self.app = app
+        self.registry = registry
+        self.routes_of = routes_of
+        self.cache_size = cache_size
+        self._templates: Dict[Tuple[str, str], str] = {}
+
+    def _template(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._templates.get(key)
+        if template is not None:
+            return template
+        template = UNMATCHED_ROUTE
+        partial = None
+        for route in self.routes_of.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path  # Path matches but the method does not (405)
+        template = template if template != UNMATCHED_ROUTE or partial is None else partial
+        if len(self._templates) < self.cache_size:
+            self._templates[key] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = self.registry.route(scope["method"], self._template(scope))
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe(status_code, time.perf_counter() - started)
+
+
+def install_metrics(app: FastAPI, service: str, path: str = "/metrics") -> MetricsRegistry:
+    """
+    Instruments an app: adds MetricsMiddleware as the outermost middleware and serves the
+    collected metrics at `path` in the Prometheus text format. Returns the registry.
+    """
+    registry = MetricsRegistry(service)
+    app.add_middleware(MetricsMiddleware, registry=registry, routes_of=app)
+
+    @app.get(path, include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.state.metrics = registry
+    return registry
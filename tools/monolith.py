@@ -0,0 +1,120 @@
+"""
+Single-process ("monolith") mode: every agent's FastAPI app mounted in one ASGI app.
+
+Each agent is served under /<service name>/ (e.g. /agicore-trader/execute-trade). Calls
+between agents made through tools.http_client are dispatched in-process to the target
+handler (see tools.local_dispatch) instead of going over the network, so the same plan
+code runs unchanged whether the agents are separate containers or share one process.
+
+Run it from the repository root, with every service's requirements installed:
+    uvicorn tools.monolith:create_app --factory --port 8080
+"""
+
+import importlib.util
+import sys
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from decouple import Csv, config
+from fastapi import FastAPI
+
+from tools.http_client import register_local_service
+from tools.startup import FAST_START, start_warm_up
+from tools.utils import configure_logging
+
+SERVICES_DIR = Path(__file__).resolve().parents[1] / "services"
+# Agent name (as used in plans and by call_service) -> its directory under services/.
+SERVICES = {
+    "agicore-mcp": "agicore_mcp",
+    "agicore-trader": "agicore-trader",
+    "agicore-analytics": "agicore-analytics",
+    "agicore-mediamaker": "agicore-mediamaker",
+    "agicore-storage": "agicore-storage",
+    "operator": "operator",
+}
+
+# Agents to mount (default: all of them), and whether calls between them skip HTTP.
+MONOLITH_SERVICES = config("MONOLITH_SERVICES", default=",".join(SERVICES), cast=Csv())
+MONOLITH_IN_PROCESS_DISPATCH = config("MONOLITH_IN_PROCESS_DISPATCH", default=True, cast=bool)
+
+
+def load_service_module(service_dir: str, module: str = "main"):
+    """
+    Imports a module from a service directory that is not a valid package name (e.g. agicore-trader).
+    The service directory is added to sys.path so the module's own sibling imports resolve,
+    and the module is registered under a unique name so several services' `main` can coexist.
+    """
+    path = SERVICES_DIR / service_dir
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+    name = f"{service_dir.replace('-', '_')}_{module}"
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, path / f"{module}.py")
+        sys.modules[name] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(sys.modules[name])
+    return sys.modules[name]
+
+
+def build_monolith(services: Optional[Iterable[str]] = None, dispatch: Optional[bool] = None) -> FastAPI:
+    """
+    Loads the given agents (default: MONOLITH_SERVICES) and mounts them in one app whose
+    lifespan runs each agent's own. With `dispatch` (default: MONOLITH_IN_PROCESS_DISPATCH),
+    calls to the mounted agents are served in-process for as long as the app is running.
+    """
+    from tools.local_dispatch import LocalService
+
+    # Before the agents configure it, so the process logs as one service.
+    configure_logging("agicore-monolith")
+    names = list(services if services is not None else MONOLITH_SERVICES)
+    unknown = [name for name in names if name not in SERVICES]
+    if unknown:
+        raise ValueError(f"Unknown services: {', '.join(unknown)}. Known: {', '.join(SERVICES)}")
+    agents: Dict[str, FastAPI] = {name: load_service_module(SERVICES[name]).app for name in names}
+    dispatch = MONOLITH_IN_PROCESS_DISPATCH if dispatch is None else dispatch
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        local = {name: LocalService(name, agent) for name, agent in agents.items()} if dispatch else {}
+        for name, service in local.items():
+            await register_local_service(name, service)
+        try:
+            async with AsyncExitStack() as stack:
+                # Mounted apps do not get lifespan events of their own.
+                for agent in agents.values():
+                    await stack.enter_async_context(agent.router.lifespan_context(agent))
+                if FAST_START:
+                    start_warm_up()
+                yield
+        finally:
+            for name, service in local.items():
+                await register_local_service(name, None)
+                await service.aclose()
+
+    app = FastAPI(
+        title="AGIcore - Monolith",
+        description="Every AGIcore agent in one process, calling each other in-process.",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "services": names}
+
+    @app.get("/")
+    async def root():
+        return {
+            "message": "AGIcore monolith is running.",
+            "dispatch": "in-process" if dispatch else "http",
+            "services": {name: f"/{name}" for name in names},
+        }
+
+    for name, agent in agents.items():
+        app.mount(f"/{name}", agent)
+    return app
+
+
+def create_app() -> FastAPI:
+    """App factory for uvicorn's --factory flag."""
+    return build_monolith()
@@ -1,21 +1,29 @@
 
-import asyncio
 import logging
 from typing import Dict, Any
 
+from decouple import config
+
+from tools.cache import async_cached
+from tools.http_client import call_service
+from tools.market_analysis import normalize_topic
+
 logger = logging.getLogger(__name__)
 
+# Concurrent requests for the same hot topic share one upstream call, and results are reused for the TTL.
+@async_cached(
+    ttl=config("NEWS_ANALYSIS_CACHE_TTL", default=60.0, cast=float),
+    maxsize=config("NEWS_ANALYSIS_CACHE_SIZE", default=1024, cast=int),
+    key=normalize_topic,
+)
 async def analyze_news(topic: str) -> Dict[str, Any]:
     """
-    Placeholder for a tool that analyzes news sentiment and trends.
-    
-    In a real implementation, this would call the agicore-analytics service.
+    Analyzes news sentiment for a topic by calling the agicore-analytics service.
     """
-    logger.info(f"Analyzing news for topic: {topic}")
-    # Simulate an async operation
-    await asyncio.sleep(3)
-    return {
-        "topic": topic,
-        "sentiment": "neutral",
-        "summary": "Recent news shows mixed opinions on the topic.",
-    }
+    topic = normalize_topic(topic)
+    logger.info("Analyzing news for topic: %s", topic)
+    return await call_service(
+        "agicore-analytics",
+        "/analyze-news",
+        json={"data_source": "news_feed", "topic": topic, "analysis_type": "sentiment"},
+    )
@@ -1,39 +1,27 @@
 
-import asyncio
 import logging
 from typing import Dict, Any
 
+from tools.http_client import call_service
+
 logger = logging.getLogger(__name__)
 
 async def run_health_check(service_name: str) -> Dict[str, Any]:
     """
-    Placeholder for a tool that checks the health of a service.
-    
-    In a real implementation, this would call the operator service's
+    Checks the health of a service through the operator's
     /run-health-check/{service_name} endpoint.
     """
-    logger.info(f"Running health check on service: {service_name}")
-    await asyncio.sleep(1)
-    
-    # Simulate a healthy response
-    return {
-        "service_name": service_name,
-        "status": "healthy",
-        "details": "Service is responding correctly to pings.",
-    }
+    logger.info("Running health check on service: %s", service_name)
+    return await call_service("operator", f"/run-health-check/{service_name}")
 
 async def attempt_service_restart(service_name: str) -> Dict[str, Any]:
     """
-    Placeholder for a tool that attempts to restart a service.
-    
-    In a real implementation, this would call the operator service to
-    trigger a remediation action.
+    Asks the operator service to remediate (restart) a service by
+    reporting it as unhealthy.
     """
-    logger.warning(f"Attempting to restart service: {service_name}")
-    await asyncio.sleep(5)
-    
-    return {
-        "service_name": service_name,
-        "action_taken": "restart",
-        "status": "completed",
-    }
+    logger.warning("Attempting to restart service: %s", service_name)
+    return await call_service(
+        "operator",
+        "/diagnose-and-remediate",
+        json={"service_name": service_name, "status": "unhealthy", "details": "Restart requested by agent."},
+    )
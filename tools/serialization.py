@@ -0,0 +1,205 @@
+
+import contextvars
+import gzip
+import json
+import re
+import zlib
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+_ORJSON_OPTIONS = 0 if orjson is None else orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# --- JSON ---
+
+# orjson only handles 64-bit integers: it refuses to encode wider ones and decodes them as floats.
+# Such documents go through the stdlib json module instead, which keeps them exact.
+_WIDE_INTEGER = re.compile(rb"\d{20}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes content as compact UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass  # E.g. an integer wider than 64 bits
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None and not _WIDE_INTEGER.search(data):
+        return orjson.loads(data)
+    return json.loads(data)
+
+# --- MessagePack ---
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    """Decodes MessagePack. Malformed input raises ValueError."""
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Malformed MessagePack data: {e}") from e
+
+# --- Content negotiation ---
+
+# The media type the current response should be encoded with, set per request by SerializationMiddleware.
+_response_media_type: contextvars.ContextVar[str] = contextvars.ContextVar("response_media_type", default=JSON_MEDIA_TYPE)
+
+
+def _accepts_msgpack(accept: str) -> bool:
+    return msgpack is not None and any(
+        part.split(";")[0].strip() == MSGPACK_MEDIA_TYPE for part in accept.split(",")
+    )
+
+
+def negotiated_media_type(accept: str) -> str:
+    """The media type a response is encoded with for the given Accept header."""
+    return MSGPACK_MEDIA_TYPE if _accepts_msgpack(accept) else JSON_MEDIA_TYPE
+
+
+def transcode(data: bytes, source: str, target: str) -> bytes:
+    """Re-encodes a JSON or MessagePack document from the `source` media type to `target`."""
+    if source == target:
+        return data
+    content = unpackb(data) if source == MSGPACK_MEDIA_TYPE else loads(data)
+    return packb(content) if target == MSGPACK_MEDIA_TYPE else dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    The default response class of every service: JSON rendered with orjson, or MessagePack
+    when the client negotiated it through `Accept: application/x-msgpack`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if _response_media_type.get() == MSGPACK_MEDIA_TYPE:
+            # Set before Starlette builds the headers from it.
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return packb(content)
+        return dumps(content)
+
+
+class SerializationMiddleware:
+    """
+    ASGI middleware that negotiates MessagePack for a request.
+
+    A MessagePack request body (`Content-Type: application/x-msgpack`) is decoded and handed
+    to the app as JSON, so endpoints and their Pydantic models do not need to know about it;
+    `Accept: application/x-msgpack` makes FastJSONResponse encode the response as MessagePack.
+    Requests that ask for neither pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or msgpack is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        token = _response_media_type.set(negotiated_media_type(headers.get(b"accept", b"").decode("latin-1")))
+
+        try:
+            content_type = headers.get(b"content-type", b"").split(b";")[0].strip().decode("latin-1")
+            if content_type == MSGPACK_MEDIA_TYPE:
+                transcoded = await self._transcode_request(scope, receive)
+                if transcoded is None:
+                    response = FastJSONResponse({"detail": "Malformed MessagePack body."}, status_code=400)
+                    return await response(scope, receive, send)
+                scope, receive = transcoded
+            await self.app(scope, receive, send)
+        finally:
+            _response_media_type.reset(token)
+
+    async def _transcode_request(self, scope, receive):
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        try:
+            body = dumps(unpackb(b"".join(chunks)))
+        except Exception:
+            return None
+
+        headers = [
+            (name, value) for name, value in scope["headers"] if name not in (b"content-type", b"content-length")
+        ]
+        headers += [(b"content-type", JSON_MEDIA_TYPE.encode()), (b"content-length", str(len(body)).encode())]
+
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return {**scope, "headers": headers}, replay
+
+# --- Compression ---
+
+# Frame magic numbers, used to recognise compressed objects when reading them back.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_GZIP_MAGIC = b"\x1f\x8b"
+CODECS = ("none", "gzip", "zstd")
+
+
+def compress(data: bytes, codec: str, level: Optional[int] = None) -> bytes:
+    """Compresses data with the given codec. zstd falls back to gzip when zstandard is not installed."""
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    if codec in ("gzip", "zstd"):
+        return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+    if codec == "none":
+        return data
+    raise ValueError(f"Unknown compression codec '{codec}'. Expected one of {', '.join(CODECS)}.")
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Undoes `compress`, detecting the codec from the frame header; uncompressed data is returned as is.
+    A corrupt or truncated frame raises ValueError.
+    """
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Object is zstd-compressed but the zstandard package is not installed.")
+        try:
+            return zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt zstd data: {e}") from e
+    if data.startswith(_GZIP_MAGIC):
+        try:
+            return gzip.decompress(data)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"Corrupt gzip data: {e}") from e
+    return data
@@ -0,0 +1,105 @@
+
+import importlib
+import logging
+import threading
+import types
+from typing import Dict, List
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+# In fast-start mode heavy dependencies are imported on first use instead of at startup, and
+# warmed up in the background once the app is serving, so a cold instance answers sooner.
+FAST_START = config("AGICORE_FAST_START", default=False, cast=bool)
+
+
+class DeferredModule(types.ModuleType):
+    """
+    Stands in for a module until one of its attributes is first used, then imports it.
+    Once loaded, the module's namespace is copied onto the stand-in so later attribute
+    lookups are ordinary dict hits rather than a call to __getattr__.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._module = None
+
+    def load(self) -> types.ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__.update(module.__dict__)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, name: str):
+        # Only reached for names the stand-in does not have yet (or lazily provided submodules).
+        return getattr(self.load(), name)
+
+
+_deferred: Dict[str, DeferredModule] = {}
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Imports a module now, or in fast-start mode returns a stand-in that imports it on first use.
+    Only use it for modules whose attributes are not needed while the importing module loads
+    (with `from __future__ import annotations`, annotations do not count).
+    """
+    if not FAST_START:
+        return importlib.import_module(name)
+    module = _deferred.get(name)
+    if module is None:
+        module = _deferred[name] = DeferredModule(name)
+    return module
+
+
+def warm_up() -> List[str]:
+    """Imports every deferred module that has not been used yet. Returns their names."""
+    loaded = []
+    for name, module in list(_deferred.items()):
+        if module._module is None:
+            try:
+                module.load()
+                loaded.append(name)
+            except Exception as e:
+                logger.error("Warming up deferred module '%s' failed: %s", name, e)
+    return loaded
+
+
+def start_warm_up() -> threading.Thread:
+    """Runs warm_up() in a background daemon thread and returns the thread."""
+    thread = threading.Thread(target=warm_up, name="fast-start-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+class FastStartMiddleware:
+    """
+    ASGI middleware that starts warming up deferred modules in a background thread as soon
+    as the app reports that it has started, i.e. once the server is accepting requests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._warming: threading.Thread = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "lifespan.startup.complete" and self._warming is None and _deferred:
+                self._warming = start_warm_up()
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def install_fast_start(app):
+    """Warms up deferred imports once `app` has started. Does nothing unless fast-start mode is on."""
+    if FAST_START:
+        app.add_middleware(FastStartMiddleware)
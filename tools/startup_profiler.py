@@ -0,0 +1,203 @@
+"""
+Cold-start profiler for the agents.
+
+Starts each service in a fresh interpreter, the way a new Cloud Run instance would, and
+reports where the time to first response goes: interpreter start, imports (with each
+package's own import and module-level init time, from `python -X importtime`), app
+startup (the ASGI lifespan) and the first request. Every figure is the median of `--runs`
+cold starts. Services whose total exceeds their budget fail the run.
+
+Run from the repository root:
+    python -m tools.startup_profiler                              # every service
+    python -m tools.startup_profiler agicore-trader --fast-start  # one service, in fast-start mode
+    python -m tools.startup_profiler --budget agicore-trader=900 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from decouple import config
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SERVICES_DIR = REPO_ROOT / "services"
+SERVICES = ("agicore-analytics", "agicore-mediamaker", "agicore-storage", "agicore-trader", "agicore_mcp", "operator")
+
+# Default cold-start budget per service, in milliseconds, and per-service overrides ("name=ms,...").
+STARTUP_BUDGET_MS = config("STARTUP_BUDGET_MS", default=1500.0, cast=float)
+STARTUP_BUDGETS = config("STARTUP_BUDGETS", default="")
+
+# Runs inside the child interpreter: import the module, run the app's lifespan startup over
+# ASGI, send one GET / and report the timings as the last line of stdout.
+_PROBE = r"""
+import asyncio, json, sys, time
+started = time.time()
+t0 = time.perf_counter()
+__import__(sys.argv[1])  # Unlike importlib.import_module, reported by -X importtime
+module = sys.modules[sys.argv[1]]
+t1 = time.perf_counter()
+timings = {"started_at": started, "import_ms": (t1 - t0) * 1000, "startup_ms": 0.0, "first_request_ms": 0.0, "status": None}
+
+async def boot(app):
+    inbox = asyncio.Queue()
+    outbox = asyncio.Queue()
+    lifespan = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, inbox.get, outbox.put))
+    t2 = time.perf_counter()
+    await inbox.put({"type": "lifespan.startup"})
+    message = await outbox.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(message.get("message") or message["type"])
+    t3 = time.perf_counter()
+    timings["startup_ms"] = (t3 - t2) * 1000
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"", "headers": [(b"host", b"startup")],
+        "client": ("127.0.0.1", 1), "server": ("startup", 80), "state": {},
+    }
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            timings["status"] = message["status"]
+    await app(scope, receive, send)
+    timings["first_request_ms"] = (time.perf_counter() - t3) * 1000
+
+    await inbox.put({"type": "lifespan.shutdown"})
+    await outbox.get()
+    await lifespan
+
+app = getattr(module, "app", None)
+if app is not None:
+    asyncio.run(boot(app))
+elif callable(getattr(module, "main", None)):
+    t2 = time.perf_counter()
+    module.main()
+    timings["startup_ms"] = (time.perf_counter() - t2) * 1000
+print("\n" + json.dumps(timings))
+"""
+
+
+def parse_budgets(value: str) -> Dict[str, float]:
+    """Parses "service=ms,service=ms" into a mapping."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, milliseconds = item.partition("=")
+        budgets[name.strip()] = float(milliseconds)
+    return budgets
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parses `python -X importtime` output into one entry per module, in import order."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def group_by_package(modules: List[Dict[str, Any]], service_dir: Path) -> Dict[str, float]:
+    """
+    Sums each top-level package's self time: importing its modules and running their
+    module-level code. The service's own modules are listed individually.
+    """
+    groups: Dict[str, float] = {}
+    for entry in modules:
+        top = entry["module"].split(".")[0]
+        if (service_dir / f"{top}.py").exists() or (service_dir / top).is_dir():
+            top = entry["module"]
+        groups[top] = groups.get(top, 0.0) + entry["self_ms"]
+    return dict(sorted(groups.items(), key=lambda item: -item[1]))
+
+
+def cold_start(target: str, fast_start: bool) -> Dict[str, Any]:
+    """Starts one service in a fresh interpreter and returns its startup timings."""
+    service, _, module = target.partition(":")
+    service_dir = SERVICES_DIR / service
+    with tempfile.TemporaryDirectory(prefix="agicore-startup-") as scratch:
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join([str(service_dir), str(REPO_ROOT), os.environ.get("PYTHONPATH", "")]),
+            "AGICORE_FAST_START": "true" if fast_start else "false",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+            # Keep each start's state out of the working tree.
+            "MCP_PLAN_DB_PATH": ":memory:",
+            "STORAGE_ROOT": os.path.join(scratch, "storage"),
+            "TRACING_EXPORT_PATH": os.path.join(scratch, "traces.jsonl"),
+        }
+        spawned = time.time()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE, module or "main"],
+            cwd=service_dir, env=env, capture_output=True, text=True, timeout=120,
+        )
+    if process.returncode != 0:
+        raise RuntimeError(f"{target} failed to start:\n{process.stderr[-2000:]}")
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    timings["interpreter_ms"] = max(0.0, (timings.pop("started_at") - spawned) * 1000)
+    timings["total_ms"] = timings["interpreter_ms"] + timings["import_ms"] + timings["startup_ms"] + timings["first_request_ms"]
+    timings["packages_ms"] = group_by_package(parse_importtime(process.stderr), service_dir)
+    return timings
+
+
+def profile(target: str, runs: int = 3, fast_start: bool = False) -> Dict[str, Any]:
+    """Cold-starts a service `runs` times and returns the run with the median total time."""
+    samples = sorted((cold_start(target, fast_start) for _ in range(runs)), key=lambda sample: sample["total_ms"])
+    median = samples[len(samples) // 2]
+    return {**median, "runs": runs, "fast_start": fast_start, "total_ms_min": samples[0]["total_ms"], "total_ms_max": samples[-1]["total_ms"]}
+
+
+def report(target: str, result: Dict[str, Any], budget: float, top: int):
+    verdict = "ok" if result["total_ms"] <= budget else "OVER BUDGET"
+    print(
+        f"{target:<22}{result['interpreter_ms']:>9.0f}{result['import_ms']:>9.0f}{result['startup_ms']:>9.0f}"
+        f"{result['first_request_ms']:>9.0f}{result['total_ms']:>9.0f}{budget:>9.0f}  {verdict}"
+    )
+    packages = list(result["packages_ms"].items())[:top]
+    print(" " * 4 + ", ".join(f"{name} {milliseconds:.0f}" for name, milliseconds in packages))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start profiler for the agents.")
+    parser.add_argument("targets", nargs="*", default=list(SERVICES), help="Service directories, optionally SERVICE:MODULE (default: every service).")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per service; the median is reported.")
+    parser.add_argument("--fast-start", action="store_true", help="Start the services with AGICORE_FAST_START=true.")
+    parser.add_argument("--top", type=int, default=8, help="Packages to list per service, by import and init time.")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Default cold-start budget per service.")
+    parser.add_argument("--budget", action="append", default=[], help="Per-service budget as SERVICE=MS (repeatable).")
+    parser.add_argument("--json", metavar="PATH", help="Also write the full results to PATH.")
+    args = parser.parse_args(argv)
+
+    budgets = {**parse_budgets(STARTUP_BUDGETS), **parse_budgets(",".join(args.budget))}
+    print(f"{'service (ms)':<22}{'python':>9}{'imports':>9}{'startup':>9}{'1st req':>9}{'total':>9}{'budget':>9}")
+    results, over = {}, []
+    for target in args.targets:
+        result = results[target] = profile(target, args.runs, args.fast_start)
+        budget = result["budget_ms"] = budgets.get(target.partition(":")[0], args.budget_ms)
+        report(target, result, budget, args.top)
+        if result["total_ms"] > budget:
+            over.append(target)
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+    if over:
+        print(f"\nOver budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
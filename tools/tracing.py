@@ -0,0 +1,329 @@
+
+import asyncio
+import atexit
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional
+
+from decouple import config
+
+from tools import serialization
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context header: 00-<32 hex trace id>-<16 hex parent span id>-<flags, 01 = sampled>
+TRACEPARENT = "traceparent"
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return SpanContext(parts[1], parts[2], bool(flags & 1))
+
+
+class Span:
+    """
+    One timed operation within a trace. Unsampled spans keep their ids so the sampling
+    decision propagates downstream, but they are never timed or exported.
+    """
+
+    __slots__ = (
+        "tracer", "name", "kind", "context", "parent_id", "attributes",
+        "start_time", "_started", "duration_ms", "status", "error",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, context: SpanContext, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def sampled(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.context.trace_id}-{self.context.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self):
+        if self.duration_ms is not None or not self.sampled:
+            return
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        self.tracer.exporter.export(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": self.tracer.service,
+            "start_time": self.start_time,
+            "duration_ms": None if self.duration_ms is None else round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class JsonLinesFileExporter:
+    """Appends finished spans to a local file, one JSON object per line, for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, spans: List[Dict[str, Any]]):
+        data = b"".join(serialization.dumps(span) + b"\n" for span in spans)
+        with open(self.path, "ab") as handle:
+            handle.write(data)
+
+
+class BatchSpanExporter:
+    """
+    Buffers finished spans in memory and hands them to `sink` in batches, off the request path.
+
+    `export` only appends to a bounded deque and never blocks; when the buffer is full the span
+    is dropped and counted. A background task on the running event loop flushes every
+    `flush_interval` seconds, or sooner once `batch_size` spans are waiting, and writes in a
+    worker thread. Anything left is flushed at interpreter exit.
+    """
+
+    def __init__(self, sink: Callable[[List[Dict[str, Any]]], Any], max_queue: int = 4096, batch_size: int = 512, flush_interval: float = 1.0):
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()  # Serialises sink writes between the flush task and atexit
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.exported = 0
+        self.dropped = 0
+        atexit.register(self.flush)
+
+    def export(self, span: Dict[str, Any]):
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        self._ensure_flusher()
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (e.g. a script); spans wait for flush() or interpreter exit.
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        # The task is stopped by clearing self._task as well as by cancelling it: before
+        # Python 3.12, wait_for can swallow a cancel that lands as its timeout fires.
+        while self._task is asyncio.current_task():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._queue:
+                await asyncio.to_thread(self.flush)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def flush(self):
+        """Writes every buffered span to the sink, in batches. Blocking."""
+        with self._lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    return
+                try:
+                    self.sink(batch)
+                    self.exported += len(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    logger.error("Dropped %s spans: %s", len(batch), e)
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+class Tracer:
+    """Creates spans for one service. New traces are sampled with probability `sample_ratio`."""
+
+    def __init__(self, service: str, exporter: BatchSpanExporter, sample_ratio: float = 1.0):
+        self.service = service
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+
+    def create_span(self, name: str, kind: str = "internal", parent: Optional[SpanContext] = None, attributes: Optional[Dict[str, Any]] = None) -> Span:
+        if parent is None:
+            parent_span = _current_span.get()
+            parent = parent_span.context if parent_span is not None else None
+        if parent is None:
+            # A new trace: the sampling decision is made once here and inherited by every descendant.
+            context = SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}", random.random() < self.sample_ratio)
+            return Span(self, name, kind, context, None, attributes or {})
+        context = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+        return Span(self, name, kind, context, parent.span_id, attributes or {})
+
+    @contextmanager
+    def start_span(self, name: str, kind: str = "internal", parent: Optional[SpanContext] = None, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+        """Runs the block inside a new span, which is the current span for its duration (including awaits)."""
+        span = self.create_span(name, kind, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+
+_SAMPLE_RATIO = config("TRACING_SAMPLE_RATIO", default=0.1, cast=float)
+_exporter: Optional[BatchSpanExporter] = None
+_tracers: Dict[str, Tracer] = {}
+
+
+def get_exporter() -> BatchSpanExporter:
+    """The process-wide exporter, writing to TRACING_EXPORT_PATH."""
+    global _exporter
+    if _exporter is None:
+        sink = JsonLinesFileExporter(config("TRACING_EXPORT_PATH", default="./data/traces.jsonl"))
+        _exporter = BatchSpanExporter(
+            sink.write,
+            max_queue=config("TRACING_MAX_QUEUE", default=4096, cast=int),
+            batch_size=config("TRACING_BATCH_SIZE", default=512, cast=int),
+            flush_interval=config("TRACING_FLUSH_INTERVAL", default=1.0, cast=float),
+        )
+    return _exporter
+
+
+def get_tracer(service: str) -> Tracer:
+    tracer = _tracers.get(service)
+    if tracer is None:
+        tracer = _tracers[service] = Tracer(service, get_exporter(), _SAMPLE_RATIO)
+    return tracer
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """
+    Starts a child of the current span, attributed to the same service. Does nothing
+    outside of a trace, so library code (e.g. the HTTP client) can call it unconditionally.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with parent.tracer.start_span(name, kind, attributes=attributes) as span:
+        yield span
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Adds the current span's traceparent header for an outgoing call."""
+    headers = {} if headers is None else headers
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT] = span.traceparent()
+    return headers
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that wraps every HTTP request in a server span, continuing the caller's
+    trace when the request carries a traceparent header. The span is the current span for
+    the handler, so spans it opens (and calls it makes) join the same trace.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        with self.tracer.start_span(f"{scope['method']} {scope['path']}", "server", parent=parent) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                await send(message)
+
+            span.set_attribute("http.method", scope["method"])
+            span.set_attribute("http.target", scope["path"])
+            await self.app(scope, receive, send_wrapper)
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                span.name = f"{scope['method']} {route.path}"
+
+
+def install_tracing(app, service: str) -> Tracer:
+    """Wraps every request to `app` in a server span and returns the service's tracer."""
+    tracer = get_tracer(service)
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    app.state.tracer = tracer
+    return tracer
@@ -1,25 +1,161 @@
-
+import atexit
 import logging
+import queue
+import random
 import sys
+import threading
+import time
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
 from pydantic import BaseModel
 from typing import Optional
 
+from decouple import config
+
+from tools import serialization
+from tools.tracing import current_span
+
 # --- Standardized Logging ---
-def get_logger(name: str):
+# Log calls render the message and enqueue the record; a background thread encodes it as
+# one JSON object per line and writes it to stdout. Use %-style arguments
+# (logger.info("x=%s", x)) rather than f-strings, so disabled levels skip formatting entirely.
+
+LOG_LEVEL = config("LOG_LEVEL", default="INFO").upper()
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_listener: Optional[QueueListener] = None
+_service: Optional[str] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single JSON line, including any `extra=` fields and the trace it belongs to."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": getattr(record, "service", None) or _service,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and key != "service":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        try:
+            return serialization.dumps(entry).decode("utf-8")
+        except TypeError:
+            # An `extra=` value that is not JSON-serializable; fall back to its string form.
+            return serialization.dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+                                        for key, value in entry.items()}).decode("utf-8")
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread, which encodes them as JSON. The message is rendered
+    before the record is queued, as QueueHandler does, so it shows the arguments as they
+    were at the call and a bad format string fails at the call site. If the queue is full
+    the record is dropped (and counted) rather than blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        span = current_span()
+        if span is not None and span.sampled:
+            record.trace_id = span.context.trace_id
+            record.span_id = span.context.span_id
+            record.service = span.tracer.service
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `per_second` records through (bursts up to `burst`), then keeps only a
+    `sample_rate` share of the rest. The next record that passes reports how many were
+    suppressed in between. Warnings and errors are never suppressed.
+    """
+
+    def __init__(self, per_second: Optional[float] = None, burst: Optional[float] = None, sample_rate: float = 0.0):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst or per_second or 1.0
+        self.sample_rate = sample_rate
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            if self.per_second is not None:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.per_second)
+                self.updated_at = now
+                allowed = self.tokens >= 1
+                if allowed:
+                    self.tokens -= 1
+            else:
+                allowed = False
+            if not allowed and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+                self.suppressed += 1
+                return False
+            if self.suppressed:
+                record.suppressed = self.suppressed
+                self.suppressed = 0
+        return True
+
+
+def configure_logging(service: str, level: str = LOG_LEVEL, stream=None) -> NonBlockingQueueHandler:
+    """
+    Routes all logging in the process through a bounded queue to a background writer thread
+    that emits JSON lines. Safe to call more than once; only the first call takes effect.
+    """
+    global _listener, _service
+    root = logging.getLogger()
+    if _listener is not None:
+        return next(handler for handler in root.handlers if isinstance(handler, NonBlockingQueueHandler))
+
+    _service = service
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    handler = NonBlockingQueueHandler(log_queue)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def get_logger(name: str, per_second: Optional[float] = None, sample_rate: float = 0.0):
     """
-    Returns a configured logger instance.
+    Returns a logger that writes through the non-blocking JSON pipeline.
+    Pass `per_second` (and optionally `sample_rate`) to rate limit a logger on a hot path.
     """
+    if _listener is None:
+        configure_logging(name.split(".")[0])
     logger = logging.getLogger(name)
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
+    if per_second is not None or sample_rate:
+        for existing in [f for f in logger.filters if isinstance(f, RateLimitFilter)]:
+            logger.removeFilter(existing)
+        logger.addFilter(RateLimitFilter(per_second, sample_rate=sample_rate))
     return logger
 
 # --- Standardized Error Handling ---
@@ -39,7 +175,7 @@ def handle_errors(func):
             return await func(*args, **kwargs)
         except Exception as e:
             logger = get_logger(func.__module__)
-            logger.error(f"Error in '{func.__name__}': {str(e)}", exc_info=True)
+            logger.error("Error in '%s': %s", func.__name__, e, exc_info=True)
             # In a real app, you might return a specific error structure
             return {
                 "error": True,